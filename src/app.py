@@ -1,24 +1,48 @@
 
-from tkinter.messagebox import RETRY
-from flask import Flask, render_template, send_file, url_for, request, jsonify, flash, redirect
-# import the cache simulator
-from cache_simulator import simulate_cache
+from flask import Flask, Request, Response, render_template, send_file, url_for, request, jsonify, flash, redirect, session
+# import the cache simulation jobs
+from jobs import JOB_DONE, JOB_QUEUED, JOB_RUNNING, JobManager, QueueFull
+
+from sim_cache.policies import POLICIES
+from sim_cache.api import read_trace
+from sim_cache.result_store import ResultStore, parse_outcomes
+from sim_cache.trace_cache import DEFAULT_MAX_BYTES, TraceCache
 
-from sim_cache.file_reader import read_file
 from werkzeug.utils import secure_filename
 
+import io
+import json
 import os
+import time
 
-# Define the log file path
-LOG_FILE = '.\\log.txt'
+# Number of accesses in a page of results, and the maximum a request can ask for
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 10000
 
-# Define the upload folder
+# Time between two checks of a job for its event stream (in seconds)
+EVENT_INTERVAL = 0.25
+
+# Define the upload folder, the uploaded traces themselves are never written to it
 UPLOAD_FOLDER = '..\\uploads'
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
+# Per-access results of the jobs
+RESULTS_FOLDER = os.path.join(UPLOAD_FOLDER, 'results')
+if not os.path.exists(RESULTS_FOLDER):
+    os.makedirs(RESULTS_FOLDER)
+
+class MemoryRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Keep the uploads in memory instead of spooling them to a temporary file, the trace is read from the buffer
+        return io.BytesIO()
+
+# Decoded uploads, keyed by the hash of their content, so a trace uploaded again is not decoded again
+TRACE_CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, 'trace_cache')
+
 # Create the Flask app
 app = Flask(__name__)
+app.request_class = MemoryRequest
 
 host = "0.0.0.0" # Change to your IP address
 
@@ -26,42 +50,91 @@ host = "0.0.0.0" # Change to your IP address
 # Define the upload folder
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+# Largest upload (in bytes), uploads are held in memory
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('SIM_MAX_UPLOAD_MB', 1024)) << 20
+
+# Simulations running at the same time, and jobs queued or running before new submissions are refused
+app.config['SIM_WORKERS'] = int(os.environ.get('SIM_WORKERS', 2))
+app.config['SIM_MAX_PENDING'] = int(os.environ.get('SIM_MAX_PENDING', 8))
+
 # Replace this with your own secret key
 app.secret_key = b'_5#y2L"F4Q8z\n\xec]/'  
 
 # Header table data
 headings = ("Address", "Tag", "Index", "Hit/Miss")
 
-# Cache table data
-data = []
-
-# Stats
-stats = ""
-
-# Latest input
-latest_input = []
+# Size limit of the decoded uploads (in MB), 0 to decode every upload in memory without keeping it
+app.config['SIM_TRACE_CACHE_MB'] = int(os.environ.get('SIM_TRACE_CACHE_MB', DEFAULT_MAX_BYTES >> 20))
+trace_cache = TraceCache(TRACE_CACHE_FOLDER, app.config['SIM_TRACE_CACHE_MB'] << 20) if app.config['SIM_TRACE_CACHE_MB'] > 0 else None
+
+# Cache simulation jobs
+jobs = JobManager(app.config['SIM_WORKERS'], app.config['SIM_MAX_PENDING'])
+
+# Replacement policies of the form
+SUBS_METHODS = {**{policy.name: code for code, policy in POLICIES.items()}, **{code: code for code in POLICIES}}
+
+def latest_result() -> dict | None:
+    """
+    Get the result of the latest job submitted in this session.
+
+    Returns:
+        dict | None: Result of the job, None if there is no finished job.
+    """
+    job_id = session.get('job_id')
+    if job_id is None:
+        return None
+    return jobs.result(job_id)
+
+def result_store(result: dict) -> ResultStore:
+    """
+    Get the per-access results of a finished job.
+
+    Args:
+        result (dict): Result of the job.
+    Returns:
+        ResultStore: Store with the accesses of the job.
+    """
+    return ResultStore(result['log'])
+
+def result_filters() -> tuple[tuple[int, ...] | None, int | None]:
+    """
+    Get the outcome and set index filters of the request (?outcome=miss&index=3).
+
+    Returns:
+        tuple[tuple[int, ...] | None, int | None]: Outcome codes and set index to keep, None for every one.
+    """
+    outcomes = parse_outcomes(request.args.get('outcome'))
+    index = request.args.get('index', type=int)
+    return outcomes, index
 
 # Home page
 @app.route('/', methods=['GET'])
 def home():
-    return render_template('home.html', headings=headings)
+    return render_template('home.html', headings=headings, job_id=session.get('job_id'))
 
 
 @app.route('/submit_cache', methods=['GET', 'POST'])
 def submit_cache():
-    global stats
     if request.method == 'POST':
-
-        # Check if any log file exists, if so delete it
-        if os.path.exists(LOG_FILE):
-            os.remove(LOG_FILE)
+        # Answer with JSON instead of redirecting, for scripts
+        wants_json = request.accept_mimetypes.best == 'application/json'
 
         # Get the parameters from the form
-        nsets = int(request.form['nsets'])
-        bsize = int(request.form['bsize'])
-        assoc = int(request.form['assoc'])
-        subs_method = request.form['subs_method']
-        output_flag = request.form['output_flag']
+        try:
+            nsets = int(request.form['nsets'])
+            bsize = int(request.form['bsize'])
+            assoc = int(request.form['assoc'])
+            subs_method = SUBS_METHODS[request.form['subs_method']]
+            output_flag = int(request.form['output_flag'])
+
+            # Approximate mode, a sample of the sets (see sim_cache/sampling.py)
+            sample_ratio = int(request.form.get('sample_ratio') or 1)
+            target_error = float(request.form['target_error']) if request.form.get('target_error') else None
+            if sample_ratio <= 0 or (target_error is not None and not 0 < target_error < 1):
+                raise ValueError()
+        except (KeyError, ValueError):
+            flash('ERROR:: Invalid cache configuration. Please try again.', 'error')
+            return redirect(request.url)
 
         # Check if the POST request has the file part
         if 'file' not in request.files:
@@ -72,59 +145,150 @@ def submit_cache():
 
         # If the user does not select a file, the browser submits an empty file without a filename
         if file.filename == '':
-            flash('ERROR:: No selected file, please select a .bin file', 'error')
+            flash('ERROR:: No selected file, please select a trace file', 'error')
             return redirect(request.url)
 
         if file:
-            # Get latest input
-            latest_input = [nsets, bsize, assoc, subs_method, output_flag, file.filename]
-
-            # Secure filename and save it to the upload folder
-            filename = secure_filename(file.filename)
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(file_path)
-
-            # Read the uploaded file
+            # Hash the upload, a trace seen before is mapped from the trace cache instead of decoded again
+            trace_key = None
             try:
-                file_data = read_file(file_path)
+                if trace_cache is not None:
+                    buffer = file.stream.getbuffer() if hasattr(file.stream, 'getbuffer') else file.stream.read()
+                    trace_key = trace_cache.buffer_key(buffer)
+                    memory_address = trace_cache.load_buffer(buffer, trace_key)
+                    # Release the request buffer
+                    del buffer
+                else:
+                    # Decode the upload in place, from the request buffer
+                    memory_address = read_trace(file.stream)
             except Exception as e:
-                flash('ERROR:: Invalid file. Please try again.', 'error')
+                flash('ERROR:: Invalid trace file: ' + str(e), 'error')
                 return redirect(request.url)
-            
-            # Call the cache simulator with the file data
+
+            # Queue the cache simulation, the job gets the addresses through shared memory
+            params = {
+                'nsets': nsets,
+                'bsize': bsize,
+                'assoc': assoc,
+                'subs_method': subs_method,
+                'output_flag': output_flag,
+                'sample_ratio': sample_ratio,
+                'target_error': target_error,
+                'input_file': secure_filename(file.filename),
+                'results': RESULTS_FOLDER,
+                'trace_cache': TRACE_CACHE_FOLDER,
+                'trace_key': trace_key,
+            }
             try:
-                simulate_cache(nsets, bsize, assoc, subs_method, output_flag, file_path)
-            except Exception as e:
-                flash('ERROR:: in cache simulation. Please try again. Error: ' + str(e), 'error')
+                job_id = jobs.submit(params, memory_address)
+            except QueueFull as e:
+                if wants_json:
+                    return jsonify({'success': False, 'error': str(e)}), 503
+                flash('ERROR:: ' + str(e), 'error')
                 return redirect(request.url)
+            finally:
+                # Release the decoded trace (and the request buffer it may be a view of), the job has its own copy
+                del memory_address
 
-            # Flash success message
-            flash('File Submited and ready to simulate', 'success')
-
-
-            # Check if the log file exists
-            if os.path.exists(LOG_FILE):
-                with open(LOG_FILE, 'r') as file:
-                    # Get the last line from the log file
-                    log_lines = file.readlines()
-            else:
-                flash('ERROR:: No Log file found. Please make sure to submit a file first.', 'error')
-                return render_template('home.html', headings=headings, error="No Log file found. Please make sure to submit a file first.")
-
-            # For each line in the log file, add it to the data list
-            for line in log_lines:
-                data.append(line.split(','))
+            session['job_id'] = job_id
+            if wants_json:
+                return jsonify({'success': True, 'job_id': job_id}), 202
 
+            # Flash success message
+            flash('File Submited, simulation job ' + job_id + ' queued', 'success')
             return redirect(request.url)
         else:
             flash('ERROR:: No file uploaded. Please try again.', 'error')
             return redirect(request.url)
     else:
-        return render_template('home.html', headings=headings)
+        return render_template('home.html', headings=headings, job_id=session.get('job_id'))
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    status = jobs.status(job_id)
+    if status is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    return jsonify({'success': True, **status})
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    if jobs.status(job_id) is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+
+    def events():
+        # Push the status of the job (with its running statistics) every time it changes, until it finishes
+        last = None
+        while True:
+            status = jobs.status(job_id)
+            if status is None:
+                break
+            if status != last:
+                yield 'data: ' + json.dumps(status) + '\n\n'
+                last = status
+            if status['state'] not in (JOB_QUEUED, JOB_RUNNING):
+                break
+            time.sleep(EVENT_INTERVAL)
+
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    status = jobs.status(job_id)
+    if status is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    if status['state'] != JOB_DONE:
+        return jsonify({'success': False, **status}), 202
+    result = jobs.result(job_id)
+    return jsonify({'success': True, **status, 'report': result['report'], 'statistics': result['statistics']})
+
+@app.route('/jobs/<job_id>/accesses', methods=['GET'])
+def job_accesses(job_id):
+    result = jobs.result(job_id)
+    if result is None:
+        return jsonify({'success': False, 'error': 'Unknown or unfinished job'}), 404
+
+    # Get the page and the filters, ?offset=0&limit=100&outcome=miss&index=3
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', PAGE_SIZE, type=int), 0), MAX_PAGE_SIZE)
+    try:
+        outcomes, index = result_filters()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    total, data = result_store(result).page(offset, limit, outcomes, index)
+    return jsonify({'success': True, 'total': total, 'offset': offset, 'limit': limit, 'data': data})
+
+@app.route('/jobs/<job_id>/export', methods=['GET'])
+def job_export(job_id):
+    result = jobs.result(job_id)
+    if result is None:
+        return jsonify({'success': False, 'error': 'Unknown or unfinished job'}), 404
+
+    # Get the format and the filters, ?format=ndjson&outcome=miss&index=3
+    export_format = request.args.get('format', 'ndjson')
+    mimetypes = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+    if export_format not in mimetypes:
+        return jsonify({'success': False, 'error': 'Export format needs to be ndjson or csv'}), 400
+    try:
+        outcomes, index = result_filters()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    # Stream the accesses one chunk at a time
+    headers = {'Content-Disposition': 'attachment; filename=accesses.' + export_format}
+    return Response(result_store(result).export(export_format, outcomes, index), mimetype=mimetypes[export_format], headers=headers)
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def job_cancel(job_id):
+    if jobs.status(job_id) is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    return jsonify({'success': jobs.cancel(job_id)})
     
 @app.route('/process_sim_cache', methods=['GET', 'POST'])
 def process_sim_cache():
-    global data
+    # First page of the accesses, the others are read from /jobs/<id>/accesses
+    result = latest_result()
+    data = result_store(result).page(0, PAGE_SIZE)[1] if result is not None else []
     if request.method == 'POST':
         if len(data) == 0:
             return jsonify({'success': False,
@@ -140,51 +304,44 @@ def process_sim_cache():
 @app.route('/process_clean_cache', methods=['GET', 'POST'])
 def process_clean_cache():
     if request.method == 'POST':
-        # Clear the data list
-        data.clear()
-
-        # Check if the log file exists
-        if os.path.exists(LOG_FILE):
-            # Delete the log file
-            os.remove(LOG_FILE)
+        # Forget the latest job
+        session.pop('job_id', None)
 
         # Return the home page with the data
         return jsonify({'success': True,
-                    'data': data})
+                    'data': []})
     else:
         return jsonify({'success': False,
-                    'data': data})
+                    'data': []})
 
 
 @app.route('/clean_cache', methods=['GET', 'POST'])
 def clean_cache():
-    # Clear the data list
-    data.clear()
-
-    # Check if the log file exists
-    if os.path.exists(LOG_FILE):
-        # Delete the log file
-        os.remove(LOG_FILE)
-
-    if os.path.exists('./report.txt'):
-        os.remove('./report.txt')
+    # Forget the latest job, cancelling it if it is still running
+    job_id = session.pop('job_id', None)
+    if job_id is not None:
+        jobs.cancel(job_id)
 
     # Return the home page with the data
     flash('Cache cleared!', 'success')
-    return render_template('home.html', headings=headings, data=data)
+    return render_template('home.html', headings=headings, data=[])
 
 @app.route('/report', methods=['GET'])
 def report():
-    if os.path.exists('./report.txt'):
-        return send_file('./report.txt', as_attachment=True)
+    result = latest_result()
+    if result is not None:
+        return send_file(io.BytesIO(result['report'].encode()), mimetype='text/plain', as_attachment=True, download_name='report.txt')
     else:
         flash('ERROR:: No report file found. Please make sure to submit a file first.', 'error')
         return render_template('home.html', headings=headings, error="No report file found. Please make sure to submit a file first.")
     
 @app.route('/logfile', methods=['GET'])
 def logfile():
-    if os.path.exists('./log.txt'):
-        return send_file('./log.txt', as_attachment=True)
+    result = latest_result()
+    if result is not None and len(result_store(result)) > 0:
+        # Stream the log one chunk at a time
+        headers = {'Content-Disposition': 'attachment; filename=log.txt'}
+        return Response(result_store(result).export('csv', header=False), mimetype='text/plain', headers=headers)
     else:
         flash('ERROR:: No log file found. Please make sure to submit a file first.', 'error')
         return render_template('home.html', headings=headings, error="No log file found. Please make sure to submit a file first.")
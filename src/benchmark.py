@@ -0,0 +1,253 @@
+"""
+File: benchmark.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Benchmark suite for the cache simulator. Runs every trace of example_files/address plus synthetic
+             scaled-up traces under direct-mapped, set-associative and fully associative caches with the R, L
+             and F policies, and times each phase separately: decode (read_file), construction (Cache.__init__),
+             simulation and report (get_output). Each case runs in a fresh process, so its peak RSS is its own.
+             The results are saved as JSON, and can be compared against a baseline (a previous result file):
+             a case is a regression when its throughput drops more than the threshold.
+             You need to pass the following parameters:
+                --output (Path to the JSON result file. OPTIONAL. Default is no file.)
+                --baseline (Path to a previous JSON result file to compare against. OPTIONAL.)
+                --threshold (Throughput drop counted as a regression, 0.1 is 10 %. OPTIONAL. Default is 0.1.)
+                --repeat (Runs of each case, the fastest one is kept. OPTIONAL. Default is 3.)
+                --synthetic (Sizes of the synthetic traces, in accesses. OPTIONAL. Default is 1048576.)
+                --traces (Paths to the traces to run instead of example_files/address. OPTIONAL.)
+             Example: python benchmark.py --output bench.json
+                      python benchmark.py --baseline bench.json --threshold 0.05
+             The exit code is 1 when there is a regression.
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+from sim_cache.cache import Cache
+from sim_cache.file_reader import ADDRESS_DTYPE, read_file
+from sim_cache.profiler import peak_rss
+
+# Traces of the repository
+EXAMPLE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "example_files", "address")
+
+# Cache configurations (name, nsets, bsize, assoc), all with 256 blocks
+CONFIGS = [
+    ("direct_mapped", 256, 4, 1),
+    ("set_associative", 64, 4, 4),
+    ("fully_associative", 1, 4, 256),
+]
+
+# Replacement policies
+SUBS_METHODS = ["R", "L", "F"]
+
+# Seed of the random substitution and of the synthetic traces
+SEED = 1
+
+def synthetic_trace(file_path: str, size: int, seed: int = SEED) -> str:
+    """
+    Write a synthetic trace, a deterministic mix of sequential streams, loops over a small working set and
+    random accesses, like a program walking arrays inside loops.
+
+    Args:
+        file_path (str): Path to the trace file.
+        size (int): Number of accesses.
+        seed (int): Seed of the trace. OPTIONAL.
+    Returns:
+        str: Path to the trace file.
+    """
+    rng = np.random.default_rng(seed)
+    kind = rng.integers(0, 3, size)
+
+    # Sequential streams over a 16 MB array, loops over a 512 byte working set, random accesses in 1 MB
+    stream = (np.arange(size, dtype=np.uint64) * 4) % (16 << 20)
+    loop = 0x1000000 + (np.arange(size, dtype=np.uint64) * 4) % 512
+    scattered = 0x2000000 + (rng.integers(0, 1 << 20, size, dtype=np.uint64) & ~np.uint64(3))
+
+    addresses = np.choose(kind, [stream, loop, scattered]).astype(ADDRESS_DTYPE)
+    addresses.tofile(file_path)
+    return file_path
+
+def run_case(trace_path: str, nsets: int, bsize: int, assoc: int, subs_method: str, repeat: int) -> dict:
+    """
+    Run one case in this process, keeping the fastest time of each phase.
+
+    Args:
+        trace_path (str): Path to the trace file.
+        nsets (int): Number of sets for the cache
+        bsize (int): Block size for the cache
+        assoc (int): Associativity for the cache
+        subs_method (str): Replacement policy for the cache
+        repeat (int): Number of runs.
+    Returns:
+        dict: Time of each phase (in seconds), throughput of the simulation and peak RSS.
+    """
+    phases = {"decode": [], "construct": [], "simulate": [], "report": []}
+
+    # The report file of get_output is written in a scratch folder, removed at the end
+    with tempfile.TemporaryDirectory() as folder:
+        report_file = os.path.join(folder, "report.txt")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            memory_address = np.array(read_file(trace_path), dtype=np.uint32)
+            decoded = time.perf_counter()
+            cache = Cache(nsets, bsize, assoc, subs_method, 1, trace_path, seed=SEED)
+            constructed = time.perf_counter()
+            cache.process_trace(memory_address)
+            simulated = time.perf_counter()
+            cache.get_output(report_file)
+            reported = time.perf_counter()
+
+            phases["decode"].append(decoded - start)
+            phases["construct"].append(constructed - decoded)
+            phases["simulate"].append(simulated - constructed)
+            phases["report"].append(reported - simulated)
+
+    result = {phase + "_seconds": min(times) for phase, times in phases.items()}
+    result["accesses"] = len(memory_address)
+    result["accesses_per_second"] = len(memory_address) / result["simulate_seconds"] if result["simulate_seconds"] > 0 else 0.0
+    result["hit_rate"] = cache.get_statistics()["hit_rate"]
+    result["peak_rss_bytes"] = peak_rss()
+    return result
+
+def startup_time(repeat: int) -> float:
+    """
+    Measure the time to start the interpreter and import the simulator.
+
+    Args:
+        repeat (int): Number of runs, the fastest one is kept.
+    Returns:
+        float: Startup time in seconds.
+    """
+    source = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import cache_simulator"], cwd=source, check=True)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def case_key(result: dict) -> str:
+    """
+    Get the key of a case, to match it with the baseline.
+
+    Args:
+        result (dict): Result of the case.
+    Returns:
+        str: Trace name, configuration and policy.
+    """
+    return "{}/{}/{}".format(result["trace"], result["config"], result["subs_method"])
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Compare the results against a baseline.
+
+    Args:
+        results (dict): Benchmark results.
+        baseline (dict): Baseline results.
+        threshold (float): Throughput drop counted as a regression.
+    Returns:
+        list[str]: One line for each regression.
+    """
+    base_cases = {case_key(case): case for case in baseline["cases"]}
+    regressions = []
+    for case in results["cases"]:
+        base = base_cases.get(case_key(case))
+        if base is None or base["accesses_per_second"] <= 0:
+            continue
+        change = case["accesses_per_second"] / base["accesses_per_second"] - 1
+        case["change"] = change
+        if change < -threshold:
+            regressions.append("{}: {:.0f} -> {:.0f} accesses/s ({:+.1%})".format(case_key(case), base["accesses_per_second"], case["accesses_per_second"], change))
+    return regressions
+
+def benchmark(traces: list[str], repeat: int) -> dict:
+    """
+    Run every case, each one in a fresh process.
+
+    Args:
+        traces (list[str]): Paths to the trace files.
+        repeat (int): Runs of each case.
+    Returns:
+        dict: Environment, startup time and result of each case.
+    """
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "startup_seconds": startup_time(repeat),
+        "cases": [],
+    }
+
+    for trace_path in traces:
+        for name, nsets, bsize, assoc in CONFIGS:
+            for subs_method in SUBS_METHODS:
+                with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                    case = pool.submit(run_case, trace_path, nsets, bsize, assoc, subs_method, repeat).result()
+                case = {"trace": os.path.basename(trace_path), "config": name, "nsets": nsets, "bsize": bsize, "assoc": assoc, "subs_method": subs_method, **case}
+                results["cases"].append(case)
+                print("{}: {:.0f} accesses/s".format(case_key(case), case["accesses_per_second"]), file=sys.stderr)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark suite for the cache simulator.")
+    parser.add_argument("--output", type=str, help="Path to the JSON result file", default=None)
+    parser.add_argument("--baseline", type=str, help="Path to a previous JSON result file to compare against", default=None)
+    parser.add_argument("--threshold", type=float, help="Throughput drop counted as a regression (0.1 is 10 %%)", default=0.1)
+    parser.add_argument("--repeat", type=int, help="Runs of each case, the fastest one is kept", default=3)
+    parser.add_argument("--synthetic", type=int, nargs="*", help="Sizes of the synthetic traces, in accesses", default=[1 << 20])
+    parser.add_argument("--traces", type=str, nargs="+", help="Paths to the traces to run instead of example_files/address", default=None)
+    args = parser.parse_args()
+
+    # Check it arg
+    if args.repeat <= 0:
+        raise ValueError("repeat needs to be greater than 0")
+
+    if args.threshold < 0:
+        raise ValueError("threshold needs to be 0 or greater")
+
+    for size in args.synthetic:
+        if size <= 0:
+            raise ValueError("synthetic sizes need to be greater than 0")
+
+    # Absolute paths, the cases run in worker processes
+    traces = [os.path.abspath(trace_path) for trace_path in args.traces] if args.traces else sorted(glob.glob(os.path.join(EXAMPLE_FOLDER, "*.bin")), key=os.path.getsize)
+
+    with tempfile.TemporaryDirectory() as folder:
+        for size in args.synthetic:
+            traces.append(synthetic_trace(os.path.join(folder, "synthetic_{}.bin".format(size)), size))
+
+        results = benchmark(traces, args.repeat)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        results["baseline"] = {"file": args.baseline, "threshold": args.threshold, "regressions": regressions}
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if regressions:
+        print("Regressions:", file=sys.stderr)
+        for regression in regressions:
+            print("  " + regression, file=sys.stderr)
+        sys.exit(1)
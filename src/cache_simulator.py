@@ -7,25 +7,75 @@ Description: Cache simulator for binary files. It can simulate the cache and ret
                 nsets (Number of sets for the cache)
                 bsize (Block size for the cache)
                 assoc (Associativity for the cache)
-                subs_method (Replacement policy for the cache)
+                subs_method (Replacement policy for the cache: R (random), L (LRU), F (FIFO), O (optimal, Belady's MIN,
+                             needs the whole trace ahead so not in stream mode, with workers or checkpoints),
+                             P (tree PLRU), S (SRRIP), B (BRRIP) or U (LFU). See sim_cache/policies.py)
                 output_flag 
                     ( 
                     Flag that defines how the output will look like, flag=0 for free format,
                     flag=1 The default output format should adhere to the following order:
                     Total accesses, Hit rate, Miss rate, Compulsory miss rate, Capacity miss rate, Conflict miss rate.Example: 100000, 0.95, 0.06, 0.01, 0.02, 0.03.
                     )
-                input_file (Path to the file to read, needs to be a binary file)
+                input_file (Path to the file to read, needs to be a binary file. Use "-" to read from stdin)
                 --debug (Debug mode, just for testing purposes. OPTIONAL. Default is False.)
+                --stream (Read and simulate the file in fixed-size chunks, with constant memory. OPTIONAL. Default is False.)
+                --chunk_size (Number of addresses per chunk in stream mode. OPTIONAL.)
+                --log (Path to the per-access log file, a directory for npy. OPTIONAL. Default is no log.)
+                --log_format (Format of the per-access log, csv, bin or npy (one typed .npy column per field).
+                              OPTIONAL. Default is csv.)
+                --workers (Split the sets between this many processes. OPTIONAL. Default is no workers.)
+                --seed (Seed for the random substitution, each set gets its own stream. OPTIONAL. Default is no seed.)
+                --trace_cache (Directory of the decoded trace cache, traces seen before are not decoded again. OPTIONAL.)
+                --trace_cache_size (Size limit of the decoded trace cache, in MB. OPTIONAL. Default is 4096.)
+                --profile (Print a JSON record with the time of each phase, the throughput, the peak memory and
+                           the operation counts to stderr. OPTIONAL. Default is False.)
+                --profile_file (Write the JSON profile record to this file instead of stderr. OPTIONAL.)
+                --profile_hook (Run the simulation under cprofile or sample (sampling profiler). OPTIONAL.)
+                --profile_dump (Dump file of the profile hook. OPTIONAL. Default is profile.prof or profile.folded.)
+                --restore (Start from a checkpoint, skipping the accesses it already simulated. OPTIONAL.)
+                --checkpoint (Save the full cache state to this file at the end, to continue later. OPTIONAL.)
+                --warmup (Simulate this many accesses first without counting them. OPTIONAL. Default is 0.)
+                --warmup_checkpoint (Save the cache state to this file right after the warm-up. OPTIONAL.)
+                --sample_ratio (Approximate mode: simulate 1 in this many sets, chosen by hashing the index, and estimate
+                                the rates with 95 % confidence intervals (at least 32 sets). OPTIONAL. Default is 1.)
+                --target_error (Approximate mode: pick the sampling ratio so the miss rate interval is within +/- this
+                                error, for example 0.01. OPTIONAL. Default is no target.)
              Example: python cache_simulator.py 256 4 1 R 1 bin_100.bin
+                      gzip -dc trace.bin.gz | python cache_simulator.py 256 4 1 R 1 - --stream
+                      python cache_simulator.py 256 4 1 L 1 daily.bin --restore daily.ckpt --checkpoint daily.ckpt
+                      python cache_simulator.py 4096 64 8 L 0 long.bin --target_error 0.005
 """
 
 import argparse
+import json
 import time
 import sys
-from sim_cache.file_reader import read_file
+from typing import BinaryIO, Iterable
+from sim_cache.access_log import LOG_FORMATS, AccessLog, open_access_log
+from sim_cache.api import TraceSource, read_trace
+from sim_cache.file_reader import CHUNK_SIZE, address_chunks, read_file_chunks
 from sim_cache.cache import Cache
+from sim_cache.checkpoint import load_checkpoint, save_checkpoint
+from sim_cache.policies import POLICIES
+from sim_cache.profiler import PROFILE_HOOKS, Profiler
+from sim_cache.sampling import SampledCache, choose_ratio
+from sim_cache.trace_cache import DEFAULT_MAX_BYTES, TraceCache
 
-def simulate_cache(nsets: int, bsize: int, assoc: int, subs_method: str, output_flag: int, input_file: str, debug: bool=False) -> str:
+def load_trace(input_file: TraceSource, trace_cache: TraceCache=None):
+    """
+    Get the addresses of a trace: from the trace cache for a path when there is one, decoded in place for a trace in memory.
+
+    Args:
+        input_file (TraceSource): Path to the file to read, or the trace itself (see sim_cache/api.py)
+        trace_cache (TraceCache): Cache of decoded traces, None to decode the file
+    Returns:
+        np.ndarray: Array with the addresses
+    """
+    if trace_cache is not None and isinstance(input_file, str):
+        return trace_cache.load(input_file)
+    return read_trace(input_file)
+
+def simulate_cache(nsets: int, bsize: int, assoc: int, subs_method: str, output_flag: int, input_file: TraceSource, debug: bool=False, access_log: AccessLog=None, workers: int=None, seed: int=None, trace_cache: TraceCache=None, profiler: Profiler=None) -> str:
     """
     Simulate the cache and return some statistics.
 
@@ -35,8 +85,14 @@ def simulate_cache(nsets: int, bsize: int, assoc: int, subs_method: str, output_
         assoc (int): Associativity for the cache
         subs_method (str): Replacement policy for the cache
         output_flag (int): Flag that defines how the output will look like
-        input_file (str): Path to the file to read, needs to be a binary file
+        input_file (TraceSource): Path to the file to read, or the trace itself: bytes, memoryview, array of addresses
+            or opened binary file (see sim_cache/api.py)
         debug (bool): Debug mode, just for testing purposes
+        access_log (AccessLog): Sink for the per-access log, None to disable it
+        workers (int): Split the sets between this many worker processes, None to simulate in this process
+        seed (int): Seed for the random substitution, None to draw one
+        trace_cache (TraceCache): Cache of decoded traces, None to decode the file
+        profiler (Profiler): Time each phase and keep the profile record in profiler.result, None to disable it
     Returns:
         str: Statistics from the cache simulation
     """
@@ -52,9 +108,185 @@ def simulate_cache(nsets: int, bsize: int, assoc: int, subs_method: str, output_
         print("input_file: ", input_file)
         print("--------------------------------------------")
 
-    memory_address_byte, memory_address_int = read_file(input_file)
-    cache = Cache(nsets, bsize, assoc, subs_method, output_flag, input_file, debug)
-    return cache.simulate_cache(memory_address_byte, memory_address_int)
+    if profiler is None:
+        memory_address = load_trace(input_file, trace_cache)
+        cache = Cache(nsets, bsize, assoc, subs_method, output_flag, input_file, debug, access_log, seed)
+        # The next-use index of the OPT substitution is kept with the decoded trace
+        if cache.needs_next_use() and trace_cache is not None and isinstance(input_file, str):
+            cache.set_next_use(trace_cache.load_next_use(input_file, bsize))
+        return cache.simulate_cache(memory_address, workers)
+
+    # Same steps as Cache.simulate_cache, one phase at a time
+    parallel = workers is not None and workers > 1
+    with profiler.phase("read_file"):
+        memory_address = load_trace(input_file, trace_cache)
+    with profiler.phase("cache_init"):
+        cache = Cache(nsets, bsize, assoc, subs_method, output_flag, input_file, debug, access_log, seed)
+        if cache.needs_next_use() and trace_cache is not None and isinstance(input_file, str):
+            cache.set_next_use(trace_cache.load_next_use(input_file, bsize))
+    with profiler.phase("simulate", hooked=True):
+        if parallel:
+            cache.simulate_partitioned(memory_address, workers)
+        else:
+            cache.process_trace(memory_address)
+    with profiler.phase("get_output"):
+        result = cache.get_output()
+    profiler.finish(cache, parallel)
+    return result
+
+def simulate_cache_sampled(nsets: int, bsize: int, assoc: int, subs_method: str, output_flag: int, input_file: TraceSource, sample_ratio: int=1, target_error: float=None, debug: bool=False, access_log: AccessLog=None, seed: int=None, trace_cache: TraceCache=None) -> str:
+    """
+    Simulate a sample of the sets and return the estimated statistics (see sim_cache/sampling.py).
+
+    Args:
+        nsets (int): Number of sets for the cache
+        bsize (int): Block size for the cache
+        assoc (int): Associativity for the cache
+        subs_method (str): Replacement policy for the cache
+        output_flag (int): Flag that defines how the output will look like
+        input_file (TraceSource): Path to the file to read, or the trace itself (see sim_cache/api.py)
+        sample_ratio (int): Simulate 1 in this many sets
+        target_error (float): Pick the sampling ratio for this miss rate error instead, None to use sample_ratio
+        debug (bool): Debug mode, just for testing purposes
+        access_log (AccessLog): Sink for the per-access log of the sampled accesses, None to disable it
+        seed (int): Seed for the random substitution, None to draw one
+        trace_cache (TraceCache): Cache of decoded traces, None to decode the file
+    Returns:
+        str: Estimated statistics from the cache simulation
+    """
+    memory_address = load_trace(input_file, trace_cache)
+    if target_error is not None:
+        sample_ratio = choose_ratio(memory_address, nsets, bsize, assoc, subs_method, target_error, seed)
+    cache = SampledCache(nsets, bsize, assoc, subs_method, output_flag, input_file, sample_ratio, debug, access_log, seed)
+    return cache.simulate_cache(memory_address)
+
+def simulate_cache_stream(nsets: int, bsize: int, assoc: int, subs_method: str, output_flag: int, source: str | BinaryIO | Iterable, chunk_size: int = CHUNK_SIZE, debug: bool=False, access_log: AccessLog=None, seed: int=None, profiler: Profiler=None) -> str:
+    """
+    Simulate the cache over a stream of addresses and return some statistics.
+    The trace is read and simulated one chunk at a time, so the memory used does not depend on its length.
+
+    Args:
+        nsets (int): Number of sets for the cache
+        bsize (int): Block size for the cache
+        assoc (int): Associativity for the cache
+        subs_method (str): Replacement policy for the cache
+        output_flag (int): Flag that defines how the output will look like
+        source (str | BinaryIO | Iterable): Path to a binary file, "-" for stdin, an opened binary file,
+            or any iterable of addresses or raw big-endian buffers
+        chunk_size (int): Number of addresses per chunk
+        debug (bool): Debug mode, just for testing purposes
+        access_log (AccessLog): Sink for the per-access log, None to disable it
+        seed (int): Seed for the random substitution, None to draw one
+        profiler (Profiler): Time each phase and keep the profile record in profiler.result, None to disable it.
+            The trace is read while it is simulated, so reading is part of the simulate phase.
+    Returns:
+        str: Statistics from the cache simulation
+    """
+
+    if isinstance(source, str) or hasattr(source, "read"):
+        input_file = source if isinstance(source, str) else getattr(source, "name", "<stream>")
+        chunks = read_file_chunks(source, chunk_size)
+    else:
+        input_file = "<iterable>"
+        chunks = source
+
+    if profiler is None:
+        cache = Cache(nsets, bsize, assoc, subs_method, output_flag, input_file, debug, access_log, seed)
+        return cache.simulate_stream(chunks, chunk_size)
+
+    # Same steps as Cache.simulate_stream, one phase at a time
+    with profiler.phase("cache_init"):
+        cache = Cache(nsets, bsize, assoc, subs_method, output_flag, input_file, debug, access_log, seed)
+    with profiler.phase("simulate", hooked=True):
+        for chunk in address_chunks(chunks, chunk_size):
+            cache.process_chunk(chunk)
+    with profiler.phase("get_output"):
+        result = cache.get_output()
+    profiler.finish(cache)
+    return result
+
+def simulate_cache_checkpoint(nsets: int, bsize: int, assoc: int, subs_method: str, output_flag: int, input_file: str, chunk_size: int = CHUNK_SIZE, debug: bool=False, access_log: AccessLog=None, seed: int=None, restore: str=None, checkpoint: str=None, warmup: int=0, warmup_checkpoint: str=None) -> str:
+    """
+    Simulate the cache incrementally and return some statistics: start from a checkpoint instead of a cold cache
+    (the accesses it already simulated are skipped), warm the cache up, and save checkpoints.
+    The trace is read one chunk at a time, from the byte offset of the first new access for raw files.
+
+    Args:
+        nsets (int): Number of sets for the cache
+        bsize (int): Block size for the cache
+        assoc (int): Associativity for the cache
+        subs_method (str): Replacement policy for the cache
+        output_flag (int): Flag that defines how the output will look like
+        input_file (str): Path to the file to read, "-" for stdin (taken as the accesses after the checkpoint)
+        chunk_size (int): Number of addresses per chunk
+        debug (bool): Debug mode, just for testing purposes
+        access_log (AccessLog): Sink for the per-access log of the counted accesses, None to disable it
+        seed (int): Seed for the random substitution, None to draw one (or use the one of the checkpoint)
+        restore (str): Path to the checkpoint to start from, None to start from a cold cache
+        checkpoint (str): Path to save the cache state at the end, None to not save it
+        warmup (int): Number of accesses simulated first without counting them (nor logging them)
+        warmup_checkpoint (str): Path to save the cache state right after the warm-up, None to not save it
+    Returns:
+        str: Statistics from the cache simulation
+    """
+
+    if restore:
+        cache, position = load_checkpoint(restore, output_flag, input_file, debug, access_log)
+        if (cache.nsets, cache.bsize, cache.ways, cache.subs_method) != (nsets, bsize, assoc, subs_method):
+            out_message = "Checkpoint: {} is a {} {} {} {} cache, not {} {} {} {}."
+            raise Exception(out_message.format(restore, cache.nsets, cache.bsize, cache.ways, cache.subs_method, nsets, bsize, assoc, subs_method))
+        if seed is not None and seed != cache.seed:
+            out_message = "Checkpoint: {} was simulated with seed {}, not {}."
+            raise Exception(out_message.format(restore, cache.seed, seed))
+    else:
+        cache = Cache(nsets, bsize, assoc, subs_method, output_flag, input_file, debug, access_log, seed)
+        position = 0
+
+    # A pipe can not be skipped through, stdin only has the new accesses
+    chunks = read_file_chunks(input_file, chunk_size, position if input_file != "-" else 0)
+
+    # Warm-up, without counters nor log
+    remaining = warmup
+    if remaining > 0:
+        cache.access_log = None
+
+    for chunk in chunks:
+        if remaining > 0:
+            used = min(remaining, len(chunk))
+            cache.process_chunk(chunk[:used])
+            position += used
+            remaining -= used
+            if remaining > 0:
+                continue
+            # The warm-up ends in this chunk
+            end_warmup(cache, access_log, warmup_checkpoint, position)
+            chunk = chunk[used:]
+        cache.process_chunk(chunk)
+        position += len(chunk)
+
+    # The trace was shorter than the warm-up
+    if remaining > 0:
+        end_warmup(cache, access_log, warmup_checkpoint, position)
+
+    if checkpoint:
+        save_checkpoint(cache, checkpoint, position)
+
+    return cache.get_output()
+
+def end_warmup(cache: Cache, access_log: AccessLog, warmup_checkpoint: str, position: int) -> None:
+    """
+    End the warm-up: reset the counters, start the log and save the warmed-up state.
+
+    Args:
+        cache (Cache): Simulated cache
+        access_log (AccessLog): Sink for the per-access log, None to disable it
+        warmup_checkpoint (str): Path to save the cache state, None to not save it
+        position (int): Number of accesses of the trace simulated so far
+    """
+    cache.reset_counters()
+    cache.access_log = access_log
+    if warmup_checkpoint:
+        save_checkpoint(cache, warmup_checkpoint, position)
 
 if __name__ == "__main__":
     
@@ -64,8 +296,26 @@ if __name__ == "__main__":
     parser.add_argument("assoc", type=int, help="Associativity for the cache")
     parser.add_argument("subs_method", type=str, help="Replacement policy for the cache")
     parser.add_argument("output_flag", type=int, help="Flag that defines how the output will look like, flag=0 for free format, flag=1 The default output format should adhere to the following order: Total accesses, Hit rate, Miss rate, Compulsory miss rate, Capacity miss rate, Conflict miss rate.Example: 100000, 0.95, 0.06, 0.01, 0.02, 0.03.")
-    parser.add_argument("input_file", type=str, help="Path to the file to read, needs to be a binary file")
+    parser.add_argument("input_file", type=str, help="Path to the file to read, needs to be a binary file. Use - to read from stdin")
     parser.add_argument("--debug", type=bool, help="Debug mode", default=False, required=False)
+    parser.add_argument("--stream", action="store_true", help="Read and simulate the file in fixed-size chunks, with constant memory", default=False, required=False)
+    parser.add_argument("--chunk_size", type=int, help="Number of addresses per chunk in stream mode", default=CHUNK_SIZE, required=False)
+    parser.add_argument("--log", type=str, help="Path to the per-access log file, disabled by default", default=None, required=False)
+    parser.add_argument("--workers", type=int, help="Split the sets between this many processes", default=None, required=False)
+    parser.add_argument("--seed", type=int, help="Seed for the random substitution", default=None, required=False)
+    parser.add_argument("--trace_cache", "--trace-cache", type=str, help="Directory of the decoded trace cache", default=None, required=False)
+    parser.add_argument("--trace_cache_size", type=int, help="Size limit of the decoded trace cache, in MB", default=DEFAULT_MAX_BYTES >> 20, required=False)
+    parser.add_argument("--log_format", type=str, help="Format of the per-access log: csv, bin or npy (typed columns, --log is a directory)", choices=list(LOG_FORMATS), default="csv", required=False)
+    parser.add_argument("--profile", action="store_true", help="Print a JSON profile record (phase times, throughput, peak memory, operation counts) to stderr", default=False, required=False)
+    parser.add_argument("--profile_file", type=str, help="Write the JSON profile record to this file instead of stderr", default=None, required=False)
+    parser.add_argument("--profile_hook", type=str, help="Run the simulation under a profiler: cprofile or sample", choices=list(PROFILE_HOOKS), default=None, required=False)
+    parser.add_argument("--profile_dump", type=str, help="Dump file of the profile hook", default=None, required=False)
+    parser.add_argument("--restore", type=str, help="Start from a checkpoint, skipping the accesses it already simulated", default=None, required=False)
+    parser.add_argument("--checkpoint", type=str, help="Save the full cache state to this file at the end", default=None, required=False)
+    parser.add_argument("--warmup", type=int, help="Simulate this many accesses first without counting them", default=0, required=False)
+    parser.add_argument("--warmup_checkpoint", type=str, help="Save the cache state to this file right after the warm-up", default=None, required=False)
+    parser.add_argument("--sample_ratio", type=int, help="Simulate 1 in this many sets and estimate the rates", default=1, required=False)
+    parser.add_argument("--target_error", type=float, help="Pick the sampling ratio so the miss rate interval is within +/- this error", default=None, required=False)
     args = parser.parse_args()
 
     # Check it arg
@@ -81,17 +331,81 @@ if __name__ == "__main__":
     if args.output_flag < 0 or args.output_flag > 1:
         raise ValueError("output_flag needs to be 0 or 1")
     
-    if args.subs_method not in ["R", "L", "F"]:
-        raise ValueError("subs_method needs to be R or L or F")
+    if args.subs_method not in POLICIES:
+        raise ValueError("subs_method needs to be one of " + ", ".join(POLICIES))
+
+    if args.chunk_size <= 0:
+        raise ValueError("chunk_size needs to be greater than 0")
+
+    if args.workers is not None and args.workers <= 0:
+        raise ValueError("workers needs to be greater than 0")
+
+    if args.trace_cache_size <= 0:
+        raise ValueError("trace_cache_size needs to be greater than 0")
+
+    if args.workers is not None and (args.stream or args.input_file == "-"):
+        raise ValueError("workers can not be used in stream mode")
+
+    if args.warmup < 0:
+        raise ValueError("warmup needs to be 0 or greater")
+
+    if args.warmup_checkpoint and args.warmup == 0:
+        raise ValueError("warmup_checkpoint needs a warmup")
+
+    checkpointing = args.restore or args.checkpoint or args.warmup > 0
+    if checkpointing and (args.workers is not None or args.profile or args.profile_file or args.profile_hook):
+        raise ValueError("restore, checkpoint and warmup can not be used with workers or profile")
+
+    if POLICIES[args.subs_method].needs_next_use and (args.stream or args.input_file == "-" or args.workers is not None or checkpointing):
+        raise ValueError("subs_method {} needs the whole trace, it can not be used in stream mode, with workers or checkpoints".format(args.subs_method))
     
+    if args.sample_ratio <= 0:
+        raise ValueError("sample_ratio needs to be greater than 0")
+
+    if args.target_error is not None and not 0 < args.target_error < 1:
+        raise ValueError("target_error needs to be between 0 and 1")
+
+    if args.target_error is not None and args.sample_ratio != 1:
+        raise ValueError("sample_ratio and target_error can not be used together")
+
+    sampling = args.sample_ratio > 1 or args.target_error is not None
+    if sampling and (args.stream or args.input_file == "-" or args.workers is not None or checkpointing or args.profile or args.profile_file or args.profile_hook):
+        raise ValueError("sample_ratio and target_error can not be used in stream mode, with workers, checkpoints or profile")
+
+    access_log = None
     try:
+        if args.log:
+            access_log = open_access_log(args.log, args.log_format)
+
+        trace_cache = TraceCache(args.trace_cache, args.trace_cache_size << 20) if args.trace_cache else None
+
+        profiling = args.profile or args.profile_file or args.profile_hook
+        profiler = Profiler(args.profile_hook, args.profile_dump) if profiling else None
+
         start = time.time()
-        result = simulate_cache(args.nsets, args.bsize, args.assoc, args.subs_method, args.output_flag, args.input_file, args.debug)
+        if sampling:
+            result = simulate_cache_sampled(args.nsets, args.bsize, args.assoc, args.subs_method, args.output_flag, args.input_file, args.sample_ratio, args.target_error, args.debug, access_log, args.seed, trace_cache)
+        elif checkpointing:
+            result = simulate_cache_checkpoint(args.nsets, args.bsize, args.assoc, args.subs_method, args.output_flag, args.input_file, args.chunk_size, args.debug, access_log, args.seed, args.restore, args.checkpoint, args.warmup, args.warmup_checkpoint)
+        elif args.stream or args.input_file == "-":
+            result = simulate_cache_stream(args.nsets, args.bsize, args.assoc, args.subs_method, args.output_flag, args.input_file, args.chunk_size, args.debug, access_log, args.seed, profiler)
+        else:
+            result = simulate_cache(args.nsets, args.bsize, args.assoc, args.subs_method, args.output_flag, args.input_file, args.debug, access_log, args.workers, args.seed, trace_cache, profiler)
         #result = simulate_cache(1, 4, 32, "L", 1, 
         #"C:\\Users\\gusta\\OneDrive\\Documents\\GitHub\\cache_simulator\\example_files\\address\\vortex.in.sem.persons.bin", True)
         end = time.time()
         print(result)
+
+        if profiler is not None:
+            if args.profile_file:
+                with open(args.profile_file, "w") as file:
+                    json.dump(profiler.result, file, indent=2)
+            else:
+                print(json.dumps(profiler.result, indent=2), file=sys.stderr)
         #print("Execution time: {:.6f} seconds".format(end - start))
     except Exception as e:
         print(e)
         sys.exit(1)
+    finally:
+        if access_log is not None:
+            access_log.close()
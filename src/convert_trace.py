@@ -0,0 +1,68 @@
+"""
+File: convert_trace.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Trace converter for the cache simulator. Reads a trace in any supported format and writes it in the
+             format given by the extension of the output file, one chunk at a time, so traces bigger than the
+             memory can be converted.
+             Formats: .bin (raw 4 byte big-endian addresses), .txt (decimal addresses, one per line),
+             .bin.gz, .bin.bz2, .bin.xz (compressed raw, .txt.gz... for compressed text)
+             and .dtrace (zig-zag varint deltas in blocks, with an index for seeking, see sim_cache/trace_format.py).
+             You need to pass the following parameters:
+                input_file (Path to the trace to read. Use "-" to read a trace from stdin)
+                output_file (Path to the trace to write)
+                --block_size (Number of addresses per block of a .dtrace file. OPTIONAL. Default is 65536.)
+             Example: python convert_trace.py vortex.in.sem.persons.bin vortex.in.sem.persons.dtrace
+                      python convert_trace.py trace.bin.gz trace.dtrace
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from sim_cache.file_reader import CHUNK_SIZE, read_file_chunks
+from sim_cache.trace_format import DELTA_BLOCK_SIZE, open_trace_writer
+
+def convert_trace(input_file: str, output_file: str, block_size: int = DELTA_BLOCK_SIZE, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Convert a trace to the format given by the extension of the output file.
+
+    Args:
+        input_file (str): Path to the trace to read, "-" for stdin.
+        output_file (str): Path to the trace to write.
+        block_size (int): Number of addresses per block of a .dtrace file. OPTIONAL.
+        chunk_size (int): Number of addresses read at a time. OPTIONAL.
+    Returns:
+        int: Number of addresses converted.
+    """
+    count = 0
+    with open_trace_writer(output_file, block_size) as writer:
+        for chunk in read_file_chunks(input_file, chunk_size):
+            writer.write(chunk)
+            count += len(chunk)
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trace converter for the cache simulator.")
+    parser.add_argument("input_file", type=str, help="Path to the trace to read. Use - to read a trace from stdin")
+    parser.add_argument("output_file", type=str, help="Path to the trace to write: .bin, .txt, .bin.gz, .bin.bz2, .bin.xz or .dtrace")
+    parser.add_argument("--block_size", type=int, help="Number of addresses per block of a .dtrace file", default=DELTA_BLOCK_SIZE)
+    args = parser.parse_args()
+
+    # Check it arg
+    if args.block_size <= 0:
+        raise ValueError("block_size needs to be greater than 0")
+
+    if os.path.abspath(args.input_file) == os.path.abspath(args.output_file):
+        raise ValueError("input_file and output_file need to be different files")
+
+    try:
+        start = time.time()
+        count = convert_trace(args.input_file, args.output_file, args.block_size)
+        end = time.time()
+        print("Converted {} addresses in {:.6f} seconds ({} -> {} bytes)".format(
+            count, end - start, os.path.getsize(args.input_file) if args.input_file != "-" else "?", os.path.getsize(args.output_file)))
+    except Exception as e:
+        print(e)
+        sys.exit(1)
@@ -0,0 +1,83 @@
+"""
+File: hierarchy_simulator.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Multi-level cache hierarchy simulator (for example L1I/L1D -> L2 -> L3). The levels, their inclusion
+             policies (nine, inclusive or exclusive) and their latencies are read from a JSON config file
+             (see sim_cache/hierarchy.py and example_files/hierarchy). Only the misses of a level reach the next one.
+             You need to pass the following parameters:
+                config_file (Path to the JSON config file of the hierarchy)
+                output_flag
+                    (
+                    Flag that defines how the output will look like, flag=0 for free format (every level and the whole hierarchy),
+                    flag=1 for one line per level: Name, Total accesses, Hit rate, Miss rate, Compulsory miss rate,
+                    Capacity miss rate, Conflict miss rate, and a last line: Hierarchy, Total accesses, Memory accesses, Global miss rate.
+                    )
+                input_file (Path to the trace file to read. Use "-" to read from stdin)
+                --stream (Read and simulate the file in fixed-size chunks, with constant memory. OPTIONAL. Default is False.)
+                --chunk_size (Number of accesses per batch. OPTIONAL.)
+                --pipeline (Simulate each level in its own process, connected by bounded queues. Not with inclusive
+                            levels. OPTIONAL. Default is False.)
+                --queue_size (Batches waiting between two levels of the pipeline. OPTIONAL. Default is 4.)
+                --seed (Seed for the random substitution, each set gets its own stream. OPTIONAL. Default is no seed.)
+             Example: python hierarchy_simulator.py ../example_files/hierarchy/l1_l2_l3.json 0 bin_10000.bin
+                      python hierarchy_simulator.py ../example_files/hierarchy/l1_l2_exclusive.json 1 trace.bin.gz --pipeline
+"""
+
+import argparse
+import sys
+
+from sim_cache.file_reader import CHUNK_SIZE, read_file, read_file_chunks
+from sim_cache.hierarchy import QUEUE_SIZE, Hierarchy
+
+def simulate_hierarchy(config_file: str, output_flag: int, input_file: str, stream: bool = False, chunk_size: int = CHUNK_SIZE, pipeline: bool = False, queue_size: int = QUEUE_SIZE, seed: int = None) -> str:
+    """
+    Simulate a cache hierarchy and return some statistics.
+
+    Args:
+        config_file (str): Path to the JSON config file of the hierarchy
+        output_flag (int): Flag that defines how the output will look like
+        input_file (str): Path to the trace file, "-" for stdin
+        stream (bool): Read and simulate the file in fixed-size chunks
+        chunk_size (int): Number of accesses per batch
+        pipeline (bool): Simulate each level in its own process
+        queue_size (int): Batches waiting between two levels of the pipeline
+        seed (int): Seed for the random substitution, None to draw one
+    Returns:
+        str: Statistics from the hierarchy simulation
+    """
+    hierarchy = Hierarchy.from_file(config_file, input_file, output_flag, seed)
+
+    if pipeline:
+        return hierarchy.simulate_pipeline(read_file_chunks(input_file, chunk_size), chunk_size, queue_size)
+    if stream or input_file == "-":
+        return hierarchy.simulate_stream(read_file_chunks(input_file, chunk_size), chunk_size)
+    return hierarchy.simulate(read_file(input_file), chunk_size)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-level cache hierarchy simulator.")
+    parser.add_argument("config_file", type=str, help="Path to the JSON config file of the hierarchy")
+    parser.add_argument("output_flag", type=int, help="Flag that defines how the output will look like, flag=0 for free format, flag=1 for one line per level and a last line for the hierarchy")
+    parser.add_argument("input_file", type=str, help="Path to the trace file to read. Use - to read from stdin")
+    parser.add_argument("--stream", action="store_true", help="Read and simulate the file in fixed-size chunks, with constant memory", default=False, required=False)
+    parser.add_argument("--chunk_size", type=int, help="Number of accesses per batch", default=CHUNK_SIZE, required=False)
+    parser.add_argument("--pipeline", action="store_true", help="Simulate each level in its own process, connected by bounded queues", default=False, required=False)
+    parser.add_argument("--queue_size", type=int, help="Batches waiting between two levels of the pipeline", default=QUEUE_SIZE, required=False)
+    parser.add_argument("--seed", type=int, help="Seed for the random substitution", default=None, required=False)
+    args = parser.parse_args()
+
+    # Check it arg
+    if args.output_flag < 0 or args.output_flag > 1:
+        raise ValueError("output_flag needs to be 0 or 1")
+
+    if args.chunk_size <= 0:
+        raise ValueError("chunk_size needs to be greater than 0")
+
+    if args.queue_size <= 0:
+        raise ValueError("queue_size needs to be greater than 0")
+
+    try:
+        print(simulate_hierarchy(args.config_file, args.output_flag, args.input_file, args.stream, args.chunk_size, args.pipeline, args.queue_size, args.seed))
+    except Exception as e:
+        print(e)
+        sys.exit(1)
@@ -0,0 +1,294 @@
+"""
+File: jobs.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Asynchronous simulation jobs for the web interface. Each submission becomes a job on a bounded
+             process pool: the request gets a job id right away, the progress (accesses processed out of the total)
+             is shared through a multiprocessing manager, the result is kept until it is fetched and a job can be
+             cancelled while it is queued or running. While a job runs, its running statistics (hit rate, misses
+             and throughput) are published with the progress.
+             The per-access results of a job are written to a columnar access log (typed .npy columns) in the results
+             folder, and read back page by page through a ResultStore, so they are never held in memory at once.
+             Uploaded traces are decoded once (the web app keeps them in a TraceCache, keyed by the hash of the
+             upload), the addresses are copied once into shared memory, which the worker maps (see JobManager.submit),
+             and the shared memory is released when the job is done. The next-use index of the OPT substitution is
+             kept in the same TraceCache, so it is computed once per trace and block size.
+             A job with a sampling ratio or a target error only simulates a sample of the sets (see
+             sim_cache/sampling.py): its progress and access log cover the sampled accesses.
+"""
+
+import os
+import shutil
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import Manager
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from sim_cache.access_log import ColumnarAccessLog
+from sim_cache.cache import Cache
+from sim_cache.progress import Progress
+from sim_cache.sampling import SampledCache, choose_ratio
+from sim_cache.trace_cache import TraceCache
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+class JobCancelled(Exception):
+    pass
+
+class QueueFull(Exception):
+    pass
+
+def run_job(job_id: str, params: dict, progress, cancelled) -> dict:
+    """
+    Run a simulation job in a worker process.
+
+    Args:
+        job_id (str): Id of the job.
+        params (dict): nsets, bsize, assoc, subs_method, output_flag, input_file (name of the trace), results (folder
+            of the access logs), shared_trace (name and length of the shared memory with the addresses), and OPTIONAL
+            trace_cache and trace_key (TraceCache directory and content hash of the trace, to reuse its next-use
+            index), sample_ratio and target_error (approximate mode).
+        progress: Shared dict, job id -> running statistics of the job (see Progress.snapshot).
+        cancelled: Shared dict, with the ids of the jobs to cancel.
+    Returns:
+        dict: Report, statistics and path to the access log of the simulation.
+    """
+    progress[job_id] = {}
+
+    name, length = params["shared_trace"]
+    shared = SharedMemory(name)
+    try:
+        return simulate_job(job_id, params, np.ndarray((length,), dtype=np.uint32, buffer=shared.buf), progress, cancelled)
+    finally:
+        # A traceback still holding the addresses keeps the mapping until it is collected
+        try:
+            shared.close()
+        except BufferError:
+            pass
+
+def simulate_job(job_id: str, params: dict, memory_address: np.ndarray, progress, cancelled) -> dict:
+    """
+    Simulate the trace of a job, publishing its progress.
+
+    Args:
+        job_id (str): Id of the job.
+        params (dict): Parameters of the job (see run_job).
+        memory_address (np.ndarray): Addresses of the trace.
+        progress: Shared dict, job id -> running statistics of the job (see Progress.snapshot).
+        cancelled: Shared dict, with the ids of the jobs to cancel.
+    Returns:
+        dict: Report, statistics and path to the access log of the simulation.
+    """
+    log_path = os.path.join(params["results"], job_id)
+    access_log = ColumnarAccessLog(log_path)
+
+    # Approximate mode, the sampled cache computes the next-use index of its own accesses (OPT substitution)
+    sample_ratio = params.get("sample_ratio") or 1
+    if params.get("target_error") is not None:
+        sample_ratio = choose_ratio(memory_address, params["nsets"], params["bsize"], params["assoc"], params["subs_method"], params["target_error"])
+    if sample_ratio > 1:
+        cache = SampledCache(params["nsets"], params["bsize"], params["assoc"], params["subs_method"], params["output_flag"], params["input_file"], sample_ratio, access_log=access_log)
+    else:
+        cache = Cache(params["nsets"], params["bsize"], params["assoc"], params["subs_method"], params["output_flag"], params["input_file"], access_log=access_log)
+        # The next-use index of a trace is kept with the decoded trace
+        if cache.needs_next_use() and params.get("trace_key") is not None:
+            trace_cache = TraceCache(params["trace_cache"])
+            cache.set_next_use(trace_cache.load_key_next_use(params["trace_key"], memory_address, params["bsize"]))
+
+    def report(statistics: dict) -> None:
+        # Stop at the next report once the job is cancelled
+        if job_id in cancelled:
+            raise JobCancelled()
+        progress[job_id] = statistics
+
+    try:
+        with access_log:
+            cache.process_trace(memory_address, Progress(report, total=len(memory_address)))
+    except BaseException:
+        # Do not keep the log of a job that did not finish
+        shutil.rmtree(log_path)
+        raise
+
+    return {
+        "report": cache.get_report(),
+        "statistics": cache.get_statistics(),
+        "log": log_path,
+    }
+
+def release_shared(shared: SharedMemory) -> None:
+    """
+    Release the shared memory of a trace, once its job is done.
+
+    Args:
+        shared (SharedMemory): Shared memory with the addresses of the trace.
+    """
+    shared.close()
+    shared.unlink()
+
+class JobManager:
+    def __init__(self, max_workers: int = 2, max_pending: int = 8, max_jobs: int = 100) -> None:
+        # Pool parameters
+        self.max_workers = max_workers      # Simulations running at the same time
+        self.max_pending = max_pending      # Jobs queued or running, new submissions are refused past it
+        self.max_jobs = max_jobs            # Finished jobs kept for their results
+
+        # Started on the first submission
+        self.pool: ProcessPoolExecutor | None = None
+        self.manager = None
+        self.progress = None
+        self.cancelled = None
+
+        # Job id -> future, oldest first
+        self.jobs: OrderedDict[str, Future] = OrderedDict()
+
+    def start(self) -> None:
+        """
+        Start the process pool and the shared progress.
+        """
+        if self.pool is None:
+            self.manager = Manager()
+            self.progress = self.manager.dict()
+            self.cancelled = self.manager.dict()
+            self.pool = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    def submit(self, params: dict, memory_address: np.ndarray) -> str:
+        """
+        Queue a simulation job.
+
+        Args:
+            params (dict): Parameters of the job (see run_job).
+            memory_address (np.ndarray): Addresses of the trace (an upload), copied once into shared memory.
+        Returns:
+            str: Id of the job.
+        """
+        if self.pending() >= self.max_pending:
+            raise QueueFull("Too many simulations running, please try again later.")
+
+        self.start()
+        job_id = uuid.uuid4().hex
+
+        # Native uint32 addresses, the worker maps them instead of getting a pickled copy
+        shared = SharedMemory(create=True, size=max(len(memory_address) * 4, 1))
+        np.ndarray((len(memory_address),), dtype=np.uint32, buffer=shared.buf)[:] = memory_address
+        params = {**params, "shared_trace": (shared.name, len(memory_address))}
+
+        try:
+            future = self.pool.submit(run_job, job_id, params, self.progress, self.cancelled)
+        except BaseException:
+            release_shared(shared)
+            raise
+        future.add_done_callback(lambda _: release_shared(shared))
+
+        self.jobs[job_id] = future
+        self.forget_old_jobs()
+        return job_id
+
+    def pending(self) -> int:
+        """
+        Get the number of jobs queued or running.
+
+        Returns:
+            int: Number of jobs not finished.
+        """
+        return sum(1 for future in self.jobs.values() if not future.done())
+
+    def status(self, job_id: str) -> dict | None:
+        """
+        Get the status of a job.
+
+        Args:
+            job_id (str): Id of the job.
+        Returns:
+            dict | None: State, accesses processed, total accesses, running statistics (see Progress.snapshot)
+                and error of the job, None if the job is unknown.
+        """
+        future = self.jobs.get(job_id)
+        if future is None:
+            return None
+
+        statistics = self.progress.get(job_id) or None
+        processed = statistics["processed"] if statistics else 0
+        total = statistics["total"] if statistics else 0
+        error = None
+        if future.cancelled():
+            state = JOB_CANCELLED
+        elif future.done():
+            exception = future.exception()
+            if exception is None:
+                state = JOB_DONE
+            elif isinstance(exception, JobCancelled):
+                state = JOB_CANCELLED
+            else:
+                state = JOB_FAILED
+                error = str(exception)
+        elif job_id in self.progress:
+            state = JOB_RUNNING
+        else:
+            state = JOB_QUEUED
+
+        return {"id": job_id, "state": state, "processed": processed, "total": total, "statistics": statistics, "error": error}
+
+    def result(self, job_id: str) -> dict | None:
+        """
+        Get the result of a finished job.
+
+        Args:
+            job_id (str): Id of the job.
+        Returns:
+            dict | None: Result of the job (see run_job), None if the job is unknown or did not finish successfully.
+        """
+        status = self.status(job_id)
+        if status is None or status["state"] != JOB_DONE:
+            return None
+        return self.jobs[job_id].result()
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job. A queued job never runs, a running job stops at its next progress report.
+
+        Args:
+            job_id (str): Id of the job.
+        Returns:
+            bool: True if the job was still queued or running.
+        """
+        future = self.jobs.get(job_id)
+        if future is None or future.done():
+            return False
+        if not future.cancel():
+            self.cancelled[job_id] = True
+        return True
+
+    def forget_old_jobs(self) -> None:
+        """
+        Drop the oldest finished jobs past max_jobs.
+        """
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            future = self.jobs[job_id]
+            if future.done():
+                # Remove the access log of the job
+                if not future.cancelled() and future.exception() is None:
+                    log_path = future.result()["log"]
+                    if os.path.exists(log_path):
+                        shutil.rmtree(log_path)
+                del self.jobs[job_id]
+                self.progress.pop(job_id, None)
+                self.cancelled.pop(job_id, None)
+
+    def shutdown(self) -> None:
+        """
+        Cancel the queued jobs and stop the pool.
+        """
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.manager.shutdown()
+            self.pool = None
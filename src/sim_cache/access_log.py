@@ -0,0 +1,265 @@
+"""
+File: access_log.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Access log sinks for the cache simulation. Each simulated access is recorded as
+             (address, tag, index, outcome) and written in bulk, one chunk of accesses at a time.
+             Formats: "csv" (text lines "address,tag,index,outcome name", the old log.txt format),
+             "bin" (fixed-width 13 byte big-endian records), "npy" (typed columns: a directory with one .npy file
+             per field, uint32 address, tag and index and uint8 outcome code, that can be memory-mapped without
+             any parsing) and an in-memory ring buffer.
+"""
+
+import io
+import os
+from collections import deque
+from typing import Sequence
+
+import numpy as np
+
+from .outcome import OUTCOME_NAMES
+
+# Fixed-width binary record: address, tag, index (uint32) and outcome code (uint8)
+BINARY_RECORD_DTYPE = np.dtype([("address", ">u4"), ("tag", ">u4"), ("index", ">u4"), ("outcome", "u1")])
+
+# Columns of the columnar log, one .npy file each: address, tag, index (uint32) and outcome code (uint8)
+COLUMN_DTYPES = {"address": np.dtype("<u4"), "tag": np.dtype("<u4"), "index": np.dtype("<u4"), "outcome": np.dtype("u1")}
+
+# Size of the write buffer for the file sinks (in bytes)
+BUFFER_SIZE = 1 << 20
+
+def as_list(values: Sequence[int]) -> list[int]:
+    """
+    Get a column of a chunk as a list of Python integers.
+
+    Args:
+        values (Sequence[int]): Array or sequence of integers.
+    Returns:
+        list[int]: The same values as a list.
+    """
+    return values.tolist() if isinstance(values, np.ndarray) else values
+
+class AccessLog:
+    """
+    Base class for the access log sinks.
+    """
+
+    def write_chunk(self, addresses: Sequence[int], tags: Sequence[int], indexes: Sequence[int], outcomes: Sequence[int]) -> None:
+        """
+        Record a chunk of accesses.
+
+        Args:
+            addresses (Sequence[int]): Addresses of the accesses.
+            tags (Sequence[int]): Tags of the accesses.
+            indexes (Sequence[int]): Set indexes of the accesses.
+            outcomes (Sequence[int]): Outcome codes of the accesses (see outcome.py).
+        """
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """
+        Flush the buffered records.
+        """
+
+    def close(self) -> None:
+        """
+        Flush and release the sink.
+        """
+        self.flush()
+
+    def __enter__(self) -> "AccessLog":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+class CsvAccessLog(AccessLog):
+    def __init__(self, file_path: str, buffer_size: int = BUFFER_SIZE, append: bool = False) -> None:
+        self.file_path = file_path
+        self.file = open(file_path, "a" if append else "w", buffering=buffer_size)
+
+    def write_chunk(self, addresses: Sequence[int], tags: Sequence[int], indexes: Sequence[int], outcomes: Sequence[int]) -> None:
+        names = OUTCOME_NAMES
+        self.file.writelines(
+            "{},{},{},{}\n".format(address, tag, index, names[outcome])
+            for address, tag, index, outcome in zip(as_list(addresses), as_list(tags), as_list(indexes), as_list(outcomes))
+        )
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+class BinaryAccessLog(AccessLog):
+    def __init__(self, file_path: str, buffer_size: int = BUFFER_SIZE, append: bool = False) -> None:
+        self.file_path = file_path
+        self.file = open(file_path, "ab" if append else "wb", buffering=buffer_size)
+
+    def write_chunk(self, addresses: Sequence[int], tags: Sequence[int], indexes: Sequence[int], outcomes: Sequence[int]) -> None:
+        records = np.empty(len(addresses), dtype=BINARY_RECORD_DTYPE)
+        records["address"] = addresses
+        records["tag"] = tags
+        records["index"] = indexes
+        records["outcome"] = outcomes
+        self.file.write(records.tobytes())
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+class ColumnarAccessLog(AccessLog):
+    """
+    Write the accesses as typed columns, one .npy file per field in a directory (see COLUMN_DTYPES).
+    Each chunk is appended to the columns, and the length in the .npy headers is updated on every flush,
+    so the columns are valid (and can be memory-mapped, see read_columnar_log) once the log is flushed or closed.
+    """
+
+    def __init__(self, file_path: str, buffer_size: int = BUFFER_SIZE, append: bool = False) -> None:
+        self.file_path = file_path
+        self.count = 0
+        self.files = {}
+
+        os.makedirs(file_path, exist_ok=True)
+        for name, dtype in COLUMN_DTYPES.items():
+            path = column_path(file_path, name)
+            if append and os.path.exists(path):
+                # Keep the records, and go on after them
+                self.count = len(np.load(path, mmap_mode="r"))
+                file = open(path, "r+b", buffering=buffer_size)
+                file.seek(0, os.SEEK_END)
+            else:
+                file = open(path, "w+b", buffering=buffer_size)
+                write_column_header(file, dtype, 0)
+            self.files[name] = file
+
+    def write_chunk(self, addresses: Sequence[int], tags: Sequence[int], indexes: Sequence[int], outcomes: Sequence[int]) -> None:
+        for name, values in zip(COLUMN_DTYPES, (addresses, tags, indexes, outcomes)):
+            self.files[name].write(np.asarray(values).astype(COLUMN_DTYPES[name], copy=False).tobytes())
+        self.count += len(outcomes)
+
+    def flush(self) -> None:
+        # The headers have a fixed size, the length is rewritten in place
+        for name, file in self.files.items():
+            file.seek(0)
+            write_column_header(file, COLUMN_DTYPES[name], self.count)
+            file.seek(0, os.SEEK_END)
+            file.flush()
+
+    def close(self) -> None:
+        self.flush()
+        for file in self.files.values():
+            file.close()
+
+class RingAccessLog(AccessLog):
+    """
+    Keep only the latest accesses in memory, without any file (for a live view, or the library API). The web
+    interface keeps the finished jobs in a columnar log instead, to page through every access.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.records: deque[tuple[int, int, int, int]] = deque([], maxlen=capacity)
+
+    def write_chunk(self, addresses: Sequence[int], tags: Sequence[int], indexes: Sequence[int], outcomes: Sequence[int]) -> None:
+        # Only the tail of a big chunk can survive in the ring
+        start = max(0, len(addresses) - self.capacity)
+        self.records.extend(zip(as_list(addresses[start:]), as_list(tags[start:]), as_list(indexes[start:]), as_list(outcomes[start:])))
+
+    def clear(self) -> None:
+        """
+        Drop every record.
+        """
+        self.records.clear()
+
+    def rows(self) -> list[list[str]]:
+        """
+        Get the records as table rows.
+
+        Returns:
+            list[list[str]]: Rows with the address, tag, index and outcome name.
+        """
+        return [[str(address), str(tag), str(index), OUTCOME_NAMES[outcome]] for address, tag, index, outcome in self.records]
+
+    def to_csv(self) -> str:
+        """
+        Get the records in the CSV log format.
+
+        Returns:
+            str: One "address,tag,index,outcome name" line per record.
+        """
+        output = io.StringIO()
+        output.writelines("{},{},{},{}\n".format(*row) for row in self.rows())
+        return output.getvalue()
+
+# Access log file formats
+LOG_FORMATS = {"csv": CsvAccessLog, "bin": BinaryAccessLog, "npy": ColumnarAccessLog}
+
+def open_access_log(file_path: str, log_format: str = "csv", buffer_size: int = BUFFER_SIZE) -> AccessLog:
+    """
+    Open an access log file sink.
+
+    Args:
+        file_path (str): Path to the log file (to the directory of the columns for "npy").
+        log_format (str): "csv", "bin" or "npy". OPTIONAL. Default is "csv".
+        buffer_size (int): Size of the write buffer in bytes. OPTIONAL.
+    Returns:
+        AccessLog: The access log sink.
+    """
+    if log_format not in LOG_FORMATS:
+        out_message = "Log format: {} is not supported, use one of {}."
+        raise Exception(out_message.format(log_format, ", ".join(LOG_FORMATS)))
+
+    return LOG_FORMATS[log_format](file_path, buffer_size)
+
+def read_binary_log(file_path: str) -> np.ndarray:
+    """
+    Read a binary access log.
+
+    Args:
+        file_path (str): Path to the log file.
+    Returns:
+        np.ndarray: Structured array with the address, tag, index and outcome fields.
+    """
+    return np.fromfile(file_path, dtype=BINARY_RECORD_DTYPE)
+
+def column_path(file_path: str, name: str) -> str:
+    """
+    Get the path to a column of a columnar access log.
+
+    Args:
+        file_path (str): Path to the directory of the log.
+        name (str): Name of the column (see COLUMN_DTYPES).
+    Returns:
+        str: Path to the .npy file of the column.
+    """
+    return os.path.join(file_path, name + ".npy")
+
+def write_column_header(file: io.BufferedIOBase, dtype: np.dtype, count: int) -> None:
+    """
+    Write the .npy header of a column. Its size does not depend on the count, so it can be rewritten in place.
+
+    Args:
+        file (io.BufferedIOBase): Column file, at its start.
+        dtype (np.dtype): Type of the column.
+        count (int): Number of records in the column.
+    """
+    np.lib.format.write_array_header_1_0(file, {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (count,)})
+
+def read_columnar_log(file_path: str) -> dict[str, np.ndarray]:
+    """
+    Memory-map a columnar access log.
+
+    Args:
+        file_path (str): Path to the directory of the log.
+    Returns:
+        dict[str, np.ndarray]: Read-only address, tag, index (uint32) and outcome (uint8) columns.
+    """
+    if not os.path.isdir(file_path):
+        out_message = "Access log: {} is not a columnar log directory."
+        raise Exception(out_message.format(file_path))
+
+    # The length comes from the headers, a log still being written shows the records of its last flush
+    return {name: np.load(column_path(file_path, name), mmap_mode="r") for name in COLUMN_DTYPES}
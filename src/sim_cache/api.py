@@ -0,0 +1,187 @@
+"""
+File: api.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Library API, to embed the simulator without temporary files. The trace can be a path, the content of
+             a trace file already in memory (bytes, bytearray, memoryview), an array of addresses or an opened binary
+             file (any file-like object, an upload stream for example), and the result is a SimulationResult object
+             instead of the formatted output, no report file is written.
+             Content in memory is decoded in place (see read_buffer), so a raw trace is never copied. A file-like
+             object is used through its buffer when it has one (io.BytesIO), and otherwise read and simulated one
+             chunk at a time when the simulation does not need the whole trace (no OPT substitution, no sampling).
+             Example:
+                from sim_cache.api import simulate
+                result = simulate(trace_bytes, nsets=256, bsize=4, assoc=2, subs_method="L")
+                print(result.hit_rate, result.conflict_misses)
+"""
+
+import os
+from typing import BinaryIO, Iterator
+
+import numpy as np
+
+from .access_log import AccessLog
+from .cache import Cache
+from .file_reader import CHUNK_SIZE, read_buffer, read_file, read_file_chunks
+from .policies import POLICIES
+from .progress import Progress
+from .sampling import SampledCache, choose_ratio
+from .text_trace import SNIFF_SIZE
+from .trace_format import COMPRESSIONS, buffer_kind
+
+# Everything a trace can be given as
+TraceSource = str | os.PathLike | bytes | bytearray | memoryview | np.ndarray | BinaryIO
+
+# Rates of a simulation, in the order of the output
+RATE_NAMES = ("hit_rate", "miss_rate", "compulsory_miss_rate", "capacity_miss_rate", "conflict_miss_rate")
+
+class SimulationResult:
+    def __init__(self, statistics: dict, report: str) -> None:
+        # Configuration
+        self.nsets = statistics["nsets"]
+        self.bsize = statistics["bsize"]
+        self.assoc = statistics["assoc"]
+        self.subs_method = statistics["subs_method"]
+
+        # Counters, estimated for the whole trace when only a sample of the sets was simulated
+        self.total_accesses = statistics["total_accesses"]
+        self.hits = statistics["hits"]
+        self.total_misses = statistics["total_misses"]
+        self.compulsory_misses = statistics["compulsory_misses"]
+        self.capacity_misses = statistics["capacity_misses"]
+        self.conflict_misses = statistics["conflict_misses"]
+
+        # Rates
+        self.hit_rate = statistics["hit_rate"]
+        self.miss_rate = statistics["miss_rate"]
+        self.compulsory_miss_rate = statistics["compulsory_miss_rate"]
+        self.capacity_miss_rate = statistics["capacity_miss_rate"]
+        self.conflict_miss_rate = statistics["conflict_miss_rate"]
+
+        # Sampling ratio (1 for an exact simulation), and half-width of the 95 % interval of each rate (0 when exact,
+        # None for the approximate capacity/conflict split of a sample)
+        self.sample_ratio = statistics.get("sample_ratio", 1)
+        self.errors = {name: statistics.get(name + "_error", 0.0) for name in RATE_NAMES}
+
+        # Free format report, and the whole row of statistics
+        self.report = report
+        self.statistics = statistics
+
+    def to_dict(self) -> dict:
+        """
+        Get the result as a row of configuration, counters and rates (see Cache.get_statistics).
+
+        Returns:
+            dict: Statistics of the simulation.
+        """
+        return dict(self.statistics)
+
+    def __repr__(self) -> str:
+        return "SimulationResult({} {} {} {}: {} accesses, hit rate {})".format(
+            self.nsets, self.bsize, self.assoc, self.subs_method, self.total_accesses, self.hit_rate
+        )
+
+def read_trace(source: TraceSource) -> np.ndarray:
+    """
+    Get the addresses of a trace, whatever it is given as.
+
+    Args:
+        source (TraceSource): Path to a trace file, content of a trace file (bytes, bytearray, memoryview, decoded
+            in place), array of addresses (any integer dtype) or opened binary file (its buffer is used when it has one).
+    Returns:
+        np.ndarray: Array with the addresses (a view of the source when possible).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return read_file(os.fspath(source))
+
+    if isinstance(source, np.ndarray):
+        if not np.issubdtype(source.dtype, np.integer):
+            out_message = "Trace: an array of addresses needs an integer dtype, not {}."
+            raise Exception(out_message.format(source.dtype))
+        return source if source.dtype in (np.uint32, np.dtype(">u4")) else source.astype(np.uint32)
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return read_buffer(source)
+
+    if hasattr(source, "getbuffer"):
+        return read_buffer(source.getbuffer()[source.tell():])
+    if hasattr(source, "read"):
+        return read_buffer(source.read())
+
+    out_message = "Trace: can not read a trace from {}."
+    raise Exception(out_message.format(type(source).__name__))
+
+def trace_chunks(file: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """
+    Read an opened trace one chunk at a time, decompressing it if needed.
+    Delta traces and files that can not be peeked into (no peek, not seekable) are read whole.
+
+    Args:
+        file (BinaryIO): Opened binary file.
+        chunk_size (int): Number of addresses per chunk. OPTIONAL. Default is CHUNK_SIZE.
+    Yields:
+        np.ndarray: Array with at most chunk_size addresses.
+    """
+    if hasattr(file, "peek"):
+        head = file.peek(SNIFF_SIZE)[:SNIFF_SIZE]
+    elif hasattr(file, "seekable") and file.seekable():
+        position = file.tell()
+        head = file.read(SNIFF_SIZE)
+        file.seek(position)
+    else:
+        head = None
+
+    kind = buffer_kind(head) if head is not None else None
+    if kind in ("gz", "bz2", "xz"):
+        with COMPRESSIONS["." + kind](file, "rb") as decompressed:
+            yield from read_file_chunks(decompressed, chunk_size)
+    elif kind in ("text", "raw"):
+        yield from read_file_chunks(file, chunk_size)
+    else:
+        addresses = read_buffer(file.read())
+        for start in range(0, len(addresses), chunk_size):
+            yield addresses[start:start + chunk_size]
+
+def simulate(source: TraceSource, nsets: int, bsize: int, assoc: int, subs_method: str = "L", seed: int = None, access_log: AccessLog = None, sample_ratio: int = 1, target_error: float = None, workers: int = None, chunk_size: int = CHUNK_SIZE, progress: Progress = None) -> SimulationResult:
+    """
+    Simulate a cache over a trace and return its statistics, without writing any file.
+
+    Args:
+        source (TraceSource): Trace to simulate (see read_trace). An opened file without a buffer is streamed when the
+            simulation does not need the whole trace.
+        nsets (int): Number of sets for the cache
+        bsize (int): Block size for the cache
+        assoc (int): Associativity for the cache
+        subs_method (str): Replacement policy for the cache (see sim_cache/policies.py). OPTIONAL. Default is L.
+        seed (int): Seed for the random substitution. OPTIONAL. Default is None (draw one).
+        access_log (AccessLog): Sink for the per-access log. OPTIONAL. Default is None (no log).
+        sample_ratio (int): Simulate 1 in this many sets and estimate the rates (see sampling.py). OPTIONAL. Default is 1.
+        target_error (float): Pick the sampling ratio for this miss rate error instead. OPTIONAL. Default is None.
+        workers (int): Split the sets between this many worker processes. OPTIONAL. Default is None (no workers).
+        chunk_size (int): Number of addresses per chunk when streaming. OPTIONAL. Default is CHUNK_SIZE.
+        progress (Progress): Report the running statistics while simulating. OPTIONAL. Default is None (no reports).
+    Returns:
+        SimulationResult: Counters, rates and report of the simulation.
+    """
+    if subs_method not in POLICIES:
+        out_message = "Simulate: subs_method {} needs to be one of {}."
+        raise Exception(out_message.format(subs_method, ", ".join(POLICIES)))
+
+    # Approximate mode, a sample of the sets
+    if sample_ratio > 1 or target_error is not None:
+        memory_address = read_trace(source)
+        if target_error is not None:
+            sample_ratio = choose_ratio(memory_address, nsets, bsize, assoc, subs_method, target_error, seed)
+        cache = SampledCache(nsets, bsize, assoc, subs_method, 1, None, sample_ratio, access_log=access_log, seed=seed)
+        cache.process_trace(memory_address, progress)
+        return SimulationResult(cache.get_statistics(), cache.get_report())
+
+    cache = Cache(nsets, bsize, assoc, subs_method, access_log=access_log, seed=seed)
+    streamed = hasattr(source, "read") and not hasattr(source, "getbuffer")
+    if streamed and workers is None and not cache.needs_next_use():
+        cache.process_stream(trace_chunks(source, chunk_size), chunk_size, progress)
+    elif workers is not None and workers > 1:
+        cache.simulate_partitioned(read_trace(source), workers)
+    else:
+        cache.process_trace(read_trace(source), progress)
+    return SimulationResult(cache.get_statistics(), cache.get_report())
@@ -7,17 +7,36 @@ Description: Cache core class for processing data and saving data structure.
 
 from collections import deque
 from math import log2, pow
+from random import getrandbits
+from typing import Iterable
+
+import numpy as np
+
+from .access_log import AccessLog
 from .cache_set import CacheSet
+from .file_reader import CHUNK_SIZE, address_chunks
+from .optimal import next_use
+from .outcome import CAPACITY_MISS, COMPULSORY_MISS, CONFLICT_MISS, HIT, OUTCOME_NAMES
+from .progress import Progress
 
 class Cache:
-    def __init__(self, nsets: int, bsize: int, ways: int, subs_method: str, output_flag: int, input_file: str, debug_var: bool = False):
+    __slots__ = (
+        "nsets", "bsize", "ways", "subs_method", "output_flag", "input_file",
+        "compulsory_misses", "capacity_misses", "conflict_misses", "total_misses", "memory_access_hit", "total_accesses",
+        "hit_rate", "miss_rate", "compulsory_miss_rate", "capacity_miss_rate", "conflict_miss_rate",
+        "debug_var", "access_log", "seed", "classify",
+        "number_of_blocks", "n_bits_offset", "n_bits_indice", "n_bits_tag", "cache_size", "real_cache_size",
+        "cache_set",
+    )
+
+    def __init__(self, nsets: int, bsize: int, ways: int, subs_method: str, output_flag: int = 1, input_file: str = None, debug_var: bool = False, access_log: AccessLog = None, seed: int = None, classify: bool = True):
         # Cache parameters
         self.nsets = nsets
         self.bsize = bsize
         self.ways = ways
         self.subs_method = subs_method
         self.output_flag = output_flag
-        self.input_file = input_file
+        self.input_file = input_file    # Only for the debug output, None for traces in memory
 
         # Misses counters
         self.compulsory_misses = 0
@@ -42,6 +61,15 @@ class Cache:
         # Custom flags
         self.debug_var = debug_var
 
+        # Per-access log sink (None disables the log)
+        self.access_log = access_log
+
+        # Seed for the random substitution, None draws one
+        self.seed = seed
+
+        # Classify the misses (compulsory, capacity, conflict), or just count them as misses
+        self.classify = classify
+
         # Cache calculated parameters
         self.number_of_blocks = self.nsets * self.ways
         self.n_bits_offset = int(log2(self.bsize))
@@ -53,89 +81,256 @@ class Cache:
         self.real_cache_size = ((self.n_bits_tag + 1 + (self.bsize * 8)) * self.nsets * self.ways) / 8
 
         # Cache structure
-        self.cache_set: CacheSet = CacheSet(self.number_of_blocks, self.bsize, self.nsets, self.ways, self.subs_method)
+        self.cache_set: CacheSet = CacheSet(self.number_of_blocks, self.bsize, self.nsets, self.ways, self.subs_method, self.seed, self.classify)
     
-    def simulate_cache(self, memory_address_byte: list[bytes], memory_address_int: list[int]) -> str:
+    def simulate_cache(self, memory_address: np.ndarray, workers: int = None, progress: Progress = None) -> str:
         """
         Simulate the cache and return some statistics. (Can simulate direct-mapped, fully associative and multi-way set associative)
 
         Args:
-            memory_address_byte (list[bytes]): List of bytes with the memory address.
-            memory_address_int (list[int]): List of integers with the memory address.
+            memory_address (np.ndarray): Array (or any sequence) of integers with the memory addresses, as returned by read_file.
+            workers (int): Split the sets between this many worker processes. OPTIONAL. Default is None (no workers).
+                The cache structure of this object is not updated by the workers, only the counters.
+            progress (Progress): Report the running statistics while simulating. OPTIONAL. Default is None (no reports).
+                With workers, only the final statistics are reported.
         Returns:
-            list[int]: List of integers with the cache request.
+            str: Output for the cache simulation. Depends on the output_flag.
         """
-        
-        for address in memory_address_int:
-            # Get the tag and index from the address
-            tag = address >> int(self.n_bits_offset + self.n_bits_indice)
-            index = (address >> self.n_bits_offset) & int(pow(2, self.n_bits_indice) -1)
-
-            # Check the memory access and update the cache set
-            result = self.cache_set.check_memory_access(index, tag)
-            # Update the counters
-            if result == "Hit":
-                self.memory_access_hit += 1
-            elif result == "Compulsory miss":
-                self.compulsory_misses += 1
-            elif result == "Conflict miss":
-                self.conflict_misses += 1
-            elif result == "Capacity miss":
-                self.capacity_misses += 1
-                  
-            # Update the total accesses
-            self.total_accesses += 1
-
-            # Save on Log soo can be used later if wanted to interface log
-            #if self.debug_var:
-            self.save_on_log("{},{},{},{}".format(address, tag, index, result))
-        
+
+        if workers is not None and workers > 1:
+            if progress is not None:
+                progress.start()
+            self.simulate_partitioned(memory_address, workers)
+            if progress is not None:
+                progress.update(self, final=True)
+        else:
+            self.process_trace(memory_address, progress)
+
         # Return the output
         return self.get_output()
-    
-    def save_on_log(self, message: str) -> None:
+
+    def simulate_stream(self, memory_address: Iterable, chunk_size: int = CHUNK_SIZE, progress: Progress = None) -> str:
+        """
+        Simulate the cache over a stream of addresses, one chunk at a time, and return some statistics.
+        The memory used does not depend on the length of the stream.
+
+        Args:
+            memory_address (Iterable): Iterable of addresses, address arrays or raw big-endian buffers (see address_chunks).
+            chunk_size (int): Maximum number of addresses simulated per chunk.
+            progress (Progress): Report the running statistics while simulating. OPTIONAL. Default is None (no reports).
+        Returns:
+            str: Output for the cache simulation. Depends on the output_flag.
+        """
+
+        self.process_stream(memory_address, chunk_size, progress)
+
+        # Return the output
+        return self.get_output()
+
+    def process_stream(self, memory_address: Iterable, chunk_size: int = CHUNK_SIZE, progress: Progress = None) -> None:
+        """
+        Simulate a stream of addresses, one chunk at a time, and update the counters.
+
+        Args:
+            memory_address (Iterable): Iterable of addresses, address arrays or raw big-endian buffers (see address_chunks).
+            chunk_size (int): Maximum number of addresses simulated per chunk.
+            progress (Progress): Report the running statistics while simulating. OPTIONAL. Default is None (no reports).
+        """
+
+        if self.needs_next_use():
+            raise Exception("The {} substitution needs the whole trace ahead, it can not be used in stream mode.".format(self.cache_set.policy.name))
+
+        if progress is None:
+            for chunk in address_chunks(memory_address, chunk_size):
+                self.process_chunk(chunk)
+        else:
+            progress.start()
+            for chunk in address_chunks(memory_address, min(chunk_size, progress.every)):
+                self.process_chunk(chunk)
+                progress.update(self)
+            progress.update(self, final=True)
+
+    def process_trace(self, memory_address: np.ndarray, progress: Progress = None) -> None:
+        """
+        Simulate a whole trace, one chunk at a time, and update the counters.
+
+        Args:
+            memory_address (np.ndarray): Array (or any sequence) of integers with the memory addresses.
+            progress (Progress): Report the running statistics while simulating. OPTIONAL. Default is None (no reports).
+        """
+
+        # The OPT substitution looks ahead in the trace
+        if self.needs_next_use():
+            self.set_next_use(next_use(memory_address, self.bsize))
+
+        if progress is None:
+            for start in range(0, len(memory_address), CHUNK_SIZE):
+                self.process_chunk(memory_address[start:start + CHUNK_SIZE])
+        else:
+            # Smaller chunks, so the reports are not too far apart
+            step = min(CHUNK_SIZE, progress.every)
+            progress.start()
+            for start in range(0, len(memory_address), step):
+                self.process_chunk(memory_address[start:start + step])
+                progress.update(self)
+            progress.update(self, final=True)
+
+    def simulate_partitioned(self, memory_address: np.ndarray, workers: int) -> None:
+        """
+        Simulate the cache with the sets split between worker processes, and merge the counters.
+        The random substitution uses a stream for each set (from a seed drawn once if no seed was given), so the
+        result does not depend on the number of workers.
+
+        Args:
+            memory_address (np.ndarray): Array of integers with the memory addresses.
+            workers (int): Number of worker processes.
+        """
+        from .parallel import simulate_partitioned
+
+        if self.access_log is not None:
+            raise Exception("The access log needs the accesses in order, it can not be used with workers.")
+
+        if self.cache_set.policy.needs_next_use:
+            raise Exception("The {} substitution needs the next-use index in order, it can not be used with workers.".format(self.cache_set.policy.name))
+
+        if self.seed is None:
+            self.seed = getrandbits(32)
+
+        config = (self.nsets, self.bsize, self.ways, self.subs_method, self.seed)
+        counts = simulate_partitioned(config, memory_address, self.n_bits_offset, self.n_bits_indice, workers, self.classify)
+
+        # Update the counters
+        self.memory_access_hit += counts[HIT]
+        self.compulsory_misses += counts[COMPULSORY_MISS]
+        self.capacity_misses += counts[CAPACITY_MISS]
+        self.conflict_misses += counts[CONFLICT_MISS]
+        self.total_accesses += len(memory_address)
+
+    def process_chunk(self, memory_address: np.ndarray) -> list[int]:
         """
-        Save a message on a log file.
+        Simulate a chunk of memory accesses and update the counters.
 
         Args:
-            message (str): Message to save on the log file.
+            memory_address (np.ndarray): Array (or any sequence) of integers with the memory addresses.
         Returns:
+            list[int]: Outcome code of each access (see outcome.py).
         """
-        with open("log.txt", "a") as file:
-            file.write(message + "\n")
 
-    def get_output(self) -> str:
+        # Get the tags and indexes from the addresses, all at once
+        addresses = np.asarray(memory_address).astype(np.int64)
+        tag_array = addresses >> (self.n_bits_offset + self.n_bits_indice)
+        index_array = (addresses >> self.n_bits_offset) & int(pow(2, self.n_bits_indice) - 1)
+
+        # Direct-mapped, the whole chunk is checked with array operations
+        if self.ways == 1:
+            outcomes = self.cache_set.check_direct_mapped(index_array, tag_array)
+            counts = np.bincount(outcomes, minlength=len(OUTCOME_NAMES)).tolist()
+            results = outcomes.tolist()
+        else:
+            # Outcome counters for the chunk, indexed by outcome code
+            counts = [0] * len(OUTCOME_NAMES)
+            results = []
+            check_memory_access = self.cache_set.check_memory_access
+
+            for tag, index in zip(tag_array.tolist(), index_array.tolist()):
+                # Check the memory access and update the cache set
+                result = check_memory_access(index, tag)
+                counts[result] += 1
+                results.append(result)
+
+        # Update the counters
+        self.memory_access_hit += counts[HIT]
+        self.compulsory_misses += counts[COMPULSORY_MISS]
+        self.capacity_misses += counts[CAPACITY_MISS]
+        self.conflict_misses += counts[CONFLICT_MISS]
+
+        # Update the total accesses
+        self.total_accesses += len(results)
+
+        # Save the whole chunk on the log, if any
+        if self.access_log is not None:
+            self.access_log.write_chunk(addresses, tag_array, index_array, results)
+
+        return results
+
+    def set_next_use(self, next_use: np.ndarray) -> None:
+        """
+        Set the next-use index of the trace for the OPT substitution, computed once per trace and block size
+        (see optimal.py and TraceCache.load_next_use). The next access simulated is the first one of the index.
+
+        Args:
+            next_use (np.ndarray): Position of the next access to the same block, for each access.
+        Returns:
+        """
+        self.cache_set.policy.set_next_use(next_use)
+
+    def needs_next_use(self) -> bool:
+        """
+        Check if the replacement policy looks ahead in the trace and its next-use index is not set yet.
+
+        Args:
+        Returns:
+            bool: True if the next-use index is missing.
+        """
+        # With one way per set there is no victim to choose
+        policy = self.cache_set.policy
+        return policy.needs_next_use and policy.next_use is None and self.ways > 1
+
+    def reset_counters(self) -> None:
+        """
+        Reset the counters, keeping the cache structure (the end of a warm-up).
+
+        Args:
+        Returns:
+        """
+        self.compulsory_misses = 0
+        self.capacity_misses = 0
+        self.conflict_misses = 0
+        self.total_misses = 0
+        self.memory_access_hit = 0
+        self.total_accesses = 0
+
+    def get_output(self, report_file: str = "report.txt") -> str:
         """
         Get the output for the cache simulation.
         
         Args:
+            report_file (str): Path to the report file. OPTIONAL. Default is report.txt.
         Returns:
             str: Output for the cache simulation. Depends on the output_flag.
         """
 
-        self.set_cache_statistics()
-
-        
         # custom stats
-        stats = "Total accesses: {}\nHit rate: {} %\nMiss rate: {} %\nCompulsory miss rate: {} %\nCapacity miss rate: {} %\nConflict miss rate: {} %\nConflict misses: {}\nCompulsory misses:{}\nCapacity misses: {}\nTotal misses: {}".format(
-                self.total_accesses, 
-                self.hit_rate * 100, 
-                self.miss_rate * 100, 
-                self.compulsory_miss_rate * 100, 
-                self.capacity_miss_rate * 100, 
-                self.conflict_miss_rate * 100,
-                self.conflict_misses,
-                self.compulsory_misses,
-                self.capacity_misses,
-                self.total_misses
-            )
+        stats = self.get_report()
 
         # Write one folder up the report file with Stats
-        with open("report.txt", "w") as file:
+        with open(report_file, "w") as file:
             file.write(stats)
 
         if self.output_flag == 0:
-            return "Total accesses: {}\nHit rate: {} %\nMiss rate: {} %\nCompulsory miss rate: {} %\nCapacity miss rate: {} %\nConflict miss rate: {} %\nConflict misses: {}\nCompulsory misses:{}\nCapacity misses: {}\nTotal misses: {}".format(
+            return stats
+        elif self.output_flag == 1:
+            return "{}, {}, {}, {}, {}, {}".format(
+                self.total_accesses, 
+                self.hit_rate, 
+                self.miss_rate, 
+                self.compulsory_miss_rate, 
+                self.capacity_miss_rate, 
+                self.conflict_miss_rate
+            )
+
+    def get_report(self) -> str:
+        """
+        Get the report (free format statistics) for the cache simulation, without writing the report file.
+
+        Args:
+        Returns:
+            str: Report for the cache simulation.
+        """
+
+        self.set_cache_statistics()
+
+        return "Total accesses: {}\nHit rate: {} %\nMiss rate: {} %\nCompulsory miss rate: {} %\nCapacity miss rate: {} %\nConflict miss rate: {} %\nConflict misses: {}\nCompulsory misses:{}\nCapacity misses: {}\nTotal misses: {}".format(
                 self.total_accesses, 
                 self.hit_rate * 100, 
                 self.miss_rate * 100, 
@@ -147,16 +342,7 @@ class Cache:
                 self.capacity_misses,
                 self.total_misses
             )
-        elif self.output_flag == 1:
-            return "{}, {}, {}, {}, {}, {}".format(
-                self.total_accesses, 
-                self.hit_rate, 
-                self.miss_rate, 
-                self.compulsory_miss_rate, 
-                self.capacity_miss_rate, 
-                self.conflict_miss_rate
-            )
-    
+
     def set_cache_statistics(self) -> None:
         """
         Set the cache statistics for the cache simulation.
@@ -164,17 +350,45 @@ class Cache:
         Args:
         Returns:
         """
-        self.total_misses = self.compulsory_misses + self.capacity_misses + self.conflict_misses
+        self.total_misses = self.total_accesses - self.memory_access_hit
+        # A cache without accesses (a split level no address is routed to) has 0 rates, not a miss rate of 1
         if (self.total_accesses != 0):
             self.hit_rate = round(self.memory_access_hit / self.total_accesses, 4)
-        
-        self.miss_rate = round(1 - self.hit_rate, 4)
+            self.miss_rate = round(1 - self.hit_rate, 4)
 
         if (self.total_misses != 0):
             self.compulsory_miss_rate = round(self.compulsory_misses / self.total_misses, 4)
             self.capacity_miss_rate = round(self.capacity_misses / self.total_misses, 4)
             self.conflict_miss_rate = round(self.conflict_misses / self.total_misses, 4)
 
+    def get_statistics(self) -> dict:
+        """
+        Get the cache statistics as a row of counters and rates, without writing the report file.
+
+        Args:
+        Returns:
+            dict: Configuration, counters and rates of the cache simulation.
+        """
+        self.set_cache_statistics()
+
+        return {
+            "nsets": self.nsets,
+            "bsize": self.bsize,
+            "assoc": self.ways,
+            "subs_method": self.subs_method,
+            "total_accesses": self.total_accesses,
+            "hits": self.memory_access_hit,
+            "total_misses": self.total_misses,
+            "compulsory_misses": self.compulsory_misses,
+            "capacity_misses": self.capacity_misses,
+            "conflict_misses": self.conflict_misses,
+            "hit_rate": self.hit_rate,
+            "miss_rate": self.miss_rate,
+            "compulsory_miss_rate": self.compulsory_miss_rate,
+            "capacity_miss_rate": self.capacity_miss_rate,
+            "conflict_miss_rate": self.conflict_miss_rate,
+        }
+
     def debug(self) -> None:
         """
         Print cache informations for debug purposes. Just when the debug flag is set to True.
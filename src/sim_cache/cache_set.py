@@ -3,27 +3,50 @@ File: cache_set.py
 Author: Gustavo Pereira
 Date: February 4, 2024
 Description: Cache set class for processing data and saving data structure.
+             The state of every set lives in flat arrays of nsets x ways entries (set index major):
+             a tag matrix, a valid matrix and the replacement metadata.
+             A block -> way index keeps hits and fills O(1), whatever the associativity. The replacement metadata
+             and the victim selection belong to the replacement policy of the cache (see policies.py), which is
+             told about every hit, fill and invalidation.
+             Misses are classified with the 3C model: compulsory on the first access to a block, conflict when
+             a fully associative LRU cache of the same size (the shadow) would hit, capacity otherwise.
+             For the levels of a hierarchy (see hierarchy.py), a block can also be invalidated (the freed way is
+             filled before any replacement), inserted without an access, or looked up without a fill, and the
+             replaced blocks can be collected.
+             A direct-mapped cache (one way per set) checks a whole chunk of accesses at once with array operations
+             (see check_direct_mapped): an access hits exactly when the previous access to its set had the same tag.
 """
 
-from collections import deque
-from random import randint
+from collections import OrderedDict
 
-from math import log2, pow
-from .block import Block
+import numpy as np
+
+from .outcome import CAPACITY_MISS, COMPULSORY_MISS, CONFLICT_MISS, HIT, MISS
+from .policies import create_policy
 
 class CacheSet:
-    def __init__(self, number_of_blocks: int, bsize:int, nsets: int, ways: int, subs_method: str ) -> None:
+    __slots__ = (
+        "number_of_blocks", "nsets", "ways", "subs_method", "bsize", "seed",
+        "block_tag", "block_valid", "set_fill", "resident", "policy", "on_hit", "on_fill", "free_ways",
+        "classify", "shadow", "seen", "occupied_blocks", "victims",
+    )
+
+    def __init__(self, number_of_blocks: int, bsize:int, nsets: int, ways: int, subs_method: str, seed: int = None, classify: bool = True) -> None:
         # Cache parameters
         self.number_of_blocks = number_of_blocks
         self.nsets = nsets              # Number of sets for the cache (blocks)
         self.ways = ways                # Number of ways in the set (associativity)
         self.subs_method = subs_method
-        self.cache_set: list[Block] = []
         self.bsize = bsize
+        self.seed = seed                # Seed for the random substitution, None draws one
+        self.classify = classify        # Classify the misses, or report them all as MISS
 
         # Cache counters
         self.occupied_blocks = 0
 
+        # Replaced blocks (tag * nsets + index), in order, None to not collect them
+        self.victims: list[int] | None = None
+
         # Cache startup
         self.start_cache_set()
 
@@ -31,10 +54,30 @@ class CacheSet:
         """
         Start the cache set with the initial values.
         """
-        for i in range(self.nsets):
-            self.cache_set.append(Block(self.bsize, self.ways, self.subs_method))
+        size = self.nsets * self.ways
+
+        # Set structure, the entry of a way is at index * ways + way
+        self.block_tag: list[int] = [-1] * size             # Tag matrix (-1 never matches a tag)
+        self.block_valid = bytearray(size)                  # Valid matrix
+        self.set_fill: list[int] = [0] * self.nsets         # Valid ways per set (ways are filled in order)
+
+        # Block (tag * nsets + index) -> position of its way
+        self.resident: dict[int, int] = {}
+
+        # Replacement policy, and its hit and fill hooks (None when they do not change its metadata)
+        self.policy = create_policy(self.subs_method, self.nsets, self.ways, self.seed)
+        self.on_hit = self.policy.access if self.policy.tracks_hits else None
+        self.on_fill = self.policy.fill if self.policy.tracks_fills else None
+
+        # Set index -> positions of the invalidated ways of the set
+        self.free_ways: dict[int, list[int]] = {}
+
+        # 3C structure, fully associative LRU shadow of number_of_blocks blocks (least recently used first)
+        # and every block accessed so far
+        self.shadow: OrderedDict | None = OrderedDict() if self.classify else None
+        self.seen: set[int] = set()
     
-    def check_memory_access(self, index: int, tag: int) -> str:
+    def check_memory_access(self, index: int, tag: int) -> int:
         """
         Check the memory access and update the cache set.
         
@@ -42,96 +85,325 @@ class CacheSet:
             index (int): Index of the block in the cache set.
             tag (int): Tag of the block in the cache set.
         Return:
-            str: Hit or Compulsory miss or Capacity miss or Conflict miss.
+            int: Outcome code, HIT or COMPULSORY_MISS or CAPACITY_MISS or CONFLICT_MISS (see outcome.py).
+                MISS when the misses are not classified.
         """
 
-        # Block being accessed
-        block = self.cache_set[index]
-        
+        block = tag * self.nsets + index
+
+        # Update the shadow with every access
+        shadow = self.shadow
+        if shadow is not None:
+            shadow_hit = block in shadow
+            if shadow_hit:
+                shadow.move_to_end(block)
+            else:
+                shadow[block] = None
+                if len(shadow) > self.number_of_blocks:
+                    shadow.popitem(last=False)
 
+        # Check if the block is in the set
+        slot = self.resident.get(block)
+        if slot is not None:
+            # Record the hit for the replacement policy
+            on_hit = self.on_hit
+            if on_hit is not None:
+                on_hit(index, slot)
+            return HIT
 
-        # Check if the block has any valid bit set to 1
-        if block.block_valid.count(1) >= 1:
-            # Check if the tag is in the block
-            if tag in block.block_tag:
-                # Record access for LRU
-                block.record_access(block.block_tag.index(tag))
-                return "Hit"
-
-        # If there is any valid bit set to 0 in the block, we have a compulsory miss
-        if block.block_valid.count(0) >= 1:
-            # Get the first way with valid bit set to 0
-            for i in range(self.ways):
-                if block.block_valid[i] == 0:
-                    block.block_valid[i] = 1
-                    block.block_tag[i] = tag
-                    self.occupied_blocks += 1
-                    # Record access for LRU
-                    block.record_access(i)
-                    return "Compulsory miss"
-
-        # Check if block is full (if all valid bits are set to 1, we have a capacity miss)
-        if self.occupied_blocks == self.number_of_blocks:
-            result = "Capacity miss"
-        # If the block is not full, we have a conflict miss
+        # If there is any invalid way in the set, fill it
+        fill = self.set_fill[index]
+        if fill < self.ways:
+            # The first invalid way is right after the valid ones
+            slot = index * self.ways + fill
+            self.block_valid[slot] = 1
+            self.block_tag[slot] = tag
+            self.resident[block] = slot
+            self.set_fill[index] = fill + 1
+            self.occupied_blocks += 1
+            # Record the fill for the replacement policy
+            on_fill = self.on_fill
+            if on_fill is not None:
+                on_fill(index, slot)
+        # Otherwise reuse an invalidated way, or replace a block with the substitution method
         else:
-            self.substitution(index, tag)
-            result = "Conflict miss"
-        
-        # Replace the block with the substitution method
-        self.substitution(index, tag)
-        return result
+            self.replace(index, tag, block)
 
-    def substitution(self, index:int, tag: int) -> None:
+        # Classify the miss
+        if shadow is None:
+            return MISS
+        # The fully associative cache would hit, we have a conflict miss
+        if shadow_hit:
+            return CONFLICT_MISS
+        # The block was accessed before, we have a capacity miss
+        if block in self.seen:
+            return CAPACITY_MISS
+        # First access to the block, we have a compulsory miss
+        self.seen.add(block)
+        return COMPULSORY_MISS
+
+    def check_direct_mapped(self, index: np.ndarray, tag: np.ndarray) -> np.ndarray:
+        """
+        Check a chunk of memory accesses of a direct-mapped cache (one way per set) at once, with array operations.
+        The outcomes, the set structure, the shadow and the blocks seen are the same as checking the accesses one
+        at a time with check_memory_access. The replacement policy is not told about them, with one way per set
+        there is no victim to choose.
+
+        Args:
+            index (np.ndarray): int64 array with the index of each block in the cache set.
+            tag (np.ndarray): int64 array with the tag of each block in the cache set.
+        Return:
+            np.ndarray: uint8 array with the outcome code of each access (see outcome.py).
+        """
+        n = len(index)
+        if n == 0:
+            return np.empty(0, dtype=np.uint8)
+        block = tag * self.nsets + index
+
+        # Group the accesses by set, keeping their order
+        order = np.argsort(index, kind="stable")
+        set_index = index[order]
+        set_tag = tag[order]
+        first = np.ones(n, dtype=np.bool_)
+        first[1:] = set_index[1:] != set_index[:-1]
+        last = np.ones(n, dtype=np.bool_)
+        last[:-1] = first[1:]
+
+        # An access hits when the access before it in its set (or the block in the set) has the same tag
+        previous = np.empty(n, dtype=np.int64)
+        previous[1:] = set_tag[:-1]
+        block_tag = self.block_tag
+        previous[first] = [block_tag[slot] for slot in set_index[first].tolist()]
+        hit = np.empty(n, dtype=np.bool_)
+        hit[order] = set_tag == previous
+
+        # Classify the misses
+        if self.shadow is None:
+            outcomes = np.where(hit, HIT, MISS).astype(np.uint8)
+        else:
+            shadow_hit = self.shadow_hits(block)
+            seen = self.seen_before(block)
+            outcomes = np.select([hit, shadow_hit, seen], [HIT, CONFLICT_MISS, CAPACITY_MISS], COMPULSORY_MISS).astype(np.uint8)
+
+        # Leave the last block of each set in it
+        block_valid = self.block_valid
+        resident = self.resident
+        for slot, new_tag in zip(set_index[last].tolist(), set_tag[last].tolist()):
+            old_tag = block_tag[slot]
+            if old_tag == new_tag:
+                continue
+            if block_valid[slot]:
+                del resident[old_tag * self.nsets + slot]
+            else:
+                block_valid[slot] = 1
+                self.set_fill[slot] = 1
+                self.occupied_blocks += 1
+                if self.free_ways:
+                    self.free_ways.pop(slot, None)
+            block_tag[slot] = new_tag
+            resident[new_tag * self.nsets + slot] = slot
+
+        return outcomes
+
+    def shadow_hits(self, block: np.ndarray) -> np.ndarray:
+        """
+        Check a chunk of blocks against the fully associative LRU shadow and update it.
+
+        Args:
+            block (np.ndarray): int64 array with the block (tag * nsets + index) of each access.
+        Returns:
+            np.ndarray: bool array, True for the accesses that hit in the shadow.
+        """
+        # A repeated block hits and does not change the shadow, only the first of a run is checked
+        runs = np.ones(len(block), dtype=np.bool_)
+        runs[1:] = block[1:] != block[:-1]
+
+        shadow = self.shadow
+        move_to_end = shadow.move_to_end
+        popitem = shadow.popitem
+        capacity = self.number_of_blocks
+        hits = []
+        record = hits.append
+        for value in block[runs].tolist():
+            if value in shadow:
+                move_to_end(value)
+                record(True)
+            else:
+                shadow[value] = None
+                if len(shadow) > capacity:
+                    popitem(last=False)
+                record(False)
+
+        shadow_hit = np.ones(len(block), dtype=np.bool_)
+        shadow_hit[runs] = hits
+        return shadow_hit
+
+    def seen_before(self, block: np.ndarray) -> np.ndarray:
+        """
+        Check which accesses of a chunk are to a block accessed before, and add the new blocks to the blocks seen.
+
+        Args:
+            block (np.ndarray): int64 array with the block (tag * nsets + index) of each access.
+        Returns:
+            np.ndarray: bool array, False for the first access to a block.
+        """
+        blocks, first_use = np.unique(block, return_index=True)
+        seen = np.ones(len(block), dtype=np.bool_)
+        known = [value in self.seen for value in blocks.tolist()]
+        seen[first_use[~np.array(known, dtype=np.bool_)]] = False
+        self.seen.update(blocks.tolist())
+        return seen
+
+    def probe(self, index: int, tag: int) -> int:
         """
-        Substitution method.
+        Look up a block without filling it on a miss (the lookup of an exclusive level).
+        The shadow and the first accesses are updated as for check_memory_access, so the misses are classified the same way.
 
         Args:
             index (int): Index of the block in the cache set.
             tag (int): Tag of the block in the cache set.
+        Return:
+            int: Outcome code (see outcome.py).
         """
+        block = tag * self.nsets + index
 
-        if self.subs_method == "R":
-            self.random_substitution(index, tag)
-        elif self.subs_method == "L":
-            self.LRU_substitution(index, tag)
-        elif self.subs_method == "F":
-            self.FIFO_substitution(index, tag)
-        
-    
-    def LRU_substitution(self, index: int, tag: int) -> None:
+        shadow = self.shadow
+        if shadow is not None:
+            shadow_hit = block in shadow
+            if shadow_hit:
+                shadow.move_to_end(block)
+            else:
+                shadow[block] = None
+                if len(shadow) > self.number_of_blocks:
+                    shadow.popitem(last=False)
+
+        slot = self.resident.get(block)
+        if slot is not None:
+            if self.on_hit is not None:
+                self.on_hit(index, slot)
+            return HIT
+
+        if shadow is None:
+            return MISS
+        if shadow_hit:
+            return CONFLICT_MISS
+        if block in self.seen:
+            return CAPACITY_MISS
+        self.seen.add(block)
+        return COMPULSORY_MISS
+
+    def insert(self, index: int, tag: int) -> None:
         """
-        LRU substitution method.
+        Place a block in the set without counting an access (a block written back to an exclusive level).
 
         Args:
             index (int): Index of the block in the cache set.
             tag (int): Tag of the block in the cache set.
         """
-        self.cache_set[index].update_lru(tag)
-    
-    def FIFO_substitution(self, index: int, tag: int) -> None:
+        block = tag * self.nsets + index
+
+        # Already there, only the recency changes
+        slot = self.resident.get(block)
+        if slot is not None:
+            if self.on_hit is not None:
+                self.on_hit(index, slot)
+            return
+
+        fill = self.set_fill[index]
+        if fill < self.ways:
+            slot = index * self.ways + fill
+            self.set_fill[index] = fill + 1
+            self.fill(index, slot, tag)
+        else:
+            self.replace(index, tag, block)
+
+    def invalidate(self, index: int, tag: int) -> bool:
         """
-        FIFO substitution method.
+        Remove a block from the set (a back-invalidation, or a block moved up from an exclusive level).
+        The freed way is filled before any other block of the set is replaced.
 
         Args:
+            index (int): Index of the block in the cache set.
             tag (int): Tag of the block in the cache set.
+        Returns:
+            bool: True if the block was in the set.
         """
+        slot = self.resident.pop(tag * self.nsets + index, None)
+        if slot is None:
+            return False
 
-        # Update the block
-        self.cache_set[index].update_fifo(tag)
+        self.block_valid[slot] = 0
+        self.block_tag[slot] = -1
+        self.free_ways.setdefault(index, []).append(slot)
+        self.occupied_blocks -= 1
+        self.policy.invalidate(index, slot)
+        return True
 
-    def random_substitution(self, index: int, tag: int) -> str:
+    def replace(self, index: int, tag: int, block: int) -> None:
         """
-        Random substitution method.
+        Place a block in a full set: in an invalidated way if there is one, otherwise with the substitution method.
 
         Args:
             index (int): Index of the block in the cache set.
             tag (int): Tag of the block in the cache set.
+            block (int): Block number (tag * nsets + index).
         """
+        free = self.free_ways.get(index) if self.free_ways else None
+        if free:
+            slot = free.pop()
+            if not free:
+                del self.free_ways[index]
+            self.fill(index, slot, tag)
+        else:
+            self.substitution(index, tag)
 
-        # Get the random way in the block to update
-        random_way = randint(0, self.ways-1)
+    def fill(self, index: int, slot: int, tag: int) -> None:
+        """
+        Fill an invalid way.
+
+        Args:
+            index (int): Index of the block in the cache set.
+            slot (int): Position of the way in the flat arrays (index * ways + way).
+            tag (int): Tag of the block in the cache set.
+        """
+        self.block_valid[slot] = 1
+        self.block_tag[slot] = tag
+        self.resident[tag * self.nsets + index] = slot
+        self.occupied_blocks += 1
+        # Record the fill for the replacement policy
+        if self.on_fill is not None:
+            self.on_fill(index, slot)
+
+    def substitution(self, index:int, tag: int) -> None:
+        """
+        Substitution method, replace the block of the way chosen by the replacement policy.
+
+        Args:
+            index (int): Index of the block in the cache set.
+            tag (int): Tag of the block in the cache set.
+        """
+        slot = self.policy.victim(index)
 
         # Update the block
-        self.cache_set[index].update(random_way, tag)
-    
\ No newline at end of file
+        self.update(index, slot, tag)
+        if self.on_fill is not None:
+            self.on_fill(index, slot)
+
+    def update(self, index: int, slot: int, tag: int) -> None:
+        """
+        Update a way of the cache set, replacing the block in it.
+
+        Args:
+            index (int): Index of the block in the cache set.
+            slot (int): Position of the way in the flat arrays (index * ways + way).
+            tag (int): Tag to update the way.
+        """
+        # Unmap the replaced block and map the new one
+        victim = self.block_tag[slot] * self.nsets + index
+        del self.resident[victim]
+        self.resident[tag * self.nsets + index] = slot
+        if self.victims is not None:
+            self.victims.append(victim)
+
+        self.block_tag[slot] = tag
+        self.block_valid[slot] = 1
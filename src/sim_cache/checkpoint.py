@@ -0,0 +1,147 @@
+"""
+File: checkpoint.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Checkpoints of the full state of a cache simulation, so a trace that keeps growing (appended every day)
+             is simulated incrementally instead of from a cold cache every time.
+             A checkpoint holds the configuration, the counters, the position in the trace (the accesses already
+             simulated), the tag and valid matrices, the invalidated ways, the metadata of the replacement policy
+             (its own arrays, see ReplacementPolicy.get_state), and the 3C structures
+             (fully associative shadow and blocks seen). Everything is stored as numpy arrays in a compressed
+             .npz file, written to a temporary file first so a checkpoint is never left half written.
+             Restoring gives the same cache as the one that was saved: simulating the rest of the trace from a
+             checkpoint gives the same result as simulating the whole trace at once.
+"""
+
+import json
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+from .access_log import AccessLog
+from .cache import Cache
+
+# Version of the checkpoint layout
+CHECKPOINT_VERSION = 1
+
+def save_checkpoint(cache: Cache, file_path: str, position: int) -> str:
+    """
+    Save the full state of a cache.
+
+    Args:
+        cache (Cache): Cache to save.
+        file_path (str): Path to the checkpoint file.
+        position (int): Number of accesses of the trace already simulated (the next one is the first to simulate after a restore).
+    Returns:
+        str: Path to the checkpoint file.
+    """
+    cache_set = cache.cache_set
+    nsets = cache.nsets
+    ways = cache.ways
+
+    meta = {
+        "version": CHECKPOINT_VERSION,
+        "nsets": nsets,
+        "bsize": cache.bsize,
+        "assoc": ways,
+        "subs_method": cache.subs_method,
+        "seed": cache.seed,
+        "classify": cache.classify,
+        "position": position,
+        "counters": {
+            "hits": cache.memory_access_hit,
+            "compulsory_misses": cache.compulsory_misses,
+            "capacity_misses": cache.capacity_misses,
+            "conflict_misses": cache.conflict_misses,
+            "total_accesses": cache.total_accesses,
+        },
+        "occupied_blocks": cache_set.occupied_blocks,
+    }
+
+    # Invalidated ways, as (set index, slot) rows in the order they are reused from
+    free_ways = np.array([(index, slot) for index, slots in cache_set.free_ways.items() for slot in slots], dtype=np.int64).reshape(-1, 2)
+
+    arrays = {
+        "meta": np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8),
+        "block_tag": np.array(cache_set.block_tag, dtype=np.int64),
+        "block_valid": np.frombuffer(bytes(cache_set.block_valid), dtype=np.uint8),
+        "set_fill": np.array(cache_set.set_fill, dtype=np.int32),
+        "free_ways": free_ways,
+        "shadow": np.array(list(cache_set.shadow) if cache_set.shadow is not None else [], dtype=np.int64),
+        "seen": np.array(sorted(cache_set.seen), dtype=np.int64),
+        **cache_set.policy.get_state(),
+    }
+
+    # Write to a temporary file first, so a crash never leaves half a checkpoint
+    directory = os.path.dirname(os.path.abspath(file_path))
+    handle, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as file:
+            np.savez_compressed(file, **arrays)
+        os.replace(temporary, file_path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+    return file_path
+
+def load_checkpoint(file_path: str, output_flag: int = 1, input_file: str = None, debug: bool = False, access_log: AccessLog = None) -> tuple[Cache, int]:
+    """
+    Restore a cache from a checkpoint.
+
+    Args:
+        file_path (str): Path to the checkpoint file.
+        output_flag (int): Flag that defines how the output will look like. OPTIONAL. Default is 1.
+        input_file (str): Path to the trace file, for the reports. OPTIONAL.
+        debug (bool): Debug mode. OPTIONAL. Default is False.
+        access_log (AccessLog): Sink for the per-access log of the rest of the trace. OPTIONAL. Default is None.
+    Returns:
+        tuple[Cache, int]: The restored cache, and the number of accesses of the trace it already simulated.
+    """
+    if not os.path.exists(file_path):
+        out_message = "Checkpoint: {} path does not exist."
+        raise Exception(out_message.format(file_path))
+
+    with np.load(file_path) as data:
+        arrays = {name: data[name] for name in data.files}
+
+    meta = json.loads(arrays["meta"].tobytes().decode())
+    if meta.get("version") != CHECKPOINT_VERSION:
+        out_message = "Checkpoint: {} has version {}, only version {} is supported."
+        raise Exception(out_message.format(file_path, meta.get("version"), CHECKPOINT_VERSION))
+
+    cache = Cache(meta["nsets"], meta["bsize"], meta["assoc"], meta["subs_method"], output_flag, input_file, debug, access_log, meta["seed"], meta["classify"])
+    cache_set = cache.cache_set
+    nsets = cache.nsets
+    ways = cache.ways
+
+    # Counters
+    counters = meta["counters"]
+    cache.memory_access_hit = counters["hits"]
+    cache.compulsory_misses = counters["compulsory_misses"]
+    cache.capacity_misses = counters["capacity_misses"]
+    cache.conflict_misses = counters["conflict_misses"]
+    cache.total_accesses = counters["total_accesses"]
+    cache_set.occupied_blocks = meta["occupied_blocks"]
+
+    # Set structure, and the block -> way index of the valid ways
+    cache_set.block_tag = arrays["block_tag"].tolist()
+    cache_set.block_valid = bytearray(arrays["block_valid"].tobytes())
+    cache_set.set_fill = arrays["set_fill"].tolist()
+    slots = np.flatnonzero(arrays["block_valid"])
+    blocks = arrays["block_tag"][slots] * nsets + slots // ways
+    cache_set.resident = dict(zip(blocks.tolist(), slots.tolist()))
+
+    # Replacement metadata
+    cache_set.policy.set_state(arrays)
+    cache_set.free_ways = {}
+    for index, slot in arrays["free_ways"].tolist():
+        cache_set.free_ways.setdefault(index, []).append(slot)
+
+    # 3C structures
+    if cache_set.shadow is not None:
+        cache_set.shadow = OrderedDict.fromkeys(arrays["shadow"].tolist())
+    cache_set.seen = set(arrays["seen"].tolist())
+
+    return cache, meta["position"]
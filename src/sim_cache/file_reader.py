@@ -2,28 +2,56 @@
 File: file_reader.py
 Author: Gustavo Pereira
 Date: February 3, 2024
-Description: File reader for binary files. It can read the file and return the data in a list of integers.
+Description: File reader for binary files. It memory-maps the file and returns the data as a big-endian uint32 array.
+             Compressed (.bin.gz, .bin.bz2, .bin.xz) and delta (.dtrace) traces are decoded instead (see trace_format.py).
+             Text traces (decimal or hex addresses, one per line) are detected from their content and parsed in bulk
+             (see text_trace.py), whatever their extension.
              It can compare with other txt files to see if the data is correct.
              You can set some flags as: --file_input, --file_output, --file_compare, --abs_path.
              example: python file_reader.py --file_input "file_input.bin" --file_output "file_output.txt" --file_compare "file_compare.txt" --abs_path "y"
 """
 
 import argparse
+import io
 import os
+import sys
 import time
+from typing import BinaryIO, Iterable, Iterator
 
-def read_file(file_input: str, file_output: str = None, file_compare: str = None, abs_path: str = "n") -> tuple[list[bytes], list[int]]:
+import numpy as np
+
+from .text_trace import SNIFF_SIZE, read_text, text_chunks
+from .trace_format import DeltaTraceReader, buffer_kind, decompress, open_compressed, sniff_text, trace_kind
+
+# Addresses are stored as 4 byte big-endian unsigned integers
+ADDRESS_DTYPE = np.dtype(">u4")
+ADDRESS_SIZE = ADDRESS_DTYPE.itemsize
+
+# Default number of addresses per chunk when streaming
+CHUNK_SIZE = 1 << 16
+
+# Bytes of text read for each address of a chunk, when streaming a text trace
+TEXT_BYTES_PER_ADDRESS = 12
+
+def read_file(file_input: str, file_output: str = None, file_compare: str = None, abs_path: str = "n", return_bytes: bool = False) -> np.ndarray | tuple[list[bytes], np.ndarray]:
     """
-    Read a binary file and return the data in a list of integers.
+    Read a trace file and return the data as an array of addresses.
+
+    The file is memory-mapped and viewed as a big-endian uint32 array, so no Python object
+    is created per address. A trailing partial address (less than 4 bytes) is ignored.
+    Compressed and delta traces are decoded in memory (as a uint32 array for delta traces).
+    Text traces are detected from their first bytes and parsed (as a uint32 array).
 
     Args:
         file_input (str): Path to the file to read. REQUIRED.
         file_output (str): Path to the file to write the data. OPTIONAL. Default is None.
         file_compare (str): Path to the file to compare the data. OPTIONAL. Default is None.
         abs_path (str): Absolute path for the files. OPTIONAL. Default is "n".
+        return_bytes (bool): Also return the addresses as a list of 4 byte objects. OPTIONAL. Default is False.
 
     Returns:
-        tuple[list[bytes], list[int]]: Tuple with the data in a list of bytes and a list of integers.
+        np.ndarray: Read-only uint32 array with the addresses.
+            When return_bytes is set, a tuple with the list of bytes and the array is returned instead.
     """
     if abs_path.upper().strip() == "Y" or abs_path.upper().strip() == "YES" or abs_path.upper().strip() == "TRUE" or abs_path.upper().strip() == "1" :
         file_input = os.path.abspath(file_input)
@@ -36,39 +64,178 @@ def read_file(file_input: str, file_output: str = None, file_compare: str = None
         out_message = "File input: {} path does not exist."
         raise Exception(out_message.format(file_input))
     
-    if not file_input.endswith(".bin"):
-        out_message = "File input: {} is not a binary file."
-        raise Exception(out_message.format(file_input))
-        
-    data = []
-    data_int = []
-    with open(file_input, "rb") as file:
-        byte = file.read(4)
-        while byte:
-            data.append(byte)
-            data_int.append(int.from_bytes(byte, byteorder="big", signed="False"))
-            byte = file.read(4)
+    kind = trace_kind(file_input)
+    if kind == "delta":
+        data = DeltaTraceReader(file_input).read()
+    elif kind == "text" or is_text_file(file_input, kind):
+        with open(file_input, "rb") if kind in ("text", "raw") else open_compressed(file_input) as file:
+            data = read_text(file)
+    elif kind != "raw":
+        # Decompress the whole file, and view the whole addresses
+        with open_compressed(file_input) as file:
+            raw = file.read()
+        data = np.frombuffer(raw, dtype=ADDRESS_DTYPE, count=len(raw) // ADDRESS_SIZE)
+    else:
+        # Map only whole addresses, mmap refuses empty files
+        n_addresses = os.path.getsize(file_input) // ADDRESS_SIZE
+        if n_addresses == 0:
+            data = np.empty(0, dtype=ADDRESS_DTYPE)
+        else:
+            data = np.memmap(file_input, dtype=ADDRESS_DTYPE, mode="r", shape=(n_addresses,))
 
     if file_output:
         with open(file_output, "w") as file:
-            for i in data:
-                file.write(str(i) + "\n")
+            for start in range(0, len(data), 1 << 16):
+                file.writelines("{}\n".format(address) for address in data[start:start + (1 << 16)].tolist())
 
     if file_compare:
         if not os.path.exists(file_compare):
             out_message = "File compare: {} path does not exist."
             raise Exception(out_message.format(file_compare))
-        with open(file_compare, "r") as file:
-            compare_data = [int(line) for line in file]
-        if data == compare_data:
+        with open(file_compare, "rb") as file:
+            compare_data = read_text(file)
+        if np.array_equal(data, compare_data):
             print("Data is correct.")
         else:
             print("Data is incorrect.")
 
-    return data, data_int
+    if return_bytes:
+        raw = data.tobytes()
+        return [raw[i:i + ADDRESS_SIZE] for i in range(0, len(raw), ADDRESS_SIZE)], data
+
+    return data
+
+def read_buffer(buffer: bytes | bytearray | memoryview) -> np.ndarray:
+    """
+    Read a trace already in memory (the content of a trace file) and return the data as an array of addresses.
+
+    The format is detected from the first bytes, whatever the trace came from. Raw traces are viewed in place
+    as a big-endian uint32 array, without a copy (a trailing partial address is ignored). Compressed traces are
+    decompressed, delta traces decoded and text traces parsed (as a uint32 array).
+
+    Args:
+        buffer (bytes | bytearray | memoryview): Content of the trace file.
+    Returns:
+        np.ndarray: uint32 array with the addresses (read-only for a read-only buffer).
+    """
+    buffer = memoryview(buffer).cast("B")
+    kind = buffer_kind(bytes(buffer[:SNIFF_SIZE]))
+    if kind == "delta":
+        return DeltaTraceReader(buffer).read()
+    if kind in ("gz", "bz2", "xz"):
+        return read_buffer(decompress(buffer))
+    if kind == "text":
+        return read_text(io.BytesIO(buffer))
+    return np.frombuffer(buffer, dtype=ADDRESS_DTYPE, count=len(buffer) // ADDRESS_SIZE)
+
+def read_file_chunks(file_input: str | BinaryIO, chunk_size: int = CHUNK_SIZE, start: int = 0) -> Iterator[np.ndarray]:
+    """
+    Read a trace file in fixed-size chunks, so the memory used does not depend on the file size.
+
+    Args:
+        file_input (str | BinaryIO): Path to the file to read, "-" for stdin, or an already opened binary file (pipes work too).
+            Compressed and delta traces are decoded while they are read, text traces are detected and parsed.
+        chunk_size (int): Number of addresses per chunk. OPTIONAL. Default is CHUNK_SIZE.
+        start (int): Number of addresses to skip. Raw files are read from the byte offset of the first address,
+            delta traces from its block, the other formats are decoded and dropped up to it. OPTIONAL. Default is 0.
+
+    Yields:
+        np.ndarray: uint32 array with at most chunk_size addresses.
+    """
+    if isinstance(file_input, str) and file_input != "-":
+        if not os.path.exists(file_input):
+            out_message = "File input: {} path does not exist."
+            raise Exception(out_message.format(file_input))
+
+        kind = trace_kind(file_input)
+        if kind == "delta":
+            yield from address_chunks(DeltaTraceReader(file_input).chunks(start), chunk_size)
+            return
+
+        with open(file_input, "rb") if kind in ("text", "raw") else open_compressed(file_input) as file:
+            if start and not sniff_text(file):
+                # Raw addresses, go to the byte offset of the first one
+                file.seek(start * ADDRESS_SIZE)
+                yield from address_chunks(iter(lambda: file.read(chunk_size * ADDRESS_SIZE), b""), chunk_size)
+                return
+            yield from read_file_chunks(file, chunk_size, start)
+        return
+
+    file = sys.stdin.buffer if file_input == "-" else file_input
+    if sniff_text(file):
+        chunks = address_chunks(text_chunks(file, chunk_size * TEXT_BYTES_PER_ADDRESS), chunk_size)
+    else:
+        chunks = address_chunks(iter(lambda: file.read(chunk_size * ADDRESS_SIZE), b""), chunk_size)
+
+    # Drop the addresses before the start
+    for chunk in chunks:
+        if start >= len(chunk):
+            start -= len(chunk)
+            continue
+        yield chunk[start:]
+        start = 0
+
+def is_text_file(file_input: str, kind: str) -> bool:
+    """
+    Check if a trace file is text from its first bytes (decompressed for compressed traces).
+
+    Args:
+        file_input (str): Path to the trace file.
+        kind (str): Format of the file from its extension, as returned by trace_kind.
+    Returns:
+        bool: True for a text trace.
+    """
+    with open(file_input, "rb") if kind in ("text", "raw") else open_compressed(file_input) as file:
+        return sniff_text(file)
+
+def address_chunks(source: Iterable, chunk_size: int = CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """
+    Normalize any iterable of addresses or buffers into a stream of address arrays.
+
+    The items can be integers (one address each), bytes-like objects with big-endian 4 byte addresses
+    (an address may be split between two buffers) or arrays/sequences of integers.
+
+    Args:
+        source (Iterable): Iterable of addresses or buffers.
+        chunk_size (int): Maximum number of addresses per chunk. OPTIONAL. Default is CHUNK_SIZE.
+
+    Yields:
+        np.ndarray: Array with at most chunk_size addresses.
+    """
+    pending = []
+    remainder = b""
+
+    for item in source:
+        # Single addresses are batched until the chunk is full
+        if isinstance(item, (int, np.integer)):
+            pending.append(int(item))
+            if len(pending) >= chunk_size:
+                yield np.array(pending, dtype=np.uint32)
+                pending = []
+            continue
+
+        # Keep the order of the addresses
+        if pending:
+            yield np.array(pending, dtype=np.uint32)
+            pending = []
+
+        if isinstance(item, (np.ndarray, list, tuple, range)):
+            addresses = np.asarray(item)
+        else:
+            # Raw buffer, keep the bytes of a split address for the next one
+            buffer = memoryview(remainder + bytes(item) if remainder else item).cast("B")
+            n_bytes = len(buffer) - len(buffer) % ADDRESS_SIZE
+            remainder = bytes(buffer[n_bytes:])
+            addresses = np.frombuffer(buffer[:n_bytes], dtype=ADDRESS_DTYPE)
+
+        for start in range(0, len(addresses), chunk_size):
+            yield addresses[start:start + chunk_size]
+
+    if pending:
+        yield np.array(pending, dtype=np.uint32)
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="File reader for binary files.")
+    parser = argparse.ArgumentParser(description="File reader for trace files.")
     parser.add_argument("--file_input", help="Input file to read.", required=True)
     parser.add_argument("--file_output", help="Output file to write.", required=False)
     parser.add_argument("--file_compare", help="File to compare with.", required=False)
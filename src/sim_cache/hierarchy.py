@@ -0,0 +1,640 @@
+"""
+File: hierarchy.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Multi-level cache hierarchy (for example L1I/L1D -> L2 -> L3), configured from a JSON file.
+             Each level is a Cache, and only the miss stream of a level is forwarded to the next one, a batch at
+             a time, so the lower levels process a fraction of the accesses.
+             The first level can be split between several caches (L1I and L1D): the traces only have addresses,
+             so each access goes to the first cache whose address range (the code segment for L1I) contains it,
+             or to the cache without a range.
+             Inclusion policy of a level, relative to the levels above it:
+                - "nine" (non-inclusive non-exclusive): filled on every miss that reaches it, evictions stay local.
+                - "inclusive": also filled on every miss, and a block it replaces is invalidated in every level above.
+                - "exclusive": only filled by the blocks replaced in the level above (written back to it), and a
+                  block that hits moves up (it is invalidated here).
+             With an inclusive level, a level stops its batch at every miss and the miss goes all the way down
+             first, so the back-invalidations reach the levels above before their next access (the result is the
+             same as simulating one access at a time).
+             Without inclusive levels nothing flows up, so the levels can also run in a pipeline, each one in its
+             own process, connected by bounded queues of batches.
+             Config file:
+                {
+                    "memory_latency": 100,                  (OPTIONAL, cycles, for the average memory access time)
+                    "levels": [
+                        [
+                            {"name": "L1I", "nsets": 64, "bsize": 32, "assoc": 2, "subs_method": "L", "latency": 1,
+                             "range": ["0x00400000", "0x00500000"]},
+                            {"name": "L1D", "nsets": 64, "bsize": 32, "assoc": 2, "subs_method": "L", "latency": 1}
+                        ],
+                        {"name": "L2", "nsets": 512, "bsize": 64, "assoc": 8, "subs_method": "L", "inclusion": "inclusive"},
+                        {"name": "L3", "nsets": 2048, "bsize": 64, "assoc": 16, "subs_method": "R", "inclusion": "exclusive"}
+                    ]
+                }
+"""
+
+import json
+import multiprocessing
+import queue
+from typing import Iterable
+
+import numpy as np
+
+from .cache import Cache
+from .file_reader import CHUNK_SIZE, address_chunks
+from .outcome import CAPACITY_MISS, COMPULSORY_MISS, CONFLICT_MISS, HIT, OUTCOME_NAMES
+from .policies import POLICIES
+
+# Inclusion policies
+NINE = "nine"
+INCLUSIVE = "inclusive"
+EXCLUSIVE = "exclusive"
+INCLUSION_POLICIES = (NINE, INCLUSIVE, EXCLUSIVE)
+
+# Events forwarded between levels: the address, with this bit set for a block written back (not an access)
+WRITEBACK = 1 << 32
+ADDRESS_MASK = WRITEBACK - 1
+
+# Batches waiting in each queue of the pipeline
+QUEUE_SIZE = 4
+
+# Time to wait on a full or empty queue before checking the other processes (in seconds)
+QUEUE_TIMEOUT = 0.5
+
+class Level:
+    __slots__ = (
+        "name", "depth", "inclusion", "latency", "address_range", "cache",
+        "offset_bits", "index_bits", "index_mask", "counts", "writebacks", "back_invalidations",
+    )
+
+    def __init__(self, config: dict, depth: int, input_file: str = None, seed: int = None, classify: bool = True) -> None:
+        self.name = config["name"]
+        self.depth = depth
+        self.inclusion = config.get("inclusion", NINE)
+        self.latency = config.get("latency")
+
+        # Addresses routed to this cache in a split first level, [start, end) or None for the rest
+        address_range = config.get("range")
+        self.address_range = tuple(int(str(bound), 0) for bound in address_range) if address_range is not None else None
+
+        self.cache = Cache(config["nsets"], config["bsize"], config["assoc"], config["subs_method"], 1, input_file, seed=seed, classify=classify)
+        self.offset_bits = self.cache.n_bits_offset
+        self.index_bits = self.cache.n_bits_indice
+        self.index_mask = (1 << self.index_bits) - 1
+
+        # Outcome counters, indexed by outcome code, blocks written back to this level, and blocks invalidated
+        # in the levels above by its replacements
+        self.counts = [0] * len(OUTCOME_NAMES)
+        self.writebacks = 0
+        self.back_invalidations = 0
+
+    def counters(self) -> tuple:
+        """
+        Get the counters of the level, to send them between processes.
+
+        Returns:
+            tuple: Outcome counters, write-backs and back-invalidations.
+        """
+        return list(self.counts), self.writebacks, self.back_invalidations
+
+    def merge(self, counters: tuple) -> None:
+        """
+        Add the counters of the same level simulated in another process.
+
+        Args:
+            counters (tuple): Counters, as returned by counters.
+        """
+        counts, writebacks, back_invalidations = counters
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, counts)]
+        self.writebacks += writebacks
+        self.back_invalidations += back_invalidations
+
+    def get_statistics(self) -> dict:
+        """
+        Get the statistics of the level (local rates: over the accesses that reached it).
+
+        Returns:
+            dict: Name, inclusion, the statistics of the cache, write-backs and back-invalidations.
+        """
+        cache = self.cache
+        cache.memory_access_hit = self.counts[HIT]
+        cache.compulsory_misses = self.counts[COMPULSORY_MISS]
+        cache.capacity_misses = self.counts[CAPACITY_MISS]
+        cache.conflict_misses = self.counts[CONFLICT_MISS]
+        cache.total_accesses = sum(self.counts)
+
+        return {
+            "name": self.name,
+            "depth": self.depth,
+            "inclusion": self.inclusion,
+            **cache.get_statistics(),
+            "writebacks": self.writebacks,
+            "back_invalidations": self.back_invalidations,
+        }
+
+class Hierarchy:
+    def __init__(self, config: dict, input_file: str = None, output_flag: int = 0, seed: int = None, classify: bool = True) -> None:
+        check_config(config)
+
+        self.config = config
+        self.input_file = input_file
+        self.output_flag = output_flag
+        self.seed = seed
+        self.classify = classify
+        self.memory_latency = config.get("memory_latency")
+
+        # Caches of each level, top first (only the first level can have more than one)
+        self.levels: list[list[Level]] = []
+        for depth in range(len(config["levels"])):
+            self.levels.append([Level(level, depth, input_file, seed, classify) for level in level_entries(config, depth)])
+
+        # The cache of the first level that takes the addresses out of every range
+        self.default_route = next(number for number, level in enumerate(self.levels[0]) if level.address_range is None)
+
+        # Collect the replaced blocks of the levels that send them somewhere
+        for depth, caches in enumerate(self.levels):
+            for level in caches:
+                if level.inclusion == INCLUSIVE or self.next_inclusion(depth) == EXCLUSIVE:
+                    level.cache.cache_set.victims = []
+
+        # Something flows up (back-invalidations), so the misses can not wait for the end of the batch
+        self.feedback = any(caches[0].inclusion == INCLUSIVE for caches in self.levels[1:])
+
+        # Accesses of the trace
+        self.total_accesses = 0
+
+    @classmethod
+    def from_file(cls, file_path: str, input_file: str = None, output_flag: int = 0, seed: int = None, classify: bool = True) -> "Hierarchy":
+        """
+        Build a hierarchy from a JSON config file.
+
+        Args:
+            file_path (str): Path to the config file.
+            input_file (str): Path to the trace file, for the reports. OPTIONAL.
+            output_flag (int): Flag that defines how the output will look like. OPTIONAL. Default is 0.
+            seed (int): Seed for the random substitution. OPTIONAL. Default is no seed.
+            classify (bool): Classify the misses. OPTIONAL. Default is True.
+        Returns:
+            Hierarchy: The hierarchy.
+        """
+        with open(file_path, "r") as file:
+            config = json.load(file)
+        return cls(config, input_file, output_flag, seed, classify)
+
+    def next_inclusion(self, depth: int) -> str | None:
+        """
+        Get the inclusion policy of the level below.
+
+        Args:
+            depth (int): Depth of the level.
+        Returns:
+            str | None: Inclusion policy, None for the last level.
+        """
+        return self.levels[depth + 1][0].inclusion if depth + 1 < len(self.levels) else None
+
+    def simulate(self, memory_address: np.ndarray, chunk_size: int = CHUNK_SIZE) -> str:
+        """
+        Simulate the hierarchy over a whole trace, and return the output.
+
+        Args:
+            memory_address (np.ndarray): Array (or any sequence) of integers with the memory addresses.
+            chunk_size (int): Number of accesses per batch. OPTIONAL.
+        Returns:
+            str: Output for the simulation. Depends on the output_flag.
+        """
+        for start in range(0, len(memory_address), chunk_size):
+            self.process_chunk(memory_address[start:start + chunk_size])
+        return self.get_output()
+
+    def simulate_stream(self, memory_address: Iterable, chunk_size: int = CHUNK_SIZE) -> str:
+        """
+        Simulate the hierarchy over a stream of addresses, one batch at a time, and return the output.
+
+        Args:
+            memory_address (Iterable): Iterable of addresses, address arrays or raw big-endian buffers (see address_chunks).
+            chunk_size (int): Number of accesses per batch. OPTIONAL.
+        Returns:
+            str: Output for the simulation. Depends on the output_flag.
+        """
+        for chunk in address_chunks(memory_address, chunk_size):
+            self.process_chunk(chunk)
+        return self.get_output()
+
+    def process_chunk(self, memory_address: np.ndarray) -> None:
+        """
+        Simulate a batch of accesses through every level.
+
+        Args:
+            memory_address (np.ndarray): Array (or any sequence) of integers with the memory addresses.
+        """
+        addresses = np.asarray(memory_address).astype(np.int64)
+        self.total_accesses += len(addresses)
+        self.forward(0, addresses.tolist(), self.route(addresses))
+
+    def route(self, addresses: np.ndarray) -> list[int] | None:
+        """
+        Get the cache of the first level of each access.
+
+        Args:
+            addresses (np.ndarray): Addresses of the batch.
+        Returns:
+            list[int] | None: Position of the cache in the first level for each access, None when it is not split.
+        """
+        if len(self.levels[0]) == 1:
+            return None
+        routes = np.full(len(addresses), self.default_route, dtype=np.int64)
+        # The first range that contains the address wins
+        for number, level in reversed(list(enumerate(self.levels[0]))):
+            if level.address_range is not None:
+                start, end = level.address_range
+                routes[(addresses >= start) & (addresses < end)] = number
+        return routes.tolist()
+
+    def forward(self, depth: int, events: list[int], routes: list[int] = None) -> None:
+        """
+        Simulate a batch of events at a level, and forward what it sends down to the levels below.
+
+        Args:
+            depth (int): Depth of the level.
+            events (list[int]): Addresses, with the WRITEBACK bit for the blocks written back.
+            routes (list[int]): Cache of the level for each event (split first level). OPTIONAL.
+        """
+        position = 0
+        while position < len(events):
+            sent, position = self.process_level(depth, events, routes, position)
+            if sent and depth + 1 < len(self.levels):
+                self.forward(depth + 1, sent)
+
+    def process_level(self, depth: int, events: list[int], routes: list[int] | None, position: int, stop: bool = None) -> tuple[list[int], int]:
+        """
+        Simulate the events of a batch at a level, from a position.
+
+        Args:
+            depth (int): Depth of the level.
+            events (list[int]): Addresses, with the WRITEBACK bit for the blocks written back.
+            routes (list[int] | None): Cache of the level for each event, None for the first cache.
+            position (int): First event to simulate.
+            stop (bool): Stop after the first event that sends something down. OPTIONAL. Default is to stop
+                when there are back-invalidations.
+        Returns:
+            tuple[list[int], int]: Events for the level below (misses and write-backs), and the next event to simulate.
+        """
+        caches = self.levels[depth]
+        level = caches[0]
+        write_back = self.next_inclusion(depth) == EXCLUSIVE
+        stop = self.feedback if stop is None else stop
+
+        sent = []
+        while position < len(events):
+            event = events[position]
+            if routes is not None:
+                level = caches[routes[position]]
+            position += 1
+
+            address = event & ADDRESS_MASK
+            block = address >> level.offset_bits
+            index = block & level.index_mask
+            tag = block >> level.index_bits
+            cache_set = level.cache.cache_set
+
+            if event & WRITEBACK:
+                # A block replaced in the level above
+                level.writebacks += 1
+                cache_set.insert(index, tag)
+            elif level.inclusion == EXCLUSIVE:
+                # A hit moves the block up, a miss does not fill it
+                result = cache_set.probe(index, tag)
+                level.counts[result] += 1
+                if result == HIT:
+                    cache_set.invalidate(index, tag)
+                else:
+                    sent.append(address)
+            else:
+                result = cache_set.check_memory_access(index, tag)
+                level.counts[result] += 1
+                if result != HIT:
+                    sent.append(address)
+
+            # Replaced blocks: invalidated above an inclusive level, written back to an exclusive level below
+            victims = cache_set.victims
+            if victims:
+                for victim in victims:
+                    victim_address = victim << level.offset_bits
+                    if level.inclusion == INCLUSIVE:
+                        self.back_invalidate(depth, level, victim_address)
+                    if write_back:
+                        sent.append(victim_address | WRITEBACK)
+                victims.clear()
+
+            if stop and sent:
+                break
+
+        return sent, position
+
+    def back_invalidate(self, depth: int, level: Level, address: int) -> None:
+        """
+        Invalidate a block replaced in an inclusive level in every level above it.
+
+        Args:
+            depth (int): Depth of the inclusive level.
+            level (Level): The inclusive level.
+            address (int): First address of the replaced block.
+        """
+        size = 1 << level.offset_bits
+        for caches in self.levels[:depth]:
+            for upper in caches:
+                # The block may span several smaller blocks of the upper level
+                for part in range(address, address + size, 1 << upper.offset_bits):
+                    block = part >> upper.offset_bits
+                    if upper.cache.cache_set.invalidate(block & upper.index_mask, block >> upper.index_bits):
+                        level.back_invalidations += 1
+
+    def simulate_pipeline(self, chunks: Iterable, chunk_size: int = CHUNK_SIZE, queue_size: int = QUEUE_SIZE) -> str:
+        """
+        Simulate the hierarchy with each level in its own process. Each level sends its batches of misses and
+        write-backs to the next one through a bounded queue, so the levels work on different batches at the same time.
+        Only without inclusive levels, since their back-invalidations would have to flow up.
+
+        Args:
+            chunks (Iterable): Iterable of addresses, address arrays or raw big-endian buffers (see address_chunks).
+            chunk_size (int): Number of accesses per batch. OPTIONAL.
+            queue_size (int): Batches waiting in each queue. OPTIONAL.
+        Returns:
+            str: Output for the simulation. Depends on the output_flag.
+        """
+        if self.feedback:
+            raise Exception("Hierarchy: inclusive levels invalidate the levels above, they can not run in a pipeline.")
+
+        context = multiprocessing.get_context()
+        queues = [context.Queue(queue_size) for _ in self.levels]
+        results = context.Queue()
+        stages = []
+        for depth in range(len(self.levels)):
+            outbox = queues[depth + 1] if depth + 1 < len(self.levels) else None
+            stage = context.Process(target=run_stage, args=(self.config, self.input_file, self.seed, self.classify, depth, queues[depth], outbox, results), daemon=True)
+            stage.start()
+            stages.append(stage)
+
+        try:
+            for chunk in address_chunks(chunks, chunk_size):
+                addresses = np.asarray(chunk).astype(np.int64)
+                self.total_accesses += len(addresses)
+                put(queues[0], addresses, stages)
+            put(queues[0], None, stages)
+
+            # Counters of every level
+            for _ in stages:
+                depth, counters = get(results, stages)
+                if isinstance(counters, str):
+                    raise Exception(counters)
+                for level, level_counters in zip(self.levels[depth], counters):
+                    level.merge(level_counters)
+        finally:
+            for stage in stages:
+                if stage.is_alive():
+                    stage.terminate()
+                stage.join()
+
+        return self.get_output()
+
+    def get_statistics(self) -> dict:
+        """
+        Get the statistics of every level and of the whole hierarchy.
+
+        Returns:
+            dict: Statistics of each level (local rates, plus the global miss rate: misses over the accesses of
+                the trace), accesses, accesses that went to memory, global miss rate and average memory access
+                time (None without the latencies).
+        """
+        levels = []
+        for caches in self.levels:
+            for level in caches:
+                statistics = level.get_statistics()
+                statistics["global_miss_rate"] = round(statistics["total_misses"] / self.total_accesses, 4) if self.total_accesses else 0
+                levels.append(statistics)
+
+        # The misses of the last level go to memory
+        memory_accesses = sum(sum(level.counts) - level.counts[HIT] for level in self.levels[-1])
+
+        # Average memory access time: the latency of each level is paid by the accesses that reach it
+        amat = None
+        latencies = [level.latency for caches in self.levels for level in caches]
+        if self.total_accesses and self.memory_latency is not None and None not in latencies:
+            cycles = sum(level.latency * sum(level.counts) for caches in self.levels for level in caches)
+            amat = round((cycles + self.memory_latency * memory_accesses) / self.total_accesses, 4)
+
+        return {
+            "levels": levels,
+            "total_accesses": self.total_accesses,
+            "memory_accesses": memory_accesses,
+            "global_miss_rate": round(memory_accesses / self.total_accesses, 4) if self.total_accesses else 0,
+            "amat": amat,
+        }
+
+    def get_report(self) -> str:
+        """
+        Get the report (free format statistics) of every level and of the whole hierarchy.
+
+        Returns:
+            str: Report for the simulation.
+        """
+        statistics = self.get_statistics()
+        parts = []
+        for caches in self.levels:
+            for level in caches:
+                parts.append("{} ({}, {} sets, {} bytes blocks, {} ways, {})\n{}\nGlobal miss rate: {} %\nWrite-backs in: {}\nBack-invalidations: {}".format(
+                    level.name,
+                    level.inclusion,
+                    level.cache.nsets,
+                    level.cache.bsize,
+                    level.cache.ways,
+                    level.cache.subs_method,
+                    level.cache.get_report(),
+                    round(level.cache.total_misses / self.total_accesses * 100, 2) if self.total_accesses else 0,
+                    level.writebacks,
+                    level.back_invalidations,
+                ))
+        parts.append("Hierarchy\nTotal accesses: {}\nMemory accesses: {}\nGlobal miss rate: {} %\nAverage memory access time: {}".format(
+            statistics["total_accesses"],
+            statistics["memory_accesses"],
+            round(statistics["global_miss_rate"] * 100, 2),
+            statistics["amat"] if statistics["amat"] is not None else "-",
+        ))
+        return "\n\n".join(parts)
+
+    def get_output(self) -> str:
+        """
+        Get the output for the simulation, and write the report file.
+
+        Returns:
+            str: Output for the simulation. flag=0 for the report, flag=1 for one line per level
+                (name, total accesses, hit rate, miss rate, compulsory miss rate, capacity miss rate, conflict miss rate)
+                and a last line with the total accesses, the memory accesses and the global miss rate.
+        """
+        report = self.get_report()
+
+        with open("report.txt", "w") as file:
+            file.write(report)
+
+        if self.output_flag == 0:
+            return report
+
+        statistics = self.get_statistics()
+        lines = ["{}, {}, {}, {}, {}, {}, {}".format(
+            level["name"],
+            level["total_accesses"],
+            level["hit_rate"],
+            level["miss_rate"],
+            level["compulsory_miss_rate"],
+            level["capacity_miss_rate"],
+            level["conflict_miss_rate"],
+        ) for level in statistics["levels"]]
+        lines.append("Hierarchy, {}, {}, {}".format(statistics["total_accesses"], statistics["memory_accesses"], statistics["global_miss_rate"]))
+        return "\n".join(lines)
+
+def check_config(config: dict) -> None:
+    """
+    Check a hierarchy config, raising an exception on the first problem.
+
+    Args:
+        config (dict): Hierarchy config.
+    """
+    levels = config.get("levels")
+    if not isinstance(levels, list) or not levels:
+        raise Exception("Hierarchy: the config needs a non-empty list of levels.")
+
+    names = set()
+    for depth in range(len(levels)):
+        entries = level_entries(config, depth)
+        if not entries:
+            out_message = "Hierarchy: level {} has no cache."
+            raise Exception(out_message.format(depth + 1))
+        if len(entries) > 1 and depth > 0:
+            out_message = "Hierarchy: only the first level can be split, level {} has {} caches."
+            raise Exception(out_message.format(depth + 1, len(entries)))
+
+        for level in entries:
+            name = level.get("name", "")
+            if not name or name in names:
+                out_message = "Hierarchy: every cache needs a unique name, level {} has {}."
+                raise Exception(out_message.format(depth + 1, repr(name)))
+            names.add(name)
+
+            for key in ("nsets", "bsize", "assoc"):
+                value = level.get(key)
+                if not isinstance(value, int) or value <= 0 or value & (value - 1):
+                    out_message = "Hierarchy: {} of {} needs to be a power of 2 greater than 0."
+                    raise Exception(out_message.format(key, name))
+
+            # A level only sees the misses of the level above, there is no trace to look ahead in
+            subs_methods = [code for code, policy in POLICIES.items() if not policy.needs_next_use]
+            if level.get("subs_method") not in subs_methods:
+                out_message = "Hierarchy: subs_method of {} needs to be one of {}."
+                raise Exception(out_message.format(name, ", ".join(subs_methods)))
+
+            inclusion = level.get("inclusion", NINE)
+            if inclusion not in INCLUSION_POLICIES:
+                out_message = "Hierarchy: inclusion of {} needs to be one of {}."
+                raise Exception(out_message.format(name, ", ".join(INCLUSION_POLICIES)))
+            if depth == 0 and inclusion != NINE:
+                out_message = "Hierarchy: {} is in the first level, there is nothing above it to be {} of."
+                raise Exception(out_message.format(name, inclusion))
+
+            if "range" in level and (depth > 0 or len(entries) == 1):
+                out_message = "Hierarchy: {} has a range, only the caches of a split first level have one."
+                raise Exception(out_message.format(name))
+
+        if depth == 0 and len(entries) > 1 and sum("range" not in level for level in entries) != 1:
+            raise Exception("Hierarchy: a split first level needs exactly one cache without a range, for the other addresses.")
+
+def run_stage(config: dict, input_file: str, seed: int, classify: bool, depth: int, inbox, outbox, results) -> None:
+    """
+    Simulate one level of the pipeline in a worker process, until the end of the trace (None).
+
+    Args:
+        config (dict): Hierarchy config.
+        input_file (str): Path to the trace file.
+        seed (int): Seed for the random substitution.
+        classify (bool): Classify the misses.
+        depth (int): Depth of the level of this process.
+        inbox (Queue): Batches of events for the level.
+        outbox (Queue): Batches of events for the level below, None for the last level.
+        results (Queue): Counters of the level, sent at the end as (depth, counters), or (depth, error message)
+            before the process fails.
+    """
+    try:
+        hierarchy = Hierarchy(config, input_file, seed=seed, classify=classify)
+        while True:
+            batch = inbox.get()
+            if batch is None:
+                break
+            events = batch.tolist()
+            routes = hierarchy.route(batch) if depth == 0 else None
+            sent, _ = hierarchy.process_level(depth, events, routes, 0, stop=False)
+            if outbox is not None and sent:
+                outbox.put(np.array(sent, dtype=np.int64))
+
+        if outbox is not None:
+            outbox.put(None)
+        results.put((depth, [level.counters() for level in hierarchy.levels[depth]]))
+    except Exception as e:
+        results.put((depth, "Hierarchy: {} failed: {}".format(", ".join(level["name"] for level in level_entries(config, depth)), e)))
+        raise
+
+def level_entries(config: dict, depth: int) -> list[dict]:
+    """
+    Get the configs of the caches of a level.
+
+    Args:
+        config (dict): Hierarchy config.
+        depth (int): Depth of the level.
+    Returns:
+        list[dict]: Config of each cache of the level.
+    """
+    entry = config["levels"][depth]
+    return entry if isinstance(entry, list) else [entry]
+
+def put(target: queue.Queue, item, stages: list) -> None:
+    """
+    Put an item on a bounded queue of the pipeline, failing if a stage died instead of waiting forever.
+
+    Args:
+        target (Queue): Queue.
+        item: Item to put.
+        stages (list): Processes of the pipeline.
+    """
+    while True:
+        try:
+            target.put(item, timeout=QUEUE_TIMEOUT)
+            return
+        except queue.Full:
+            if failed(stages):
+                raise Exception("Hierarchy: a level of the pipeline failed.")
+
+def get(source: queue.Queue, stages: list):
+    """
+    Get an item from a queue of the pipeline, failing if a stage died without sending it.
+
+    Args:
+        source (Queue): Queue.
+        stages (list): Processes of the pipeline.
+    Returns:
+        The item.
+    """
+    while True:
+        try:
+            return source.get(timeout=QUEUE_TIMEOUT)
+        except queue.Empty:
+            if failed(stages):
+                raise Exception("Hierarchy: a level of the pipeline failed.")
+
+def failed(stages: list) -> bool:
+    """
+    Check if a process of the pipeline ended with an error.
+
+    Args:
+        stages (list): Processes of the pipeline.
+    Returns:
+        bool: True if a process ended with a non-zero exit code.
+    """
+    return any(stage.exitcode not in (None, 0) for stage in stages)
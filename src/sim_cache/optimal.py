@@ -0,0 +1,40 @@
+"""
+File: optimal.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Next-use index for the optimal replacement policy (Belady's MIN, subs_method O): the victim is the
+             block of the set whose next access is the farthest in the future. The position of the next access
+             to the same block is computed for every access before the simulation, with array operations only
+             (in a stable sort by block, each access is followed by the next access to its block).
+             The index only depends on the trace and the block size, so it can be kept on disk (see TraceCache.load_next_use).
+"""
+
+import numpy as np
+
+from .stack_distance import block_numbers
+
+# Next use of the last access to a block (farther than any position)
+NEVER = 0xFFFFFFFF
+
+def next_use(memory_address: np.ndarray, bsize: int) -> np.ndarray:
+    """
+    Get the position of the next access to the same block, for each access.
+
+    Args:
+        memory_address (np.ndarray): Array of addresses.
+        bsize (int): Block size (power of two).
+    Returns:
+        np.ndarray: uint32 array with the next position, or NEVER for the last access to a block.
+    """
+    blocks = block_numbers(memory_address, bsize)
+    if len(blocks) >= NEVER:
+        out_message = "Next use: {} accesses do not fit a 32-bit position."
+        raise Exception(out_message.format(len(blocks)))
+
+    # The accesses of each block, in order, so the one after an access is its next use
+    order = np.argsort(blocks, kind="stable")
+    same = blocks[order[:-1]] == blocks[order[1:]]
+
+    following = np.full(len(blocks), NEVER, dtype=np.uint32)
+    following[order[:-1][same]] = order[1:][same]
+    return following
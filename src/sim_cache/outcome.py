@@ -0,0 +1,20 @@
+"""
+File: outcome.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Outcome codes for a memory access. The codes are small integers so they can be stored
+             in compact logs, the names are the ones shown in the reports and in the web interface.
+"""
+
+# Outcome codes
+HIT = 0
+COMPULSORY_MISS = 1
+CAPACITY_MISS = 2
+CONFLICT_MISS = 3
+MISS = 4            # Miss that was not classified
+
+# Outcome names, indexed by code
+OUTCOME_NAMES = ("Hit", "Compulsory miss", "Capacity miss", "Conflict miss", "Miss")
+
+# Outcome codes, indexed by name
+OUTCOME_CODES = {name: code for code, name in enumerate(OUTCOME_NAMES)}
@@ -0,0 +1,121 @@
+"""
+File: parallel.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Set-partitioned parallel simulation of one cache configuration. A set only depends on the accesses
+             with its index, so the trace is split by set index in a vectorized pre-pass, each partition is
+             simulated in its own process and the hits are merged.
+             The 3C classification depends on the whole trace (first access to a block, fully associative LRU
+             cache of the same size), so the workers only report hits and misses, and the misses are classified
+             on the whole trace with the stack distances of a fully associative cache while the workers run.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .outcome import CAPACITY_MISS, COMPULSORY_MISS, CONFLICT_MISS, HIT, OUTCOME_NAMES
+from .stack_distance import COLD, stack_distances
+
+def partition_by_set(memory_address: np.ndarray, n_bits_offset: int, n_bits_indice: int, n_partitions: int) -> tuple[np.ndarray, np.ndarray, list[tuple[int, int]]]:
+    """
+    Split the trace by set index, keeping the order of the accesses in each partition.
+
+    Args:
+        memory_address (np.ndarray): Array of addresses.
+        n_bits_offset (int): Number of offset bits.
+        n_bits_indice (int): Number of index bits.
+        n_partitions (int): Number of partitions.
+    Returns:
+        tuple[np.ndarray, np.ndarray, list[tuple[int, int]]]: uint32 addresses grouped by partition, position in the
+            trace of each of them, and start and end of each partition.
+    """
+    addresses = np.asarray(memory_address).astype(np.uint32)
+    owner = ((addresses >> n_bits_offset) & ((1 << n_bits_indice) - 1)) % n_partitions
+    order = np.argsort(owner, kind="stable")
+
+    bounds = np.searchsorted(owner[order], np.arange(n_partitions + 1)).tolist()
+    return addresses[order], order, list(zip(bounds[:-1], bounds[1:]))
+
+def simulate_partition(config: tuple, shared_name: str, size: int, start: int, end: int) -> None:
+    """
+    Simulate one partition in a worker process, and write the hits in the shared memory block.
+
+    Args:
+        config (tuple): nsets, bsize, ways, subs_method and seed of the cache.
+        shared_name (str): Name of the shared memory block, with the partitioned addresses followed by one hit flag per access.
+        size (int): Number of accesses in the whole trace.
+        start (int): First access of the partition.
+        end (int): End of the partition.
+    """
+    from .cache import Cache
+    from .file_reader import CHUNK_SIZE
+
+    nsets, bsize, ways, subs_method, seed = config
+    cache = Cache(nsets, bsize, ways, subs_method, 1, "", seed=seed, classify=False)
+
+    block = shared_memory.SharedMemory(name=shared_name)
+    try:
+        addresses = np.ndarray((size,), dtype=np.uint32, buffer=block.buf)
+        hits = np.ndarray((size,), dtype=np.bool_, buffer=block.buf, offset=size * 4)
+        for position in range(start, end, CHUNK_SIZE):
+            chunk_end = min(position + CHUNK_SIZE, end)
+            hits[position:chunk_end] = np.array(cache.process_chunk(addresses[position:chunk_end])) == HIT
+        del addresses, hits
+    finally:
+        block.close()
+
+def simulate_partitioned(config: tuple, memory_address: np.ndarray, n_bits_offset: int, n_bits_indice: int, workers: int, classify: bool = True) -> list[int]:
+    """
+    Simulate a cache configuration over the trace, split by set index between worker processes.
+
+    Args:
+        config (tuple): nsets, bsize, ways, subs_method and seed of the cache. The seed must not be None
+            for the random substitution, so the result does not depend on the number of workers.
+        memory_address (np.ndarray): Array of addresses.
+        n_bits_offset (int): Number of offset bits.
+        n_bits_indice (int): Number of index bits.
+        workers (int): Number of worker processes.
+        classify (bool): Classify the misses. OPTIONAL. Default is True.
+    Returns:
+        list[int]: Counters of the whole trace, indexed by outcome code (see outcome.py).
+    """
+    nsets, bsize, ways, _, _ = config
+    size = len(memory_address)
+    addresses, order, partitions = partition_by_set(memory_address, n_bits_offset, n_bits_indice, workers)
+
+    # Share the partitioned trace and the hit flags with the workers instead of pickling them
+    block = shared_memory.SharedMemory(create=True, size=max(size * 5, 1))
+    try:
+        np.ndarray((size,), dtype=np.uint32, buffer=block.buf)[:] = addresses
+        del addresses
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(simulate_partition, config, block.name, size, start, end) for start, end in partitions if end > start]
+
+            # Classify the misses of the whole trace while the workers run
+            if classify:
+                distances = stack_distances(memory_address, bsize, 1)
+                cold = distances == COLD
+                full_hit = ~cold & (distances < nsets * ways)
+                del distances
+
+            for future in futures:
+                future.result()
+
+        # Hit flags back in trace order
+        hits = np.empty(size, dtype=np.bool_)
+        hits[order] = np.ndarray((size,), dtype=np.bool_, buffer=block.buf, offset=size * 4)
+    finally:
+        block.close()
+        block.unlink()
+
+    counts = [0] * len(OUTCOME_NAMES)
+    counts[HIT] = int(np.count_nonzero(hits))
+    if classify:
+        misses = ~hits
+        counts[COMPULSORY_MISS] = int(np.count_nonzero(cold))
+        counts[CONFLICT_MISS] = int(np.count_nonzero(misses & full_hit))
+        counts[CAPACITY_MISS] = size - counts[HIT] - counts[COMPULSORY_MISS] - counts[CONFLICT_MISS]
+    return counts
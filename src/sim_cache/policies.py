@@ -0,0 +1,698 @@
+"""
+File: policies.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Replacement policies of the cache. A policy keeps the replacement metadata of every set and chooses
+             the way to replace in a full set; CacheSet only tells it about hits, fills and invalidations, so a
+             new policy is a ReplacementPolicy subclass registered with its subs_method code, without touching
+             the simulation loop.
+             Policies (code: name):
+                R: Random, from per-set random streams pregenerated in batches (seeded, or with a seed drawn once)
+                L: LRU, ordered dict of the ways of each set from least to most recently used
+                F: FIFO, next way to replace of each set
+                O: OPT, Belady's MIN with the next-use index of the trace (see optimal.py) and a lazy max-heap per set
+                P: PLRU, tree pseudo-LRU, one bit per tree node and lookup tables for the victim
+                S: SRRIP, static re-reference interval prediction (2-bit RRPV, hit priority)
+                B: BRRIP, bimodal RRIP, new blocks are predicted distant except once in BRRIP_LONG_CHANCE
+                U: LFU, least frequently used way (frequency buckets, oldest first on ties)
+             Every operation of L, F, R, P, S, B and U is O(1) in the associativity (tree PLRU with up to
+             PLRU_TABLE_WAYS ways), O is O(log ways).
+"""
+
+from collections import OrderedDict
+from functools import lru_cache
+from heapq import heapify, heappop, heappush
+from random import getrandbits
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+
+from .optimal import NEVER
+
+MASK_64 = (1 << 64) - 1
+
+# Random draws generated at a time for a set
+RANDOM_BATCH = 64
+
+# Entries of the next-use index converted to a list at a time
+NEXT_USE_WINDOW = 1 << 16
+
+# Next use of an invalidated way, below any position so its heap entries are stale
+NO_NEXT_USE = -1
+
+# Largest associativity with a victim lookup table for tree PLRU (the table has 2^(ways-1) entries)
+PLRU_TABLE_WAYS = 16
+
+# Re-reference prediction values of RRIP (2 bits): near-immediate (0) up to distant (RRPV_MAX)
+RRPV_MAX = 3
+
+# BRRIP inserts a block as long (RRPV_MAX - 1) instead of distant once in this many fills
+BRRIP_LONG_CHANCE = 32
+
+# Unused way in the order matrices of the checkpoints
+NO_WAY = -1
+
+def splitmix64(value: int) -> int:
+    """
+    Hash a 64 bit integer with the SplitMix64 finalizer. Used as a stateless random generator.
+
+    Args:
+        value (int): Value to hash.
+    Returns:
+        int: 64 bit hash of the value.
+    """
+    value = (value + 0x9E3779B97F4A7C15) & MASK_64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return value ^ (value >> 31)
+
+def splitmix64_array(values: np.ndarray) -> np.ndarray:
+    """
+    Hash an array of 64 bit integers with the SplitMix64 finalizer (same values as splitmix64).
+
+    Args:
+        values (np.ndarray): uint64 values to hash.
+    Returns:
+        np.ndarray: uint64 hashes.
+    """
+    # uint64 arithmetic wraps around, as the masks of splitmix64 do
+    values = values + np.uint64(0x9E3779B97F4A7C15)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+class SetStreams:
+    """
+    Random streams, one per set. A draw only depends on the seed, the set index and the number of draws of the
+    set, so the result does not depend on how the sets are split between processes. The draws of a set are
+    generated RANDOM_BATCH at a time with numpy.
+    """
+
+    def __init__(self, nsets: int, seed: int = None) -> None:
+        # A seed is drawn once without one, the streams are the same from there on
+        self.seed = (seed if seed is not None else getrandbits(64)) & MASK_64
+        self.draws: list[int] = [0] * nsets
+        self.batches: list[list[int] | None] = [None] * nsets
+
+    def draw(self, index: int) -> int:
+        """
+        Draw the next random 64 bit integer of a set.
+
+        Args:
+            index (int): Index of the set.
+        Returns:
+            int: Random value.
+        """
+        draw = self.draws[index]
+        self.draws[index] = draw + 1
+        offset = draw % RANDOM_BATCH
+        batch = self.batches[index]
+        if offset == 0 or batch is None:
+            batch = self.batches[index] = self.generate(index, draw - offset)
+        return batch[offset]
+
+    def generate(self, index: int, start: int) -> list[int]:
+        """
+        Generate a batch of draws of a set.
+
+        Args:
+            index (int): Index of the set.
+            start (int): Number of the first draw of the batch.
+        Returns:
+            list[int]: RANDOM_BATCH random values.
+        """
+        base = splitmix64(self.seed ^ splitmix64(index))
+        counters = np.uint64(base) + np.arange(start, start + RANDOM_BATCH, dtype=np.uint64)
+        return splitmix64_array(counters).tolist()
+
+    def get_state(self) -> dict[str, np.ndarray]:
+        return {
+            "random_draws": np.array(self.draws, dtype=np.int64),
+            "random_seed": np.array([self.seed], dtype=np.uint64),
+        }
+
+    def set_state(self, arrays: dict[str, np.ndarray]) -> None:
+        if "random_seed" in arrays:
+            self.seed = int(arrays["random_seed"][0])
+        if len(arrays.get("random_draws", ())) == len(self.draws):
+            self.draws = arrays["random_draws"].tolist()
+        self.batches = [None] * len(self.draws)
+
+def order_matrix(orders: Iterable[Iterable[int] | None], ways: int) -> np.ndarray:
+    """
+    Store the ways of each set in order as a matrix, for the checkpoints.
+
+    Args:
+        orders (Iterable[Iterable[int] | None]): Slots (index * ways + way) of each set, in order.
+        ways (int): Number of ways in the set.
+    Returns:
+        np.ndarray: int32 matrix with the ways of each set in order, NO_WAY past them.
+    """
+    orders = list(orders)
+    matrix = np.full((len(orders), ways), NO_WAY, dtype=np.int32)
+    for index, order in enumerate(orders):
+        slots = list(order or ())
+        if slots:
+            matrix[index, :len(slots)] = [slot - index * ways for slot in slots]
+    return matrix
+
+def order_rows(matrix: np.ndarray, ways: int) -> Iterator[tuple[int, list[int]]]:
+    """
+    Read back the ways of each set from an order matrix (see order_matrix).
+
+    Args:
+        matrix (np.ndarray): Order matrix.
+        ways (int): Number of ways in the set.
+    Yields:
+        tuple[int, list[int]]: Index of a set with ways, and its slots in order.
+    """
+    for index, row in enumerate(matrix.tolist()):
+        slots = [index * ways + way for way in row if way != NO_WAY]
+        if slots:
+            yield index, slots
+
+class ReplacementPolicy:
+    """
+    Replacement policy of a cache. The slot of a way is its position in the flat arrays of CacheSet (index * ways + way).
+    """
+
+    # Name shown in the web interface
+    name = ""
+
+    # Hits and fills change the metadata (access and fill are only called when they do)
+    tracks_hits = False
+    tracks_fills = False
+
+    # The policy looks ahead in the trace (see set_next_use)
+    needs_next_use = False
+
+    def __init__(self, nsets: int, ways: int, seed: int = None) -> None:
+        self.nsets = nsets
+        self.ways = ways
+        self.seed = seed
+
+    def access(self, index: int, slot: int) -> None:
+        """
+        Record a hit on a way.
+
+        Args:
+            index (int): Index of the set.
+            slot (int): Position of the way.
+        """
+
+    def fill(self, index: int, slot: int) -> None:
+        """
+        Record a block placed in a way (an invalid way, or the victim just chosen).
+
+        Args:
+            index (int): Index of the set.
+            slot (int): Position of the way.
+        """
+
+    def victim(self, index: int) -> int:
+        """
+        Choose the way to replace in a full set.
+
+        Args:
+            index (int): Index of the set.
+        Returns:
+            int: Position of the way.
+        """
+        raise NotImplementedError
+
+    def invalidate(self, index: int, slot: int) -> None:
+        """
+        Forget a way whose block was removed (it is filled again before any victim is chosen in the set).
+
+        Args:
+            index (int): Index of the set.
+            slot (int): Position of the way.
+        """
+
+    def get_state(self) -> dict[str, np.ndarray]:
+        """
+        Get the metadata as numpy arrays, for the checkpoints.
+
+        Returns:
+            dict[str, np.ndarray]: Arrays of the metadata, by name.
+        """
+        return {}
+
+    def set_state(self, arrays: dict[str, np.ndarray]) -> None:
+        """
+        Restore the metadata from the arrays of a checkpoint (see get_state).
+
+        Args:
+            arrays (dict[str, np.ndarray]): Arrays of the checkpoint, by name.
+        """
+
+# subs_method code -> replacement policy class
+POLICIES: dict[str, type[ReplacementPolicy]] = {}
+
+def register_policy(code: str) -> Callable[[type[ReplacementPolicy]], type[ReplacementPolicy]]:
+    """
+    Register a replacement policy class with its subs_method code (class decorator).
+
+    Args:
+        code (str): subs_method code of the policy.
+    Returns:
+        Callable: Decorator that registers the class.
+    """
+    def register(policy: type[ReplacementPolicy]) -> type[ReplacementPolicy]:
+        if code in POLICIES:
+            out_message = "Replacement policy: {} is already registered."
+            raise Exception(out_message.format(code))
+        POLICIES[code] = policy
+        return policy
+    return register
+
+def create_policy(code: str, nsets: int, ways: int, seed: int = None) -> ReplacementPolicy:
+    """
+    Create the replacement policy of a cache.
+
+    Args:
+        code (str): subs_method code of the policy.
+        nsets (int): Number of sets.
+        ways (int): Number of ways in the set.
+        seed (int): Seed of the random policies. OPTIONAL. Default is None (a seed is drawn).
+    Returns:
+        ReplacementPolicy: Policy with the metadata of every set.
+    """
+    if code not in POLICIES:
+        out_message = "Replacement policy: {} is not registered, use one of {}."
+        raise Exception(out_message.format(code, ", ".join(POLICIES)))
+    return POLICIES[code](nsets, ways, seed)
+
+@register_policy("R")
+class RandomPolicy(ReplacementPolicy):
+    name = "Random"
+
+    def __init__(self, nsets: int, ways: int, seed: int = None) -> None:
+        super().__init__(nsets, ways, seed)
+        self.streams = SetStreams(nsets, seed)
+
+    def victim(self, index: int) -> int:
+        return index * self.ways + self.streams.draw(index) % self.ways
+
+    def get_state(self) -> dict[str, np.ndarray]:
+        return self.streams.get_state()
+
+    def set_state(self, arrays: dict[str, np.ndarray]) -> None:
+        self.streams.set_state(arrays)
+
+@register_policy("L")
+class LRUPolicy(ReplacementPolicy):
+    name = "LRU"
+    tracks_hits = True
+    tracks_fills = True
+
+    def __init__(self, nsets: int, ways: int, seed: int = None) -> None:
+        super().__init__(nsets, ways, seed)
+        # Ways of each set from least to most recently used (created on first use)
+        self.order: list[OrderedDict | None] = [None] * nsets
+
+    def access(self, index: int, slot: int) -> None:
+        self.order[index].move_to_end(slot)
+
+    def fill(self, index: int, slot: int) -> None:
+        order = self.order[index]
+        if order is None:
+            order = self.order[index] = OrderedDict()
+        order[slot] = None
+
+    def victim(self, index: int) -> int:
+        return self.order[index].popitem(last=False)[0]
+
+    def invalidate(self, index: int, slot: int) -> None:
+        del self.order[index][slot]
+
+    def get_state(self) -> dict[str, np.ndarray]:
+        return {"lru": order_matrix(self.order, self.ways)}
+
+    def set_state(self, arrays: dict[str, np.ndarray]) -> None:
+        for index, slots in order_rows(arrays["lru"], self.ways):
+            self.order[index] = OrderedDict.fromkeys(slots)
+
+@register_policy("F")
+class FIFOPolicy(ReplacementPolicy):
+    name = "FIFO"
+
+    def __init__(self, nsets: int, ways: int, seed: int = None) -> None:
+        super().__init__(nsets, ways, seed)
+        # Next way to replace in each set
+        self.next_way: list[int] = [0] * nsets
+
+    def victim(self, index: int) -> int:
+        # Replace the way filled first, then move on to the next one
+        way = self.next_way[index]
+        self.next_way[index] = (way + 1) % self.ways
+        return index * self.ways + way
+
+    def get_state(self) -> dict[str, np.ndarray]:
+        return {"fifo_next": np.array(self.next_way, dtype=np.int32)}
+
+    def set_state(self, arrays: dict[str, np.ndarray]) -> None:
+        self.next_way = arrays["fifo_next"].tolist()
+
+@register_policy("O")
+class OPTPolicy(ReplacementPolicy):
+    name = "OPT"
+    tracks_hits = True
+    tracks_fills = True
+    needs_next_use = True
+
+    def __init__(self, nsets: int, ways: int, seed: int = None) -> None:
+        super().__init__(nsets, ways, seed)
+        # Lazy max-heap of (-next use, slot) entries per set (created on first use), and the next use of the block in each way
+        self.heaps: list[list | None] = [None] * nsets
+        self.slot_next: list[int] = [NO_NEXT_USE] * (nsets * ways)
+
+        # Next-use index of the trace, and the position of the current access in it
+        self.next_use: np.ndarray | None = None
+        self.position = 0
+        self.window: list[int] = []
+        self.window_start = 0
+
+    def set_next_use(self, next_use: np.ndarray) -> None:
+        """
+        Set the next-use index of the trace. The next access is its first one.
+
+        Args:
+            next_use (np.ndarray): Position of the next access to the same block, for each access (see optimal.py).
+        """
+        self.next_use = next_use
+        self.position = 0
+        self.window = []
+        self.window_start = 0
+
+    def access(self, index: int, slot: int) -> None:
+        # Next use of the current access, from a window of the index converted to a list
+        offset = self.position - self.window_start
+        if offset >= len(self.window):
+            self.load_window()
+            offset = 0
+        following = self.window[offset]
+        self.position += 1
+
+        self.slot_next[slot] = following
+        heap = self.heaps[index]
+        if heap is None:
+            heap = self.heaps[index] = []
+        heappush(heap, (-following, slot))
+
+        # Drop the stale entries once they outnumber the ways
+        if len(heap) > 2 * self.ways:
+            slot_next = self.slot_next
+            live = {way: priority for priority, way in heap if slot_next[way] == -priority}
+            heap = [(priority, way) for way, priority in live.items()]
+            heapify(heap)
+            self.heaps[index] = heap
+
+    fill = access
+
+    def victim(self, index: int) -> int:
+        # Skip the entries of the ways accessed again since they were pushed
+        heap = self.heaps[index]
+        slot_next = self.slot_next
+        while -heap[0][0] != slot_next[heap[0][1]]:
+            heappop(heap)
+        return heappop(heap)[1]
+
+    def invalidate(self, index: int, slot: int) -> None:
+        self.slot_next[slot] = NO_NEXT_USE
+
+    def load_window(self) -> None:
+        """
+        Convert the next window of the next-use index to a list, starting at the current access.
+        """
+        if self.next_use is None:
+            raise Exception("OPT substitution: the next-use index of the trace is not set (see Cache.set_next_use).")
+        if self.position >= len(self.next_use):
+            out_message = "OPT substitution: the next-use index has {} accesses, the trace is longer."
+            raise Exception(out_message.format(len(self.next_use)))
+
+        self.window_start = self.position
+        self.window = self.next_use[self.window_start:self.window_start + NEXT_USE_WINDOW].tolist()
+
+    def get_state(self) -> dict[str, np.ndarray]:
+        raise Exception("Checkpoint: the OPT substitution looks ahead in the whole trace, it can not be saved.")
+
+@lru_cache(maxsize=None)
+def plru_tables(ways: int) -> tuple[list[int], list[int], list[int] | None]:
+    """
+    Get the lookup tables of a tree PLRU of some ways. The tree nodes are numbered as a heap (node 0 is the root,
+    the children of node n are 2n + 1 and 2n + 2, the ways are the leaves) and bit n of the state is 0 when the
+    victim is under the left child of node n.
+
+    Args:
+        ways (int): Number of ways (power of two).
+    Returns:
+        tuple[list[int], list[int], list[int] | None]: For each way, the bits of the nodes on its path and their
+            value once the way is used (pointing away from it), and the victim of each state (None past PLRU_TABLE_WAYS ways).
+    """
+    masks = []
+    values = []
+    for way in range(ways):
+        mask = 0
+        value = 0
+        node = ways - 1 + way
+        while node > 0:
+            parent = (node - 1) // 2
+            mask |= 1 << parent
+            # Coming from the left child, the victim is now on the right
+            if node == 2 * parent + 1:
+                value |= 1 << parent
+            node = parent
+        masks.append(mask)
+        values.append(value)
+
+    victims = [plru_walk(bits, ways) for bits in range(1 << (ways - 1))] if ways <= PLRU_TABLE_WAYS else None
+    return masks, values, victims
+
+def plru_walk(bits: int, ways: int) -> int:
+    """
+    Follow the bits of a tree PLRU from the root to the victim way.
+
+    Args:
+        bits (int): State of the tree.
+        ways (int): Number of ways (power of two).
+    Returns:
+        int: Victim way.
+    """
+    node = 0
+    while node < ways - 1:
+        node = 2 * node + 1 + ((bits >> node) & 1)
+    return node - (ways - 1)
+
+@register_policy("P")
+class TreePLRUPolicy(ReplacementPolicy):
+    name = "PLRU"
+    tracks_hits = True
+    tracks_fills = True
+
+    def __init__(self, nsets: int, ways: int, seed: int = None) -> None:
+        super().__init__(nsets, ways, seed)
+        if ways & (ways - 1):
+            out_message = "Tree PLRU: assoc {} needs to be a power of 2."
+            raise Exception(out_message.format(ways))
+
+        # Tree bits of each set
+        self.bits: list[int] = [0] * nsets
+        self.masks, self.values, self.victims = plru_tables(ways)
+
+    def access(self, index: int, slot: int) -> None:
+        # Point every node on the path of the way away from it
+        way = slot - index * self.ways
+        self.bits[index] = (self.bits[index] & ~self.masks[way]) | self.values[way]
+
+    fill = access
+
+    def victim(self, index: int) -> int:
+        bits = self.bits[index]
+        way = self.victims[bits] if self.victims is not None else plru_walk(bits, self.ways)
+        return index * self.ways + way
+
+    def get_state(self) -> dict[str, np.ndarray]:
+        # The ways - 1 tree bits of each set, as 64 bit words (least significant first), for any associativity
+        words = max(1, -(-(self.ways - 1) // 64))
+        return {"plru_bits": np.array([[(bits >> (64 * word)) & MASK_64 for word in range(words)] for bits in self.bits], dtype=np.uint64).reshape(self.nsets, words)}
+
+    def set_state(self, arrays: dict[str, np.ndarray]) -> None:
+        matrix = arrays["plru_bits"]
+        # Checkpoints written before the words held one uint64 per set
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(-1, 1)
+        self.bits = [sum(word << (64 * position) for position, word in enumerate(row)) for row in matrix.tolist()]
+
+@register_policy("S")
+class SRRIPPolicy(ReplacementPolicy):
+    name = "SRRIP"
+    tracks_hits = True
+    tracks_fills = True
+
+    def __init__(self, nsets: int, ways: int, seed: int = None) -> None:
+        super().__init__(nsets, ways, seed)
+        # Ways of each set by re-reference prediction value, oldest first (created on first use).
+        # Aging every way of a set shifts the list, so it is O(RRPV_MAX) instead of O(ways)
+        self.levels: list[list[OrderedDict] | None] = [None] * nsets
+
+        # Level of the block in each way, None for the invalid ones
+        self.slot_level: list[OrderedDict | None] = [None] * (nsets * ways)
+
+    def insertion(self, index: int) -> int:
+        """
+        Get the prediction value of a new block.
+
+        Args:
+            index (int): Index of the set.
+        Returns:
+            int: Prediction value, long re-reference interval.
+        """
+        return RRPV_MAX - 1
+
+    def access(self, index: int, slot: int) -> None:
+        # A hit predicts a near-immediate re-reference
+        del self.slot_level[slot][slot]
+        near = self.levels[index][0]
+        near[slot] = None
+        self.slot_level[slot] = near
+
+    def fill(self, index: int, slot: int) -> None:
+        levels = self.levels[index]
+        if levels is None:
+            levels = self.levels[index] = [OrderedDict() for _ in range(RRPV_MAX + 1)]
+        level = levels[self.insertion(index)]
+        level[slot] = None
+        self.slot_level[slot] = level
+
+    def victim(self, index: int) -> int:
+        levels = self.levels[index]
+        distant = levels[RRPV_MAX]
+
+        # Age every way until one is predicted distant, by the gap between the highest value and distant
+        if not distant:
+            gap = RRPV_MAX - max(value for value in range(RRPV_MAX) if levels[value])
+            levels[:] = [OrderedDict() for _ in range(gap)] + levels[:RRPV_MAX + 1 - gap]
+            distant = levels[RRPV_MAX]
+
+        slot = distant.popitem(last=False)[0]
+        self.slot_level[slot] = None
+        return slot
+
+    def invalidate(self, index: int, slot: int) -> None:
+        del self.slot_level[slot][slot]
+        self.slot_level[slot] = None
+
+    def get_state(self) -> dict[str, np.ndarray]:
+        rrpv = np.full(self.nsets * self.ways, NO_WAY, dtype=np.int8)
+        orders = []
+        for levels in self.levels:
+            order = []
+            for value, level in enumerate(levels or ()):
+                rrpv[list(level)] = value
+                order.extend(level)
+            orders.append(order)
+        return {"rrpv": rrpv, "rrip_order": order_matrix(orders, self.ways)}
+
+    def set_state(self, arrays: dict[str, np.ndarray]) -> None:
+        rrpv = arrays["rrpv"].tolist()
+        for index, slots in order_rows(arrays["rrip_order"], self.ways):
+            levels = self.levels[index] = [OrderedDict() for _ in range(RRPV_MAX + 1)]
+            for slot in slots:
+                level = levels[rrpv[slot]]
+                level[slot] = None
+                self.slot_level[slot] = level
+
+@register_policy("B")
+class BRRIPPolicy(SRRIPPolicy):
+    name = "BRRIP"
+
+    def __init__(self, nsets: int, ways: int, seed: int = None) -> None:
+        super().__init__(nsets, ways, seed)
+        self.streams = SetStreams(nsets, seed)
+
+    def insertion(self, index: int) -> int:
+        # Distant, and long once in a while so a working set larger than the cache keeps some blocks
+        return RRPV_MAX - 1 if self.streams.draw(index) % BRRIP_LONG_CHANCE == 0 else RRPV_MAX
+
+    def get_state(self) -> dict[str, np.ndarray]:
+        return {**super().get_state(), **self.streams.get_state()}
+
+    def set_state(self, arrays: dict[str, np.ndarray]) -> None:
+        super().set_state(arrays)
+        self.streams.set_state(arrays)
+
+@register_policy("U")
+class LFUPolicy(ReplacementPolicy):
+    name = "LFU"
+    tracks_hits = True
+    tracks_fills = True
+
+    def __init__(self, nsets: int, ways: int, seed: int = None) -> None:
+        super().__init__(nsets, ways, seed)
+        # Accesses to the block in each way since it was filled
+        self.count: list[int] = [0] * (nsets * ways)
+
+        # Count -> ways of each set with it, in the order they reached it (created on first use), and the lowest count
+        self.buckets: list[dict[int, OrderedDict] | None] = [None] * nsets
+        self.min_count: list[int] = [0] * nsets
+
+    def access(self, index: int, slot: int) -> None:
+        # Move the way to the bucket of the next count
+        count = self.count[slot]
+        buckets = self.buckets[index]
+        bucket = buckets[count]
+        del bucket[slot]
+        if not bucket:
+            del buckets[count]
+            if self.min_count[index] == count:
+                self.min_count[index] = count + 1
+
+        count += 1
+        self.count[slot] = count
+        bucket = buckets.get(count)
+        if bucket is None:
+            bucket = buckets[count] = OrderedDict()
+        bucket[slot] = None
+
+    def fill(self, index: int, slot: int) -> None:
+        buckets = self.buckets[index]
+        if buckets is None:
+            buckets = self.buckets[index] = {}
+        bucket = buckets.get(1)
+        if bucket is None:
+            bucket = buckets[1] = OrderedDict()
+        bucket[slot] = None
+        self.count[slot] = 1
+        self.min_count[index] = 1
+
+    def victim(self, index: int) -> int:
+        # The way that reached the lowest count first
+        buckets = self.buckets[index]
+        count = self.min_count[index]
+        bucket = buckets[count]
+        slot = bucket.popitem(last=False)[0]
+        if not bucket:
+            del buckets[count]
+        self.count[slot] = 0
+        return slot
+
+    def invalidate(self, index: int, slot: int) -> None:
+        buckets = self.buckets[index]
+        count = self.count[slot]
+        del buckets[count][slot]
+        if not buckets[count]:
+            del buckets[count]
+        self.count[slot] = 0
+
+    def get_state(self) -> dict[str, np.ndarray]:
+        orders = [[slot for count in sorted(buckets) for slot in buckets[count]] if buckets else None for buckets in self.buckets]
+        return {"lfu_count": np.array(self.count, dtype=np.int64), "lfu_order": order_matrix(orders, self.ways)}
+
+    def set_state(self, arrays: dict[str, np.ndarray]) -> None:
+        self.count = arrays["lfu_count"].tolist()
+        for index, slots in order_rows(arrays["lfu_order"], self.ways):
+            buckets = self.buckets[index] = {}
+            for slot in slots:
+                buckets.setdefault(self.count[slot], OrderedDict())[slot] = None
+            self.min_count[index] = min(buckets)
@@ -0,0 +1,183 @@
+"""
+File: profiler.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Phase instrumentation for the cache simulation. A Profiler records the wall and CPU time of each
+             phase (read_file, cache_init, simulate, get_output), and builds a JSON record with the throughput,
+             the peak memory and the hot-path operation counts of the cache. The operation counts are derived from
+             the counters the cache already keeps, so nothing is added to the simulation loop.
+             The simulate phase can also run under a hook: "cprofile" (cProfile, dumped as a .prof file for pstats
+             or snakeviz) or "sample" (a sampling profiler thread, dumped as collapsed stacks for flame graphs).
+             Without a profiler the simulation does not run any of this.
+"""
+
+import cProfile
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from time import perf_counter, process_time
+from typing import Iterator
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+# Profiler hooks, and the default dump file of each one
+PROFILE_HOOKS = {"cprofile": "profile.prof", "sample": "profile.folded"}
+
+# Time between two samples of the sampling profiler (in seconds)
+SAMPLE_INTERVAL = 0.001
+
+def peak_rss() -> int | None:
+    """
+    Get the peak resident set size of this process.
+
+    Returns:
+        int | None: Peak RSS in bytes, None if it can not be measured on this platform.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class Sampler:
+    """
+    Sampling profiler. A background thread records the call stack of a thread at a fixed interval.
+    Same enable, disable and dump_stats methods as cProfile.Profile.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL) -> None:
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()   # Collapsed stack (root first, ";" separated) -> samples
+        self.thread: threading.Thread | None = None
+        self.stopped = threading.Event()
+
+    def enable(self) -> None:
+        """
+        Start sampling the calling thread.
+        """
+        target = threading.get_ident()
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, args=(target,), daemon=True)
+        self.thread.start()
+
+    def run(self, target: int) -> None:
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            stack = []
+            while frame is not None:
+                stack.append("{}:{}".format(frame.f_code.co_filename.rsplit("/", 1)[-1].rsplit("\\", 1)[-1], frame.f_code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def disable(self) -> None:
+        """
+        Stop sampling.
+        """
+        self.stopped.set()
+        self.thread.join()
+
+    def dump_stats(self, file_path: str) -> None:
+        """
+        Write the samples as collapsed stacks, one "stack count" line per stack.
+
+        Args:
+            file_path (str): Path to the dump file.
+        """
+        with open(file_path, "w") as file:
+            for stack, count in self.stacks.most_common():
+                file.write("{} {}\n".format(stack, count))
+
+class Profiler:
+    def __init__(self, hook: str = None, dump: str = None, sample_interval: float = SAMPLE_INTERVAL) -> None:
+        if hook is not None and hook not in PROFILE_HOOKS:
+            out_message = "Profile hook: {} is not supported, use one of {}."
+            raise Exception(out_message.format(hook, ", ".join(PROFILE_HOOKS)))
+
+        self.hook = hook                                            # Profiler of the hooked phase, None for no hook
+        self.dump = dump or (PROFILE_HOOKS[hook] if hook else None) # Dump file of the hook
+        self.sample_interval = sample_interval
+
+        # One profiler for every hooked phase, dumped once when the simulation finishes
+        self.profile: cProfile.Profile | Sampler | None = None
+        if hook == "cprofile":
+            self.profile = cProfile.Profile()
+        elif hook == "sample":
+            self.profile = Sampler(sample_interval)
+
+        # Phase name -> wall and CPU time (in seconds), in the order they ran
+        self.phases: dict[str, dict[str, float]] = {}
+
+        # Profile record, built when the simulation finishes
+        self.result: dict | None = None
+
+    @contextmanager
+    def phase(self, name: str, hooked: bool = False) -> Iterator[None]:
+        """
+        Time a phase. A phase that runs more than once adds up, and so does its profile.
+
+        Args:
+            name (str): Name of the phase.
+            hooked (bool): Run the phase under the hook, if any. OPTIONAL. Default is False.
+        """
+        profile = self.profile if hooked else None
+
+        wall = perf_counter()
+        cpu = process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            times = self.phases.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0})
+            times["wall_seconds"] += perf_counter() - wall
+            times["cpu_seconds"] += process_time() - cpu
+
+    def finish(self, cache, parallel: bool = False) -> dict:
+        """
+        Build the profile record of a simulation, keep it in result, and dump the hook profile.
+
+        Args:
+            cache (Cache): Simulated cache.
+            parallel (bool): The sets were simulated by worker processes, so the cache structure of this
+                process was not updated. OPTIONAL. Default is False.
+        Returns:
+            dict: Time of each phase, total time, accesses, throughput (accesses per second of the simulate
+                phase), peak RSS (in bytes), operation counts and hook dump file.
+        """
+        simulate = self.phases.get("simulate", {}).get("wall_seconds", 0.0)
+        accesses = cache.total_accesses
+        misses = accesses - cache.memory_access_hit
+
+        # Every access is one block lookup (and one shadow update when classifying), every miss either
+        # fills an invalid way or replaces a block
+        fills = None if parallel else cache.cache_set.occupied_blocks
+        counters = {
+            "lookups": accesses,
+            "hits": cache.memory_access_hit,
+            "misses": misses,
+            "fills": fills,
+            "replacements": None if parallel else misses - fills,
+            "shadow_updates": accesses if cache.classify else 0,
+        }
+
+        self.result = {
+            "phases": self.phases,
+            "wall_seconds": sum(times["wall_seconds"] for times in self.phases.values()),
+            "cpu_seconds": sum(times["cpu_seconds"] for times in self.phases.values()),
+            "accesses": accesses,
+            "accesses_per_second": accesses / simulate if simulate > 0 else 0.0,
+            "peak_rss_bytes": peak_rss(),
+            "operations": counters,
+            "hook": {"name": self.hook, "dump": self.dump} if self.hook else None,
+        }
+
+        if self.profile is not None:
+            self.profile.dump_stats(self.dump)
+        return self.result
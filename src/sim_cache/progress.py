@@ -0,0 +1,68 @@
+"""
+File: progress.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Progress reports of a running cache simulation. The simulation is split in steps of a given number
+             of accesses, and after each step the callback gets the running statistics (counters, rates and
+             throughput) if enough time went by since the last report. Without a progress object the simulation
+             does not check anything per step.
+"""
+
+from time import perf_counter
+from typing import Callable
+
+# Accesses simulated between two checks
+PROGRESS_EVERY = 1 << 14
+
+# Minimum time between two reports (in seconds)
+PROGRESS_INTERVAL = 0.25
+
+class Progress:
+    def __init__(self, callback: Callable[[dict], None], every: int = PROGRESS_EVERY, interval: float = PROGRESS_INTERVAL, total: int = None) -> None:
+        self.callback = callback        # Called with the running statistics (see snapshot)
+        self.every = every              # Accesses simulated between two checks
+        self.interval = interval        # Minimum time between two reports (in seconds), 0 reports every check
+        self.total = total              # Accesses to simulate, None if unknown (streams)
+
+        # Start of the simulation and time of the last report
+        self.started = perf_counter()
+        self.last = self.started
+
+    def start(self) -> None:
+        """
+        Restart the clock, when the simulation begins.
+        """
+        self.started = perf_counter()
+        self.last = self.started
+
+    def update(self, cache, final: bool = False) -> None:
+        """
+        Report the running statistics of a cache, if the last report is old enough.
+
+        Args:
+            cache (Cache): Cache being simulated.
+            final (bool): Report even if the last report is recent, at the end of the simulation. OPTIONAL.
+        """
+        now = perf_counter()
+        if final or now - self.last >= self.interval:
+            self.last = now
+            self.callback(self.snapshot(cache, now))
+
+    def snapshot(self, cache, now: float) -> dict:
+        """
+        Get the running statistics of a cache.
+
+        Args:
+            cache (Cache): Cache being simulated.
+            now (float): Current time (perf_counter).
+        Returns:
+            dict: Statistics of the cache (see Cache.get_statistics), plus the accesses processed, the total
+                accesses to simulate, the elapsed time (in seconds) and the throughput (accesses per second).
+        """
+        statistics = cache.get_statistics()
+        elapsed = now - self.started
+        statistics["processed"] = cache.total_accesses
+        statistics["total"] = self.total
+        statistics["elapsed"] = elapsed
+        statistics["accesses_per_second"] = cache.total_accesses / elapsed if elapsed > 0 else 0.0
+        return statistics
@@ -0,0 +1,169 @@
+"""
+File: result_store.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Per-access results of a simulation, kept on disk as a columnar access log (typed .npy columns, see
+             access_log.py) and read back through memory maps, without parsing. The accesses can be paged (offset and
+             limit) and filtered by outcome and set index, and exported as NDJSON or CSV lines. Every read goes through
+             the records one chunk at a time, so the memory used by a request does not depend on the size of the trace,
+             and a filter only reads the columns it tests before taking the matching rows of the others.
+"""
+
+import json
+from typing import Iterator
+
+import numpy as np
+
+from .access_log import COLUMN_DTYPES, read_columnar_log
+from .file_reader import CHUNK_SIZE
+from .outcome import CAPACITY_MISS, COMPULSORY_MISS, CONFLICT_MISS, HIT, MISS, OUTCOME_NAMES
+
+# Outcome filters, name -> outcome codes
+OUTCOME_FILTERS = {
+    "hit": (HIT,),
+    "miss": (COMPULSORY_MISS, CAPACITY_MISS, CONFLICT_MISS, MISS),
+    "compulsory": (COMPULSORY_MISS,),
+    "capacity": (CAPACITY_MISS,),
+    "conflict": (CONFLICT_MISS,),
+}
+
+# Export formats
+EXPORT_FORMATS = ("ndjson", "csv")
+
+def parse_outcomes(outcome: str | None) -> tuple[int, ...] | None:
+    """
+    Parse an outcome filter.
+
+    Args:
+        outcome (str | None): Comma separated outcome filter names (see OUTCOME_FILTERS), None for every outcome.
+    Returns:
+        tuple[int, ...] | None: Outcome codes to keep, None for every outcome.
+    """
+    if not outcome:
+        return None
+
+    codes = set()
+    for name in outcome.lower().split(","):
+        if name not in OUTCOME_FILTERS:
+            out_message = "Outcome: {} is not supported, use one of {}."
+            raise ValueError(out_message.format(name, ", ".join(OUTCOME_FILTERS)))
+        codes.update(OUTCOME_FILTERS[name])
+    return tuple(sorted(codes))
+
+class ResultStore:
+    def __init__(self, file_path: str, chunk_size: int = CHUNK_SIZE) -> None:
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+
+    def columns(self) -> dict[str, np.ndarray]:
+        """
+        Memory-map the columns.
+
+        Returns:
+            dict[str, np.ndarray]: Address, tag, index and outcome columns.
+        """
+        return read_columnar_log(self.file_path)
+
+    def __len__(self) -> int:
+        return len(self.columns()["outcome"])
+
+    def chunks(self, outcomes: tuple[int, ...] | None = None, index: int | None = None) -> Iterator[tuple[np.ndarray, ...]]:
+        """
+        Read the records that match the filters, one chunk at a time.
+
+        Args:
+            outcomes (tuple[int, ...] | None): Outcome codes to keep. OPTIONAL. Default is every outcome.
+            index (int | None): Set index to keep. OPTIONAL. Default is every set.
+        Returns:
+            Iterator[tuple[np.ndarray, ...]]: Address, tag, index and outcome arrays of the matching records of each chunk
+                (in memory, not memory-mapped).
+        """
+        columns = self.columns()
+        for start in range(0, len(columns["outcome"]), self.chunk_size):
+            end = start + self.chunk_size
+            keep = np.ones(len(columns["outcome"][start:end]), dtype=np.bool_)
+            if outcomes is not None:
+                keep &= np.isin(columns["outcome"][start:end], outcomes)
+            if index is not None:
+                keep &= columns["index"][start:end] == index
+            yield tuple(columns[name][start:end][keep] for name in COLUMN_DTYPES)
+
+    def count(self, outcomes: tuple[int, ...] | None = None, index: int | None = None) -> int:
+        """
+        Count the records that match the filters.
+
+        Args:
+            outcomes (tuple[int, ...] | None): Outcome codes to keep. OPTIONAL.
+            index (int | None): Set index to keep. OPTIONAL.
+        Returns:
+            int: Number of matching records.
+        """
+        if outcomes is None and index is None:
+            return len(self)
+        return sum(len(chunk[0]) for chunk in self.chunks(outcomes, index))
+
+    def page(self, offset: int, limit: int, outcomes: tuple[int, ...] | None = None, index: int | None = None) -> tuple[int, list[list[str]]]:
+        """
+        Get one page of the records that match the filters.
+
+        Args:
+            offset (int): Number of matching records to skip.
+            limit (int): Maximum number of records in the page.
+            outcomes (tuple[int, ...] | None): Outcome codes to keep. OPTIONAL.
+            index (int | None): Set index to keep. OPTIONAL.
+        Returns:
+            tuple[int, list[list[str]]]: Number of matching records, and table rows of the page.
+        """
+        # Without filters the page is a plain slice
+        if outcomes is None and index is None:
+            columns = self.columns()
+            return len(columns["outcome"]), rows(tuple(columns[name][offset:offset + limit] for name in COLUMN_DTYPES))
+
+        total = 0
+        page = []
+        for chunk in self.chunks(outcomes, index):
+            # Take the part of the chunk that falls in the page
+            start = max(offset - total, 0)
+            end = min(offset + limit - total, len(chunk[0]))
+            if start < end:
+                page.extend(rows(tuple(column[start:end] for column in chunk)))
+            total += len(chunk[0])
+        return total, page
+
+    def export(self, export_format: str, outcomes: tuple[int, ...] | None = None, index: int | None = None, header: bool = True) -> Iterator[str]:
+        """
+        Export the records that match the filters, as text lines generated one chunk at a time.
+
+        Args:
+            export_format (str): "ndjson" (one JSON object per line) or "csv" (with a header line).
+            outcomes (tuple[int, ...] | None): Outcome codes to keep. OPTIONAL.
+            index (int | None): Set index to keep. OPTIONAL.
+            header (bool): Start the CSV with a header line. OPTIONAL. Default is True.
+        Returns:
+            Iterator[str]: Text of each chunk.
+        """
+        if export_format not in EXPORT_FORMATS:
+            out_message = "Export format: {} is not supported, use one of {}."
+            raise ValueError(out_message.format(export_format, ", ".join(EXPORT_FORMATS)))
+
+        if export_format == "csv" and header:
+            yield "address,tag,index,outcome\n"
+        for chunk in self.chunks(outcomes, index):
+            if export_format == "csv":
+                yield "".join("{},{},{},{}\n".format(*row) for row in rows(chunk))
+            else:
+                yield "".join(
+                    json.dumps({"address": address, "tag": tag, "index": set_index, "outcome": OUTCOME_NAMES[outcome]}) + "\n"
+                    for address, tag, set_index, outcome in zip(*(column.tolist() for column in chunk))
+                )
+
+def rows(records: tuple[np.ndarray, ...]) -> list[list[str]]:
+    """
+    Get records as table rows.
+
+    Args:
+        records (tuple[np.ndarray, ...]): Address, tag, index and outcome arrays.
+    Returns:
+        list[list[str]]: Rows with the address, tag, index and outcome name.
+    """
+    return [[str(address), str(tag), str(index), OUTCOME_NAMES[outcome]] for address, tag, index, outcome in zip(*(column.tolist() for column in records))]
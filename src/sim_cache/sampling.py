@@ -0,0 +1,357 @@
+"""
+File: sampling.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Set-sampling approximate simulation, for a quick estimate of the rates of a long trace. Only a
+             deterministic sample of the sets is simulated: the sets whose hashed index is a multiple of the
+             sampling ratio (1 in ratio sets, the sample of a ratio holds the samples of its multiples).
+             The trace is filtered down to the accesses of those sets with array operations, one block at a time.
+             The sets of a cache do not interact, so the hits and the compulsory misses of the sampled sets are
+             exactly the ones of the whole cache (a block always maps to the same set).
+             The rates are ratio estimators over the sampled sets (hits over accesses, compulsory misses over misses),
+             with confidence intervals from the variance between the sets and the finite population correction.
+             The capacity/conflict split is only approximate: it needs a fully associative shadow of the whole cache,
+             and the shadow of the sampled sets only holds their blocks, so it is biased (towards capacity misses)
+             and reported without an interval. A sample always has at least MIN_SAMPLED_SETS sets.
+             With a target error, a pilot sample estimates that variance and the sampling ratio is the largest
+             power of two whose miss rate interval is predicted within the target.
+"""
+
+from math import sqrt
+
+import numpy as np
+
+from .access_log import AccessLog
+from .cache import Cache
+from .file_reader import CHUNK_SIZE
+from .optimal import next_use
+from .outcome import CAPACITY_MISS, COMPULSORY_MISS, CONFLICT_MISS, HIT, OUTCOME_NAMES
+from .policies import splitmix64_array
+from .progress import Progress
+
+# Salt of the set hash, so the sample is not the sets with the lowest indexes
+SAMPLE_SALT = 0x5E75A3D1
+
+# Addresses filtered at a time
+FILTER_CHUNK_SIZE = 1 << 22
+
+# Normal quantile of the confidence intervals (95 %)
+CONFIDENCE = 95
+Z_SCORE = 1.959964
+
+# Ratio of the pilot sample that picks the ratio for a target error
+PILOT_RATIO = 64
+
+# Fewest sets in a sample, so the variance between the sets can be estimated
+MIN_SAMPLED_SETS = 32
+
+# Rates split by the shrunken fully associative shadow, reported without an interval
+APPROXIMATE_RATES = ("capacity_miss_rate", "conflict_miss_rate")
+
+def sampled_sets(nsets: int, ratio: int) -> np.ndarray:
+    """
+    Get the sets of a sample, 1 in ratio sets chosen by hashing their index.
+
+    Args:
+        nsets (int): Number of sets for the cache.
+        ratio (int): Sampling ratio.
+    Returns:
+        np.ndarray: int64 array with the sampled set indexes, in order (at least one).
+    """
+    hashes = splitmix64_array(np.arange(nsets, dtype=np.uint64) ^ np.uint64(SAMPLE_SALT))
+    sets = np.flatnonzero(hashes % np.uint64(ratio) == 0)
+    if len(sets) == 0:
+        sets = np.array([np.argmin(hashes % np.uint64(ratio))])
+    return sets.astype(np.int64)
+
+def max_ratio(nsets: int) -> int:
+    """
+    Get the largest power-of-two sampling ratio whose sample has at least MIN_SAMPLED_SETS sets.
+    The sets are picked by hash, so the sample size is checked instead of assumed to be nsets / ratio
+    (the sample of a power-of-two ratio holds the samples of the larger ones).
+
+    Args:
+        nsets (int): Number of sets for the cache.
+    Returns:
+        int: Sampling ratio, 1 when the cache has too few sets to sample.
+    """
+    ratio = 1
+    while ratio * 2 <= nsets and len(sampled_sets(nsets, ratio * 2)) >= MIN_SAMPLED_SETS:
+        ratio *= 2
+    return ratio
+
+def sample_trace(memory_address: np.ndarray, n_bits_offset: int, n_bits_indice: int, sampled: np.ndarray) -> np.ndarray:
+    """
+    Filter a trace down to the accesses of the sampled sets.
+
+    Args:
+        memory_address (np.ndarray): Array of addresses.
+        n_bits_offset (int): Bits of the block offset.
+        n_bits_indice (int): Bits of the set index.
+        sampled (np.ndarray): bool array, True for the sampled sets.
+    Returns:
+        np.ndarray: uint32 array with the addresses of the sampled sets, in order.
+    """
+    mask = (1 << n_bits_indice) - 1
+    parts = []
+    for start in range(0, len(memory_address), FILTER_CHUNK_SIZE):
+        chunk = np.asarray(memory_address[start:start + FILTER_CHUNK_SIZE], dtype=np.uint32)
+        parts.append(chunk[sampled[(chunk >> n_bits_offset) & mask]])
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.uint32)
+
+def ratio_estimate(numerator: np.ndarray, denominator: np.ndarray, population: int) -> tuple[float, float | None]:
+    """
+    Estimate a rate from the sampled sets, with the half-width of its confidence interval.
+
+    Args:
+        numerator (np.ndarray): Count of each sampled set (hits, misses...).
+        denominator (np.ndarray): Count of each sampled set the rate is over (accesses, misses).
+        population (int): Number of sets the sample is from.
+    Returns:
+        tuple[float, float | None]: Rate, and the half-width of its interval (None with a single sampled set).
+    """
+    sampled = len(numerator)
+    total = int(denominator.sum())
+    if total == 0:
+        return 0.0, 0.0
+    rate = int(numerator.sum()) / total
+
+    # Every set was simulated, the rate is exact
+    if sampled >= population:
+        return rate, 0.0
+    if sampled < 2:
+        return rate, None
+
+    mean = total / sampled
+    residuals = numerator - rate * denominator
+    variance = (1 - sampled / population) * float((residuals ** 2).sum()) / (sampled - 1) / (sampled * mean ** 2)
+    return rate, Z_SCORE * sqrt(variance)
+
+class SampledCache:
+    def __init__(self, nsets: int, bsize: int, ways: int, subs_method: str, output_flag: int, input_file: str, ratio: int, debug_var: bool = False, access_log: AccessLog = None, seed: int = None):
+        # Sampling parameters
+        self.ratio = ratio
+        self.sets = sampled_sets(nsets, ratio)
+        if ratio > 1 and len(self.sets) < MIN_SAMPLED_SETS:
+            out_message = "Sampling: 1 in {} of {} sets samples {} sets, fewer than {}, use a ratio of {} or less."
+            raise Exception(out_message.format(ratio, nsets, len(self.sets), MIN_SAMPLED_SETS, max_ratio(nsets)))
+        self.sampled = np.zeros(nsets, dtype=np.bool_)
+        self.sampled[self.sets] = True
+
+        # Position of each sampled set in the per-set counters
+        self.set_position = np.full(nsets, -1, dtype=np.int64)
+        self.set_position[self.sets] = np.arange(len(self.sets))
+
+        # Cache of the sampled sets, its shadow holds as many blocks as they do (see APPROXIMATE_RATES)
+        self.cache = Cache(nsets, bsize, ways, subs_method, output_flag, input_file, debug_var, access_log, seed)
+        self.cache.cache_set.number_of_blocks = len(self.sets) * ways
+
+        # Outcome counters of each sampled set, indexed by outcome code
+        self.set_counts = np.zeros((len(OUTCOME_NAMES), len(self.sets)), dtype=np.int64)
+
+        # Accesses of the whole trace
+        self.total_accesses = 0
+
+        # Estimated statistics, value and interval half-width of each rate (None for the approximate ones)
+        self.estimates: dict[str, tuple[float, float | None]] = {}
+
+    def simulate_cache(self, memory_address: np.ndarray, progress: Progress = None) -> str:
+        """
+        Simulate the sampled sets and return the estimated statistics.
+
+        Args:
+            memory_address (np.ndarray): Array (or any sequence) of integers with the memory addresses.
+            progress (Progress): Report the running statistics of the sampled sets. OPTIONAL. Default is None (no reports).
+        Returns:
+            str: Output for the cache simulation. Depends on the output_flag.
+        """
+        self.process_trace(memory_address, progress)
+        return self.get_output()
+
+    def process_trace(self, memory_address: np.ndarray, progress: Progress = None) -> None:
+        """
+        Filter a trace down to the sampled sets and simulate them, one chunk at a time.
+
+        Args:
+            memory_address (np.ndarray): Array (or any sequence) of integers with the memory addresses.
+            progress (Progress): Report the running statistics of the sampled sets. OPTIONAL. Default is None (no reports).
+                Its total is set to the number of sampled accesses.
+        """
+        cache = self.cache
+        self.total_accesses += len(memory_address)
+        sample = sample_trace(memory_address, cache.n_bits_offset, cache.n_bits_indice, self.sampled)
+
+        # The OPT substitution looks ahead in the sampled accesses
+        if cache.needs_next_use():
+            cache.set_next_use(next_use(sample, cache.bsize))
+
+        step = CHUNK_SIZE
+        if progress is not None:
+            step = min(CHUNK_SIZE, progress.every)
+            if progress.total is not None:
+                progress.total = len(sample)
+            progress.start()
+
+        index_mask = (1 << cache.n_bits_indice) - 1
+        for start in range(0, len(sample), step):
+            chunk = sample[start:start + step]
+            outcomes = np.array(cache.process_chunk(chunk), dtype=np.int64)
+
+            # Count the outcomes of each sampled set
+            positions = self.set_position[(chunk.astype(np.int64) >> cache.n_bits_offset) & index_mask]
+            codes = outcomes * len(self.sets) + positions
+            self.set_counts += np.bincount(codes, minlength=self.set_counts.size).reshape(self.set_counts.shape)
+
+            if progress is not None:
+                progress.update(cache)
+
+        if progress is not None:
+            progress.update(cache, final=True)
+
+    def set_cache_statistics(self) -> None:
+        """
+        Estimate the rates of the whole cache from the sampled sets.
+
+        Args:
+        Returns:
+        """
+        counts = self.set_counts
+        accesses = counts.sum(axis=0)
+        misses = accesses - counts[HIT]
+        population = self.cache.nsets
+
+        hit_rate, hit_error = ratio_estimate(counts[HIT], accesses, population)
+        self.estimates = {
+            "hit_rate": (hit_rate, hit_error),
+            "miss_rate": (1 - hit_rate if accesses.sum() else 0.0, hit_error),
+            "compulsory_miss_rate": ratio_estimate(counts[COMPULSORY_MISS], misses, population),
+            "capacity_miss_rate": ratio_estimate(counts[CAPACITY_MISS], misses, population),
+            "conflict_miss_rate": ratio_estimate(counts[CONFLICT_MISS], misses, population),
+        }
+
+        # Exact only when every set was simulated, with a full-size shadow
+        if len(self.sets) < population:
+            for name in APPROXIMATE_RATES:
+                self.estimates[name] = (self.estimates[name][0], None)
+
+    def get_output(self) -> str:
+        """
+        Get the output for the sampled simulation.
+
+        Args:
+        Returns:
+            str: Output for the cache simulation. Depends on the output_flag.
+        """
+        stats = self.get_report()
+
+        # Write one folder up the report file with Stats
+        with open("report.txt", "w") as file:
+            file.write(stats)
+
+        if self.cache.output_flag == 0:
+            return stats
+        elif self.cache.output_flag == 1:
+            return "{}, {}, {}, {}, {}, {}".format(
+                self.total_accesses,
+                *(round(self.estimates[name][0], 4) for name in ("hit_rate", "miss_rate", "compulsory_miss_rate", "capacity_miss_rate", "conflict_miss_rate"))
+            )
+
+    def get_report(self) -> str:
+        """
+        Get the report (free format estimated statistics) for the sampled simulation, without writing the report file.
+
+        Args:
+        Returns:
+            str: Report for the sampled simulation.
+        """
+        self.set_cache_statistics()
+
+        lines = [
+            "Sampled sets: {} of {} (1 in {})".format(len(self.sets), self.cache.nsets, self.ratio),
+            "Sampled accesses: {} of {}".format(self.cache.total_accesses, self.total_accesses),
+            "Total accesses: {}".format(self.total_accesses),
+        ]
+        for name, label in (("hit_rate", "Hit rate"), ("miss_rate", "Miss rate"), ("compulsory_miss_rate", "Compulsory miss rate"),
+                            ("capacity_miss_rate", "Capacity miss rate"), ("conflict_miss_rate", "Conflict miss rate")):
+            rate, error = self.estimates[name]
+            if error is None:
+                lines.append("{}: {} % (approximate, no interval)".format(label, round(rate * 100, 4)))
+            else:
+                lines.append("{}: {} % (+/- {} %, {} % confidence)".format(label, round(rate * 100, 4), round(error * 100, 4), CONFIDENCE))
+        return "\n".join(lines)
+
+    def get_statistics(self) -> dict:
+        """
+        Get the estimated statistics as a row of counters and rates, without writing the report file.
+        The counters are the estimates for the whole trace, each rate has the half-width of its interval (rate_error),
+        None for the approximate capacity and conflict rates.
+
+        Args:
+        Returns:
+            dict: Configuration, sampling, estimated counters and rates of the simulation.
+        """
+        self.set_cache_statistics()
+        cache = self.cache
+        hit_rate = self.estimates["hit_rate"][0]
+        misses = round((1 - hit_rate) * self.total_accesses)
+
+        statistics = {
+            "nsets": cache.nsets,
+            "bsize": cache.bsize,
+            "assoc": cache.ways,
+            "subs_method": cache.subs_method,
+            "sample_ratio": self.ratio,
+            "sampled_sets": len(self.sets),
+            "sampled_accesses": cache.total_accesses,
+            "total_accesses": self.total_accesses,
+            "hits": self.total_accesses - misses,
+            "total_misses": misses,
+            "compulsory_misses": round(self.estimates["compulsory_miss_rate"][0] * misses),
+            "capacity_misses": round(self.estimates["capacity_miss_rate"][0] * misses),
+            "conflict_misses": round(self.estimates["conflict_miss_rate"][0] * misses),
+        }
+        for name, (rate, error) in self.estimates.items():
+            statistics[name] = round(rate, 4)
+            statistics[name + "_error"] = round(error, 4) if error is not None else None
+        return statistics
+
+def choose_ratio(memory_address: np.ndarray, nsets: int, bsize: int, ways: int, subs_method: str, target_error: float, seed: int = None) -> int:
+    """
+    Pick the sampling ratio for a target error of the miss rate: simulate a pilot sample, predict the number of
+    sets that gives an interval within the target, and take the largest power-of-two ratio that samples them.
+
+    Args:
+        memory_address (np.ndarray): Array of addresses.
+        nsets (int): Number of sets for the cache
+        bsize (int): Block size for the cache
+        ways (int): Associativity for the cache
+        subs_method (str): Replacement policy for the cache
+        target_error (float): Half-width of the miss rate interval (0.01 is +/- 1 %).
+        seed (int): Seed for the random substitution. OPTIONAL.
+    Returns:
+        int: Sampling ratio, 1 to simulate every set.
+    """
+    # Largest ratio that still samples enough sets
+    largest = max_ratio(nsets)
+    if largest == 1:
+        return 1
+
+    pilot = SampledCache(nsets, bsize, ways, subs_method, 1, "", min(PILOT_RATIO, largest), seed=seed)
+    pilot.process_trace(memory_address)
+    accesses = pilot.set_counts.sum(axis=0)
+    misses = accesses - pilot.set_counts[HIT]
+    if accesses.sum() == 0:
+        return largest
+
+    # Sets needed for the target, from the variance between the pilot sets (with the finite population correction)
+    sampled = len(pilot.sets)
+    rate = misses.sum() / accesses.sum()
+    mean = accesses.sum() / sampled
+    variance = float(((misses - rate * accesses) ** 2).sum()) / max(sampled - 1, 1)
+    needed = (Z_SCORE * sqrt(variance) / (mean * target_error)) ** 2
+    needed = needed / (1 + needed / nsets)
+
+    ratio = 1
+    while ratio < largest and len(sampled_sets(nsets, ratio * 2)) >= needed:
+        ratio *= 2
+    return ratio
@@ -0,0 +1,250 @@
+"""
+File: stack_distance.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Single-pass LRU stack distance engine. By the inclusion property of LRU (Mattson et al.), an access
+             hits in an LRU set of A ways exactly when fewer than A distinct blocks of its set were touched since
+             the previous access to the same block (its stack distance). So one pass per block size and set mapping
+             gives the hits for every associativity, and the fully associative pass (1 set) splits the misses of
+             every configuration in compulsory, capacity and conflict misses.
+             The distances are counted with a merge-sort style pass made of array operations, O(n log^2 n) in numpy.
+             Example: python -m sim_cache.stack_distance bin_100.bin --bsize 4 --max_nsets 1024 --max_assoc 64
+"""
+
+import argparse
+import sys
+import time
+from math import log2
+
+import numpy as np
+
+from .file_reader import read_file
+
+# Stack distance of the first access to a block
+COLD = -1
+
+def block_numbers(memory_address: np.ndarray, bsize: int) -> np.ndarray:
+    """
+    Get the block number of each address.
+
+    Args:
+        memory_address (np.ndarray): Array of addresses.
+        bsize (int): Block size (power of two).
+    Returns:
+        np.ndarray: int64 array with the block numbers.
+    """
+    return np.asarray(memory_address).astype(np.int64) >> int(log2(bsize))
+
+def previous_use(blocks: np.ndarray) -> np.ndarray:
+    """
+    Get the position of the previous access to the same block, for each access.
+
+    Args:
+        blocks (np.ndarray): Block number of each access.
+    Returns:
+        np.ndarray: int64 array with the previous position, or -1 for the first access to a block.
+    """
+    order = np.argsort(blocks, kind="stable")
+    same = blocks[order[1:]] == blocks[order[:-1]]
+
+    previous = np.full(len(blocks), -1, dtype=np.int64)
+    previous[order[1:][same]] = order[:-1][same]
+    return previous
+
+def count_later_reuses(previous: np.ndarray) -> np.ndarray:
+    """
+    For each access t with a previous access p, count the accesses j < t whose own previous access is after p.
+    Those are the repeated blocks in the window (p, t), so the distinct blocks in the window are t - p - 1 minus the count.
+
+    The count is split by the levels of a merge sort: at each level, the accesses in the right half of a
+    block pair look up the left half, which is sorted once for all of them.
+
+    Args:
+        previous (np.ndarray): Previous position of each access (see previous_use).
+    Returns:
+        np.ndarray: int64 array with the count for each access.
+    """
+    n = len(previous)
+    counts = np.zeros(n, dtype=np.int64)
+    if n < 2:
+        return counts
+
+    positions = np.arange(n, dtype=np.int64)
+    queries = previous >= 0
+
+    # Keys are (pair of halves, previous + 1), packed in one int64
+    span = n + 1
+    width = 1
+    while width < n:
+        pair = positions // (2 * width)
+        right = (positions // width) & 1 == 1
+
+        left_keys = np.sort(pair[~right] * span + previous[~right] + 1)
+
+        ask = right & queries
+        pair_ask = pair[ask]
+        counts[ask] += np.searchsorted(left_keys, (pair_ask + 1) * span, side="left") \
+            - np.searchsorted(left_keys, pair_ask * span + previous[ask] + 1, side="right")
+        width *= 2
+
+    return counts
+
+def block_distances(blocks: np.ndarray) -> np.ndarray:
+    """
+    Compute the LRU stack distance of each access to a sequence of blocks.
+
+    Args:
+        blocks (np.ndarray): Block number of each access.
+    Returns:
+        np.ndarray: int64 array with the number of distinct blocks accessed since the previous access to the
+            same block, or COLD for the first access to a block.
+    """
+    previous = previous_use(blocks)
+    distances = np.arange(len(blocks), dtype=np.int64) - previous - 1 - count_later_reuses(previous)
+    distances[previous < 0] = COLD
+    return distances
+
+def stack_distances(memory_address: np.ndarray, bsize: int, nsets: int = 1) -> np.ndarray:
+    """
+    Compute the LRU stack distance of each access, within its set.
+
+    Args:
+        memory_address (np.ndarray): Array of addresses.
+        bsize (int): Block size (power of two).
+        nsets (int): Number of sets (power of two). OPTIONAL. Default is 1 (fully associative).
+    Returns:
+        np.ndarray: int64 array with the number of distinct blocks of the same set accessed since the
+            previous access to the same block, or COLD for the first access to a block. In access order.
+    """
+    blocks = block_numbers(memory_address, bsize)
+
+    # Put the accesses of each set together, keeping their order. A block always maps to the same set,
+    # so the window between two accesses to a block only holds accesses of its set
+    order = None
+    if nsets > 1:
+        order = np.argsort(blocks & (nsets - 1), kind="stable")
+        blocks = blocks[order]
+
+    distances = block_distances(blocks)
+
+    if order is None:
+        return distances
+
+    # Back to access order
+    unsorted = np.empty_like(distances)
+    unsorted[order] = distances
+    return unsorted
+
+def lru_sweep(memory_address: np.ndarray, bsize: int, set_counts: list[int], assocs: list[int]) -> list[dict]:
+    """
+    Get the LRU statistics of every (nsets, assoc) configuration, with one stack distance pass per set count.
+
+    The misses are classified as in the 3C model: compulsory on the first access to a block, capacity when a
+    fully associative LRU cache of the same size misses too, and conflict otherwise.
+
+    Args:
+        memory_address (np.ndarray): Array of addresses.
+        bsize (int): Block size (power of two).
+        set_counts (list[int]): Number of sets of the configurations (powers of two).
+        assocs (list[int]): Associativities of the configurations.
+    Returns:
+        list[dict]: One row per configuration, with the same counters and rates as the Cache statistics.
+    """
+    total_accesses = len(memory_address)
+    full_distances = stack_distances(memory_address, bsize, 1)
+    cold = full_distances == COLD
+    compulsory_misses = int(np.count_nonzero(cold))
+
+    rows = []
+    for nsets in set_counts:
+        distances = full_distances if nsets == 1 else stack_distances(memory_address, bsize, nsets)
+        for assoc in assocs:
+            # Misses of the configuration, and misses of a fully associative cache of the same size
+            misses = cold | (distances >= assoc)
+            full_misses = cold | (full_distances >= nsets * assoc)
+
+            total_misses = int(np.count_nonzero(misses))
+            capacity_misses = int(np.count_nonzero(misses & full_misses)) - compulsory_misses
+            conflict_misses = total_misses - compulsory_misses - capacity_misses
+
+            rows.append(statistics_row(nsets, bsize, assoc, total_accesses, compulsory_misses, capacity_misses, conflict_misses))
+
+    return rows
+
+def statistics_row(nsets: int, bsize: int, assoc: int, total_accesses: int, compulsory_misses: int, capacity_misses: int, conflict_misses: int) -> dict:
+    """
+    Build a statistics row, with the rates rounded like the Cache statistics.
+
+    Args:
+        nsets (int): Number of sets.
+        bsize (int): Block size.
+        assoc (int): Associativity.
+        total_accesses (int): Number of accesses.
+        compulsory_misses (int): Number of compulsory misses.
+        capacity_misses (int): Number of capacity misses.
+        conflict_misses (int): Number of conflict misses.
+    Returns:
+        dict: Row with the configuration, the counters and the rates.
+    """
+    total_misses = compulsory_misses + capacity_misses + conflict_misses
+    hit_rate = round((total_accesses - total_misses) / total_accesses, 4) if total_accesses else 0
+
+    return {
+        "nsets": nsets,
+        "bsize": bsize,
+        "assoc": assoc,
+        "total_accesses": total_accesses,
+        "hits": total_accesses - total_misses,
+        "total_misses": total_misses,
+        "compulsory_misses": compulsory_misses,
+        "capacity_misses": capacity_misses,
+        "conflict_misses": conflict_misses,
+        "hit_rate": hit_rate,
+        "miss_rate": round(1 - hit_rate, 4),
+        "compulsory_miss_rate": round(compulsory_misses / total_misses, 4) if total_misses else 0,
+        "capacity_miss_rate": round(capacity_misses / total_misses, 4) if total_misses else 0,
+        "conflict_miss_rate": round(conflict_misses / total_misses, 4) if total_misses else 0,
+    }
+
+def powers_of_two(maximum: int) -> list[int]:
+    """
+    Get the powers of two up to a maximum.
+
+    Args:
+        maximum (int): Maximum value.
+    Returns:
+        list[int]: 1, 2, 4, ... up to the maximum.
+    """
+    return [1 << i for i in range(int(log2(maximum)) + 1)]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LRU statistics for every cache size at once, from stack distances.")
+    parser.add_argument("input_file", type=str, help="Path to the file to read, needs to be a binary file")
+    parser.add_argument("--bsize", type=int, nargs="+", help="Block sizes", default=[4])
+    parser.add_argument("--max_nsets", type=int, help="Largest number of sets (every power of two up to it is reported)", default=1024)
+    parser.add_argument("--max_assoc", type=int, help="Largest associativity (every power of two up to it is reported)", default=64)
+    args = parser.parse_args()
+
+    # Check it arg
+    for bsize in args.bsize:
+        if bsize <= 0 or bsize & (bsize - 1):
+            raise ValueError("bsize needs to be a power of two")
+
+    if args.max_nsets <= 0 or args.max_nsets & (args.max_nsets - 1):
+        raise ValueError("max_nsets needs to be a power of two")
+
+    if args.max_assoc <= 0 or args.max_assoc & (args.max_assoc - 1):
+        raise ValueError("max_assoc needs to be a power of two")
+
+    start = time.time()
+    memory_address = read_file(args.input_file)
+    columns = None
+    for bsize in args.bsize:
+        for row in lru_sweep(memory_address, bsize, powers_of_two(args.max_nsets), powers_of_two(args.max_assoc)):
+            if columns is None:
+                columns = list(row)
+                print(",".join(columns))
+            print(",".join(str(row[column]) for column in columns))
+    end = time.time()
+    # The timing goes to stderr, so the output stays a clean CSV
+    print("Execution time: {:.6f} seconds".format(end - start), file=sys.stderr)
@@ -0,0 +1,213 @@
+"""
+File: text_trace.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Text traces: one address per line, in decimal or hex (with or without a 0x prefix), optionally
+             with an access type column (R or W, or any word starting with them, before or after the address).
+             The text is parsed in bulk with numpy: the bytes are split into tokens with vectorized masks and
+             every digit is weighted by its place value, so no Python object is created per address.
+             The access types are accepted and skipped, the simulator only uses the addresses.
+             Whether a trace is text or binary is detected from its first bytes, whatever its extension.
+             The base is detected from the first piece of text (hex if there is a 0x prefix or a hex letter) and kept
+             for the rest of the trace, so a later address in the other base fails with a message naming the
+             detected base.
+"""
+
+from typing import BinaryIO, Callable, Iterator
+
+import numpy as np
+
+# Extension of the text traces (any other file is detected from its content)
+TEXT_EXTENSION = ".txt"
+
+# Bytes read to detect the format of a trace
+SNIFF_SIZE = 4096
+
+# Bytes of text parsed at a time
+TEXT_CHUNK_SIZE = 1 << 20
+
+# Longest address (32 bits) in each base
+MAX_DIGITS = {10: 10, 16: 8}
+
+# Value of each byte as a digit (255 for the bytes that are not digits)
+DIGIT_VALUES = np.full(256, 255, dtype=np.uint8)
+DIGIT_VALUES[np.frombuffer(b"0123456789", dtype=np.uint8)] = np.arange(10)
+DIGIT_VALUES[np.frombuffer(b"abcdef", dtype=np.uint8)] = np.arange(10, 16)
+DIGIT_VALUES[np.frombuffer(b"ABCDEF", dtype=np.uint8)] = np.arange(10, 16)
+
+# First letters of the access type tokens
+ACCESS_TYPES = np.zeros(256, dtype=np.bool_)
+ACCESS_TYPES[np.frombuffer(b"RrWw", dtype=np.uint8)] = True
+
+# Bytes of a text trace (printable ASCII and whitespace)
+TEXT_BYTES = np.zeros(256, dtype=np.bool_)
+TEXT_BYTES[0x20:0x7F] = True
+TEXT_BYTES[np.frombuffer(b"\t\n\r", dtype=np.uint8)] = True
+
+def is_text(head: bytes) -> bool:
+    """
+    Check if the first bytes of a trace are text: printable ASCII with at least one digit.
+    Binary traces have zero bytes in almost every address, so they are not mistaken for text.
+
+    Args:
+        head (bytes): First bytes of the trace.
+    Returns:
+        bool: True for a text trace.
+    """
+    data = np.frombuffer(head, dtype=np.uint8)
+    return len(data) > 0 and bool(TEXT_BYTES[data].all()) and bool((DIGIT_VALUES[data] < 10).any())
+
+def invalid_address(token: bytes, base: int, detected: bool) -> str:
+    """
+    Get the message for a token that is not an address in the base of the trace.
+
+    Args:
+        token (bytes): Invalid token.
+        base (int): 10 or 16.
+        detected (bool): The base was detected from the text, not given.
+    Returns:
+        str: Error message, naming the detected base.
+    """
+    name = "decimal" if base == 10 else "hex"
+    out_message = "Text trace: {} is not a 32-bit {} address.".format(token.decode(), name)
+    if detected and base == 10:
+        out_message += " The base was detected as decimal from the first addresses, write the hex addresses with a 0x prefix."
+    elif detected:
+        out_message += " The base was detected as hex from the first addresses."
+    return out_message
+
+def parse_text(text: bytes, base: int | None = None, detected: bool = False) -> tuple[np.ndarray, int | None]:
+    """
+    Parse the addresses of a text trace.
+
+    Args:
+        text (bytes): Text with whole lines.
+        base (int | None): 10 or 16, None to detect it (hex if there is a 0x prefix or a hex letter).
+        detected (bool): The base was detected from earlier text of the trace, for the error messages. OPTIONAL.
+    Returns:
+        tuple[np.ndarray, int | None]: uint32 addresses, and the base used (None if there was no address to tell).
+    """
+    data = np.frombuffer(text, dtype=np.uint8)
+
+    # Start and end of each token (letters and digits), the bytes wrap around so one compare checks a range
+    token = (data - np.uint8(ord("0")) < 10) | ((data | np.uint8(0x20)) - np.uint8(ord("a")) < 26)
+    edges = np.flatnonzero(token[1:] != token[:-1]) + 1
+    if len(data) and token[0]:
+        edges = np.concatenate(([0], edges))
+    if len(data) and token[-1]:
+        edges = np.concatenate((edges, [len(data)]))
+    starts = edges[0::2]
+    ends = edges[1::2]
+
+    # Skip the access type tokens (R, W, READ, WRITE...)
+    address = ~ACCESS_TYPES.take(data.take(starts))
+    starts = starts[address]
+    ends = ends[address]
+    if len(starts) == 0:
+        return np.empty(0, dtype=np.uint32), base
+
+    # Drop the 0x prefixes
+    prefixed = (ends - starts > 2) & (data.take(starts) == ord("0")) & ((data.take(starts + 1) | 0x20) == ord("x"))
+    starts = starts + 2 * prefixed
+    lengths = ends - starts
+    if lengths.max() > max(MAX_DIGITS.values()):
+        bad = int(np.flatnonzero(lengths > max(MAX_DIGITS.values()))[0])
+        out_message = "Text trace: {} is longer than a 32-bit address."
+        raise Exception(out_message.format(text[starts[bad]:ends[bad]].decode()))
+
+    # Digits of the tokens by place, a row for each place from the last digit (digits marks the places inside the token)
+    places = np.empty((int(lengths.max()), len(starts)), dtype=np.uint8)
+    digits = np.empty(places.shape, dtype=np.bool_)
+    for place in range(len(places)):
+        DIGIT_VALUES.take(data.take(ends - 1 - place, mode="clip"), out=places[place])
+        np.greater(lengths, place, out=digits[place])
+    if base is None:
+        base = 16 if bool(prefixed.any()) or bool((places[digits] >= 10).any()) else 10
+        detected = True
+
+    # Check every token is a number in the base, short enough to be summed without overflow
+    invalid = ((places >= base) & digits).any(axis=0) | (lengths > MAX_DIGITS[base])
+    if invalid.any():
+        bad = int(np.flatnonzero(invalid)[0])
+        raise Exception(invalid_address(text[starts[bad]:ends[bad]], base, detected))
+
+    # Add up the digits weighted by their place value
+    values = np.zeros(len(starts), dtype=np.uint64)
+    for place in reversed(range(len(places))):
+        values *= np.uint64(base)
+        values += places[place] * digits[place]
+    if (values > 0xFFFFFFFF).any():
+        bad = int(np.flatnonzero(values > 0xFFFFFFFF)[0])
+        raise Exception(invalid_address(text[starts[bad]:ends[bad]], base, detected))
+    return values.astype(np.uint32), base
+
+def text_chunks(file: BinaryIO, chunk_size: int = TEXT_CHUNK_SIZE, base: int | None = None) -> Iterator[np.ndarray]:
+    """
+    Parse a text trace in fixed-size pieces of text, cut at line ends.
+
+    Args:
+        file (BinaryIO): Opened text trace (binary mode).
+        chunk_size (int): Bytes of text parsed at a time. OPTIONAL.
+        base (int | None): 10 or 16, None to detect it from the first addresses. OPTIONAL.
+    Yields:
+        np.ndarray: uint32 addresses.
+    """
+    # Pipes return what is available, so a live trace is parsed as it arrives
+    read = getattr(file, "read1", file.read)
+    remainder = b""
+    detected = base is None
+    while True:
+        block = read(chunk_size)
+        if not block:
+            break
+        text = remainder + block
+
+        # Keep the last (maybe partial) line for the next piece
+        cut = max(text.rfind(b"\n"), text.rfind(b"\r")) + 1
+        if cut == 0:
+            remainder = text
+            continue
+        remainder = text[cut:]
+
+        addresses, base = parse_text(text[:cut], base, detected)
+        yield addresses
+
+    if remainder:
+        addresses, base = parse_text(remainder, base, detected)
+        yield addresses
+
+def read_text(file: BinaryIO, base: int | None = None) -> np.ndarray:
+    """
+    Parse a whole text trace.
+
+    Args:
+        file (BinaryIO): Opened text trace (binary mode).
+        base (int | None): 10 or 16, None to detect it from the first addresses. OPTIONAL.
+    Returns:
+        np.ndarray: uint32 array with the addresses.
+    """
+    chunks = list(text_chunks(file, base=base))
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.uint32)
+
+class TextTraceWriter:
+    """
+    Write a text trace, one decimal address per line, compressed if opened with gzip.open, bz2.open or lzma.open.
+    """
+
+    def __init__(self, file_path: str, opener: Callable = open) -> None:
+        self.file_path = file_path
+        self.file = opener(file_path, "wt")
+
+    def write(self, addresses: np.ndarray) -> None:
+        addresses = np.asarray(addresses)
+        if len(addresses):
+            np.savetxt(self.file, addresses.astype(np.uint32), fmt="%d")
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> "TextTraceWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
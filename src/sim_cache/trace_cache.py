@@ -0,0 +1,257 @@
+"""
+File: trace_cache.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Content-addressed cache of decoded traces on local disk. Each trace is decoded once and stored as a
+             native uint32 .npy file named after the SHA-256 of the trace file, so it can be memory-mapped right
+             away the next time the same content is simulated, whatever the file name. The entries are evicted
+             in least recently used order when the cache is larger than its size limit.
+             A small index maps (path, size, modification time) to the hash, so a file already seen is not hashed again.
+             The next-use index of a trace for the OPT substitution (see optimal.py) is kept the same way, one
+             entry per trace and block size.
+             A trace already in memory (a web upload) is keyed by the SHA-256 of its bytes (see load_buffer), so
+             uploading the same trace again maps the decoded entry instead of decoding it.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Callable
+
+import numpy as np
+
+from .file_reader import read_buffer, read_file
+from .optimal import next_use
+
+# Default size limit of the cache (in bytes)
+DEFAULT_MAX_BYTES = 4 << 30
+
+# Read size when hashing a file (in bytes)
+HASH_BLOCK_SIZE = 1 << 20
+
+# Name of the path -> hash index file
+INDEX_FILE = "index.json"
+
+class TraceCache:
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def load(self, file_input: str) -> np.ndarray:
+        """
+        Get the decoded trace of a file, decoding and storing it if its content was never seen.
+
+        Args:
+            file_input (str): Path to the trace file.
+        Returns:
+            np.ndarray: Read-only memory-mapped uint32 array with the addresses (in memory if the entry was evicted).
+        """
+        if not os.path.exists(file_input):
+            out_message = "File input: {} path does not exist."
+            raise Exception(out_message.format(file_input))
+
+        return self.load_entry(self.key(file_input), lambda: read_file(file_input))
+
+    def load_next_use(self, file_input: str, bsize: int) -> np.ndarray:
+        """
+        Get the next-use index of a trace for a block size, computing and storing it if it was never computed.
+
+        Args:
+            file_input (str): Path to the trace file.
+            bsize (int): Block size for the cache.
+        Returns:
+            np.ndarray: Read-only memory-mapped uint32 array with the next use of each access (see optimal.py, in
+                memory if the entry was evicted).
+        """
+        if not os.path.exists(file_input):
+            out_message = "File input: {} path does not exist."
+            raise Exception(out_message.format(file_input))
+
+        key = "{}.next{}".format(self.key(file_input), bsize)
+        return self.load_entry(key, lambda: next_use(self.load(file_input), bsize))
+
+    def load_buffer(self, buffer: bytes | bytearray | memoryview, key: str = None) -> np.ndarray:
+        """
+        Get the decoded trace of a trace already in memory (the content of a trace file), decoding and storing it
+        if its content was never seen.
+
+        Args:
+            buffer (bytes | bytearray | memoryview): Content of the trace file.
+            key (str): Content hash of the buffer, if already computed (see buffer_key). OPTIONAL.
+        Returns:
+            np.ndarray: Read-only memory-mapped uint32 array with the addresses (in memory if the entry was evicted).
+        """
+        return self.load_entry(key or self.buffer_key(buffer), lambda: read_buffer(buffer))
+
+    def load_key_next_use(self, key: str, memory_address: np.ndarray, bsize: int) -> np.ndarray:
+        """
+        Get the next-use index of a trace already decoded, from its content hash, computing and storing it if it was
+        never computed.
+
+        Args:
+            key (str): Content hash of the trace (see key and buffer_key).
+            memory_address (np.ndarray): Addresses of the trace.
+            bsize (int): Block size for the cache.
+        Returns:
+            np.ndarray: Read-only memory-mapped uint32 array with the next use of each access (see optimal.py, in
+                memory if the entry was evicted).
+        """
+        key = "{}.next{}".format(key, bsize)
+        return self.load_entry(key, lambda: next_use(memory_address, bsize))
+
+    def load_entry(self, key: str, decode: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Get an entry, storing it first if it does not exist.
+
+        Args:
+            key (str): Key of the entry.
+            decode (Callable[[], np.ndarray]): Build the array of the entry, when it is not stored.
+        Returns:
+            np.ndarray: Read-only memory-mapped uint32 array (in memory if the entry was evicted).
+        """
+        entry = self.entry_path(key)
+
+        try:
+            if os.path.exists(entry):
+                # Mark the entry as recently used
+                os.utime(entry)
+            else:
+                self.store(key, decode())
+
+            return np.load(entry, mmap_mode="r")
+        except FileNotFoundError:
+            # Another process evicted the entry in between, build it again without the cache
+            return np.asarray(decode(), dtype=np.uint32)
+
+    def store(self, key: str, memory_address: np.ndarray) -> str:
+        """
+        Store a decoded trace and evict the least recently used entries if the cache is too big.
+
+        Args:
+            key (str): Content hash of the trace.
+            memory_address (np.ndarray): Addresses of the trace.
+        Returns:
+            str: Path to the entry.
+        """
+        entry = self.entry_path(key)
+
+        # Write to a temporary file first, so a concurrent reader never sees half an entry
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as file:
+                np.save(file, np.asarray(memory_address).astype(np.uint32))
+            os.replace(temporary, entry)
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+        self.evict(keep=entry)
+        return entry
+
+    def evict(self, keep: str = None) -> None:
+        """
+        Remove the least recently used entries until the cache fits its size limit.
+
+        Args:
+            keep (str): Path to an entry that must not be removed. OPTIONAL.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npy"):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    # Evicted by another process
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def key(self, file_input: str) -> str:
+        """
+        Get the content hash of a file, from the index if the file did not change since it was hashed.
+
+        Args:
+            file_input (str): Path to the trace file.
+        Returns:
+            str: SHA-256 of the file content, in hex.
+        """
+        stat = os.stat(file_input)
+        file_id = "{}:{}:{}".format(os.path.abspath(file_input), stat.st_size, stat.st_mtime_ns)
+
+        index = self.read_index()
+        if file_id in index:
+            return index[file_id]
+
+        digest = hashlib.sha256()
+        with open(file_input, "rb") as file:
+            for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        key = digest.hexdigest()
+
+        index[file_id] = key
+        self.write_index(index)
+        return key
+
+    def buffer_key(self, buffer: bytes | bytearray | memoryview) -> str:
+        """
+        Get the content hash of a trace already in memory.
+
+        Args:
+            buffer (bytes | bytearray | memoryview): Content of the trace file.
+        Returns:
+            str: SHA-256 of the content, in hex.
+        """
+        return hashlib.sha256(buffer).hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        """
+        Get the path to the entry of a trace.
+
+        Args:
+            key (str): Content hash of the trace.
+        Returns:
+            str: Path to the .npy entry.
+        """
+        return os.path.join(self.directory, key + ".npy")
+
+    def read_index(self) -> dict[str, str]:
+        """
+        Read the path -> hash index.
+
+        Returns:
+            dict[str, str]: File id (path, size and modification time) -> content hash.
+        """
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def write_index(self, index: dict[str, str]) -> None:
+        """
+        Write the path -> hash index, dropping the files that do not exist anymore.
+
+        Args:
+            index (dict[str, str]): File id (path, size and modification time) -> content hash.
+        """
+        index = {file_id: key for file_id, key in index.items() if os.path.exists(file_id.rsplit(":", 2)[0])}
+
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(handle, "w") as file:
+            json.dump(index, file)
+        os.replace(temporary, os.path.join(self.directory, INDEX_FILE))
@@ -0,0 +1,411 @@
+"""
+File: trace_format.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Trace file formats besides the raw .bin (4 byte big-endian addresses):
+                - Text traces: .txt, or any file whose first bytes are text (see text_trace.py).
+                - Compressed traces: .bin.gz, .bin.bz2 and .bin.xz (and .txt.gz...), decompressed while they are read.
+                - Delta traces (.dtrace): the difference between consecutive addresses (modulo 2^32), zig-zag encoded
+                  (small negative and positive deltas both get small codes) and stored as LEB128 varints,
+                  in blocks of a fixed number of addresses. Each block starts over from address 0, so any block
+                  can be decoded alone, and an index with the offset of every block is stored at the end of the
+                  file, so a range of addresses is read without decoding what comes before it.
+             Encoding and decoding are vectorized with numpy, one block at a time.
+             Delta trace layout (little-endian):
+                header: magic (8 bytes), version (uint32), block size (uint32), number of addresses (uint64),
+                        offset of the index (uint64)
+                blocks: varints, one per address
+                index:  offset of each block, plus the end of the last block (uint64 each)
+"""
+
+import bz2
+import gzip
+import lzma
+import struct
+from typing import BinaryIO, Iterator
+
+import numpy as np
+
+from .text_trace import SNIFF_SIZE, TEXT_EXTENSION, TextTraceWriter, is_text
+
+# Delta trace header
+DELTA_MAGIC = b"SIMCDLT\x00"
+DELTA_VERSION = 1
+DELTA_HEADER = struct.Struct("<8sIIQQ")
+
+# Default number of addresses per delta block
+DELTA_BLOCK_SIZE = 1 << 16
+
+# Extension of the delta traces
+DELTA_EXTENSION = ".dtrace"
+
+# Compressed raw traces, extension -> open function
+COMPRESSIONS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+# Compressed traces in memory, first bytes -> (format, decompress function)
+COMPRESSION_MAGICS = {b"\x1f\x8b": ("gz", gzip.decompress), b"BZh": ("bz2", bz2.decompress), b"\xfd7zXZ\x00": ("xz", lzma.decompress)}
+
+# Bytes of the longest varint (32 bit values)
+MAX_VARINT_SIZE = 5
+
+def trace_kind(file_path: str) -> str:
+    """
+    Get the format of a trace file from its extension.
+
+    Args:
+        file_path (str): Path to the trace file.
+    Returns:
+        str: "delta", "gz", "bz2", "xz", "text" or "raw".
+    """
+    if file_path.endswith(DELTA_EXTENSION):
+        return "delta"
+    for extension in COMPRESSIONS:
+        if file_path.endswith(".bin" + extension) or file_path.endswith(TEXT_EXTENSION + extension):
+            return extension[1:]
+    if file_path.endswith(TEXT_EXTENSION):
+        return "text"
+    return "raw"
+
+def buffer_kind(head: bytes) -> str:
+    """
+    Get the format of a trace in memory from its first bytes.
+
+    Args:
+        head (bytes): First bytes of the trace (at least SNIFF_SIZE, unless the trace is shorter).
+    Returns:
+        str: "delta", "gz", "bz2", "xz", "text" or "raw".
+    """
+    if head.startswith(DELTA_MAGIC):
+        return "delta"
+    for magic, (kind, _) in COMPRESSION_MAGICS.items():
+        if head.startswith(magic):
+            return kind
+    if is_text(head):
+        return "text"
+    return "raw"
+
+def decompress(data: bytes | memoryview) -> bytes:
+    """
+    Decompress a compressed trace in memory.
+
+    Args:
+        data (bytes | memoryview): Content of a gzip, bzip2 or xz compressed trace.
+    Returns:
+        bytes: Decompressed trace.
+    """
+    head = bytes(data[:8])
+    for magic, (_, function) in COMPRESSION_MAGICS.items():
+        if head.startswith(magic):
+            return function(data)
+    out_message = "File input: not a compressed trace ({})."
+    raise Exception(out_message.format(head.hex()))
+
+def sniff_text(file: BinaryIO) -> bool:
+    """
+    Check if an opened trace is text from its first bytes, without consuming them.
+
+    Args:
+        file (BinaryIO): Opened trace (binary mode), seekable or with a peek method (pipes, decompressed streams).
+    Returns:
+        bool: True for a text trace.
+    """
+    if hasattr(file, "peek"):
+        return is_text(file.peek(SNIFF_SIZE)[:SNIFF_SIZE])
+    position = file.tell()
+    head = file.read(SNIFF_SIZE)
+    file.seek(position)
+    return is_text(head)
+
+def is_trace_file(file_path: str) -> bool:
+    """
+    Check if a path has the extension of a supported trace file.
+
+    Args:
+        file_path (str): Path to the trace file.
+    Returns:
+        bool: True for .bin, .txt, .bin.gz, .bin.bz2, .bin.xz (and .txt.gz...) and .dtrace files.
+    """
+    return file_path.endswith(".bin") or trace_kind(file_path) != "raw"
+
+def zigzag_encode(deltas: np.ndarray) -> np.ndarray:
+    """
+    Map signed deltas to unsigned codes: 0, -1, 1, -2, 2... -> 0, 1, 2, 3, 4...
+
+    Args:
+        deltas (np.ndarray): int32 deltas.
+    Returns:
+        np.ndarray: uint32 codes.
+    """
+    return ((deltas << 1) ^ (deltas >> 31)).view(np.uint32)
+
+def zigzag_decode(codes: np.ndarray) -> np.ndarray:
+    """
+    Map zig-zag codes back to signed deltas.
+
+    Args:
+        codes (np.ndarray): uint32 codes.
+    Returns:
+        np.ndarray: Deltas, as uint32 (modulo 2^32, ready to be added to uint32 addresses).
+    """
+    return (codes >> np.uint32(1)) ^ (np.uint32(0) - (codes & np.uint32(1)))
+
+def encode_varints(values: np.ndarray) -> bytes:
+    """
+    Encode unsigned 32 bit values as LEB128 varints (7 bits per byte, high bit set on every byte but the last).
+
+    Args:
+        values (np.ndarray): uint32 values.
+    Returns:
+        bytes: Varints of the values, in order.
+    """
+    values = values.astype(np.uint32)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for size in range(1, MAX_VARINT_SIZE):
+        lengths += values >= (1 << (7 * size))
+    width = int(lengths.max()) if len(values) else 1
+
+    # One column per byte of the longest varint, only the first length bytes of each row are kept
+    shifts = np.arange(width, dtype=np.uint32) * np.uint32(7)
+    groups = (values[:, None] >> shifts) & np.uint32(0x7F)
+    position = np.arange(width)
+    groups |= np.where(position < lengths[:, None] - 1, np.uint32(0x80), np.uint32(0))
+    return groups[position < lengths[:, None]].astype(np.uint8).tobytes()
+
+def decode_varints(data: np.ndarray) -> np.ndarray:
+    """
+    Decode LEB128 varints of unsigned 32 bit values.
+
+    Args:
+        data (np.ndarray): uint8 array with whole varints.
+    Returns:
+        np.ndarray: uint32 values.
+    """
+    # The last byte of each varint has the high bit clear
+    ends = np.flatnonzero(data < 0x80)
+    if len(ends) == 0:
+        return np.empty(0, dtype=np.uint32)
+    lengths = np.diff(ends, prepend=-1)
+    starts = ends - lengths + 1
+
+    # Add the 7 bits of the k-th byte of every varint that is longer than k bytes
+    low = (data & 0x7F).astype(np.uint32)
+    values = low[starts]
+    for k in range(1, int(lengths.max())):
+        longer = np.flatnonzero(lengths > k)
+        values[longer] |= low[starts[longer] + k] << np.uint32(7 * k)
+    return values
+
+def encode_block(addresses: np.ndarray) -> bytes:
+    """
+    Encode a block of addresses as zig-zag varint deltas (modulo 2^32), starting from address 0.
+
+    Args:
+        addresses (np.ndarray): Addresses of the block.
+    Returns:
+        bytes: Encoded block.
+    """
+    deltas = np.diff(np.asarray(addresses).astype(np.uint32), prepend=np.uint32(0)).view(np.int32)
+    return encode_varints(zigzag_encode(deltas))
+
+def decode_block(data: np.ndarray) -> np.ndarray:
+    """
+    Decode a block of zig-zag varint deltas.
+
+    Args:
+        data (np.ndarray): uint8 array with the encoded block.
+    Returns:
+        np.ndarray: uint32 addresses.
+    """
+    return np.cumsum(zigzag_decode(decode_varints(data)), dtype=np.uint32)
+
+class DeltaTraceWriter:
+    """
+    Write a delta trace, one block at a time. The output file needs to be seekable (the header is written last).
+    """
+
+    def __init__(self, file_path: str, block_size: int = DELTA_BLOCK_SIZE) -> None:
+        if block_size <= 0:
+            raise Exception("Block size needs to be greater than 0.")
+
+        self.file_path = file_path
+        self.block_size = block_size
+        self.file = open(file_path, "wb")
+        self.file.write(DELTA_HEADER.pack(DELTA_MAGIC, DELTA_VERSION, block_size, 0, 0))
+
+        self.count = 0                                  # Addresses written
+        self.offsets: list[int] = []                    # Offset of each block
+        self.pending = np.empty(0, dtype=np.uint32)     # Addresses of the unfinished block
+
+    def write(self, addresses: np.ndarray) -> None:
+        """
+        Write addresses, encoding every full block.
+
+        Args:
+            addresses (np.ndarray): Addresses to append.
+        """
+        addresses = np.asarray(addresses).astype(np.uint32)
+        if len(self.pending):
+            addresses = np.concatenate((self.pending, addresses))
+
+        full = len(addresses) - len(addresses) % self.block_size
+        for start in range(0, full, self.block_size):
+            self.write_block(addresses[start:start + self.block_size])
+        self.pending = addresses[full:]
+
+    def write_block(self, addresses: np.ndarray) -> None:
+        self.offsets.append(self.file.tell())
+        self.file.write(encode_block(addresses))
+        self.count += len(addresses)
+
+    def close(self) -> None:
+        """
+        Write the last block, the index and the header, and close the file.
+        """
+        if self.file.closed:
+            return
+        if len(self.pending):
+            self.write_block(self.pending)
+            self.pending = np.empty(0, dtype=np.uint32)
+
+        index_offset = self.file.tell()
+        self.file.write(np.array(self.offsets + [index_offset], dtype="<u8").tobytes())
+        self.file.seek(0)
+        self.file.write(DELTA_HEADER.pack(DELTA_MAGIC, DELTA_VERSION, self.block_size, self.count, index_offset))
+        self.file.close()
+
+    def __enter__(self) -> "DeltaTraceWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+class DeltaTraceReader:
+    """
+    Read a delta trace. The file is memory-mapped (or the trace already in memory is used as is),
+    and only the blocks that are read are decoded.
+    """
+
+    def __init__(self, file_path: str | bytes | memoryview) -> None:
+        if isinstance(file_path, str):
+            self.file_path = file_path
+            with open(file_path, "rb") as file:
+                header = file.read(DELTA_HEADER.size)
+        else:
+            self.file_path = "<buffer>"
+            header = bytes(memoryview(file_path)[:DELTA_HEADER.size])
+        if len(header) < DELTA_HEADER.size:
+            out_message = "File input: {} is not a delta trace."
+            raise Exception(out_message.format(self.file_path))
+
+        magic, version, self.block_size, self.count, index_offset = DELTA_HEADER.unpack(header)
+        if magic != DELTA_MAGIC:
+            out_message = "File input: {} is not a delta trace."
+            raise Exception(out_message.format(self.file_path))
+        if version != DELTA_VERSION:
+            out_message = "File input: {} has delta trace version {}, only version {} is supported."
+            raise Exception(out_message.format(self.file_path, version, DELTA_VERSION))
+
+        if isinstance(file_path, str):
+            self.data = np.memmap(file_path, dtype=np.uint8, mode="r")
+        else:
+            self.data = np.frombuffer(file_path, dtype=np.uint8)
+        self.offsets = np.frombuffer(self.data[index_offset:], dtype="<u8").astype(np.int64)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def block(self, number: int) -> np.ndarray:
+        """
+        Decode one block.
+
+        Args:
+            number (int): Number of the block.
+        Returns:
+            np.ndarray: uint32 addresses of the block.
+        """
+        return decode_block(self.data[self.offsets[number]:self.offsets[number + 1]])
+
+    def chunks(self, start: int = 0, stop: int = None) -> Iterator[np.ndarray]:
+        """
+        Decode a range of addresses, one block at a time.
+
+        Args:
+            start (int): First address. OPTIONAL. Default is 0.
+            stop (int): End of the range. OPTIONAL. Default is the end of the trace.
+        Yields:
+            np.ndarray: uint32 addresses, at most one block.
+        """
+        stop = self.count if stop is None else min(stop, self.count)
+        for number in range(start // self.block_size, -(-stop // self.block_size)):
+            first = number * self.block_size
+            addresses = self.block(number)
+            yield addresses[max(start - first, 0):stop - first]
+
+    def read(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """
+        Decode a range of addresses.
+
+        Args:
+            start (int): First address. OPTIONAL. Default is 0.
+            stop (int): End of the range. OPTIONAL. Default is the end of the trace.
+        Returns:
+            np.ndarray: uint32 addresses.
+        """
+        chunks = list(self.chunks(start, stop))
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.uint32)
+
+class RawTraceWriter:
+    """
+    Write a raw trace (4 byte big-endian addresses), compressed if the path ends in .gz, .bz2 or .xz.
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        kind = trace_kind(file_path)
+        self.file: BinaryIO = COMPRESSIONS["." + kind](file_path, "wb") if kind in ("gz", "bz2", "xz") else open(file_path, "wb")
+
+    def write(self, addresses: np.ndarray) -> None:
+        self.file.write(np.asarray(addresses).astype(">u4").tobytes())
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> "RawTraceWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def open_trace_writer(file_path: str, block_size: int = DELTA_BLOCK_SIZE) -> DeltaTraceWriter | RawTraceWriter | TextTraceWriter:
+    """
+    Open a trace writer, with the format given by the extension of the path.
+
+    Args:
+        file_path (str): Path to the trace file (.bin, .txt, .bin.gz, .bin.bz2, .bin.xz or .dtrace).
+        block_size (int): Number of addresses per block of a delta trace. OPTIONAL.
+    Returns:
+        DeltaTraceWriter | RawTraceWriter | TextTraceWriter: The trace writer.
+    """
+    if not is_trace_file(file_path):
+        out_message = "File output: {} is not a trace file (.bin, {}, .bin.gz, .bin.bz2, .bin.xz or {})."
+        raise Exception(out_message.format(file_path, TEXT_EXTENSION, DELTA_EXTENSION))
+
+    kind = trace_kind(file_path)
+    if kind == "delta":
+        return DeltaTraceWriter(file_path, block_size)
+    if kind == "text":
+        return TextTraceWriter(file_path)
+    if file_path.endswith(TEXT_EXTENSION + "." + kind):
+        return TextTraceWriter(file_path, COMPRESSIONS["." + kind])
+    return RawTraceWriter(file_path)
+
+def open_compressed(file_path: str) -> BinaryIO:
+    """
+    Open a compressed trace for reading.
+
+    Args:
+        file_path (str): Path to the .bin.gz, .bin.bz2 or .bin.xz (or .txt.gz...) file.
+    Returns:
+        BinaryIO: Decompressed stream.
+    """
+    return COMPRESSIONS["." + trace_kind(file_path)](file_path, "rb")
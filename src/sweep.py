@@ -0,0 +1,250 @@
+"""
+File: sweep.py
+Author: Gustavo Pereira
+Date: October 18, 2026
+Description: Parameter sweep for the cache simulator. Runs every combination of the given nsets, bsize, assoc and
+             replacement policies over one trace, in a pool of worker processes.
+             The trace is decoded once, and its addresses are copied into shared memory that every worker maps,
+             instead of being decoded or pickled in each of them. Each result is written as a CSV or JSON line as
+             soon as it is ready, a configuration that fails gets a row with its error, and --resume skips the
+             configurations already in the output file (the failed ones are run again).
+             You need to pass the following parameters:
+                input_file (Path to the file to read, needs to be a binary file)
+                --nsets, --bsize, --assoc (Values to sweep. Each value is a number or a range "low..high"
+                                           with every power of two from low to high)
+                --subs_method (Replacement policies to sweep, any of sim_cache/policies.py. OPTIONAL. Default is R L F.)
+                --workers (Number of worker processes. OPTIONAL. Default is the number of CPUs.)
+                --output (Path to the output file. OPTIONAL. Default is stdout.)
+                --format (csv or json, one JSON object per line. OPTIONAL. Default is csv.)
+                --resume (Skip the configurations already in the output file and append the new ones. OPTIONAL.)
+                --seed (Seed for the random substitution of every configuration. OPTIONAL. Default is None.)
+             Example: python sweep.py bin_10000.bin --nsets 1..1024 --bsize 4 16 --assoc 1..8 --subs_method L F --output sweep.csv
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.shared_memory import SharedMemory
+from typing import TextIO
+
+import numpy as np
+
+from sim_cache.cache import Cache
+from sim_cache.file_reader import CHUNK_SIZE, read_file
+from sim_cache.optimal import next_use
+from sim_cache.policies import POLICIES
+
+# Output columns
+COLUMNS = ["nsets", "bsize", "assoc", "subs_method", "total_accesses", "hits", "total_misses", "compulsory_misses",
+           "capacity_misses", "conflict_misses", "hit_rate", "miss_rate", "compulsory_miss_rate",
+           "capacity_miss_rate", "conflict_miss_rate", "error"]
+
+# Trace of the worker process, mapped once by the pool initializer, and its shared memory
+trace = None
+shared = None
+
+# Next-use index of the trace for the OPT substitution, computed once per block size in each worker
+next_uses = {}
+
+def load_trace(shared_name: str, length: int) -> None:
+    """
+    Map the trace in a worker process.
+
+    Args:
+        shared_name (str): Name of the shared memory with the addresses.
+        length (int): Number of addresses.
+    """
+    global trace, shared
+    shared = SharedMemory(shared_name)
+    trace = np.ndarray((length,), dtype=np.uint32, buffer=shared.buf)
+
+def run_config(nsets: int, bsize: int, assoc: int, subs_method: str, seed: int = None) -> dict:
+    """
+    Simulate one configuration over the trace of the worker process.
+
+    Args:
+        nsets (int): Number of sets for the cache
+        bsize (int): Block size for the cache
+        assoc (int): Associativity for the cache
+        subs_method (str): Replacement policy for the cache
+        seed (int): Seed for the random substitution. OPTIONAL. Default is None (draw one).
+    Returns:
+        dict: Statistics of the configuration (see Cache.get_statistics).
+    """
+    cache = Cache(nsets, bsize, assoc, subs_method, 1, "", seed=seed)
+    if cache.needs_next_use():
+        if bsize not in next_uses:
+            next_uses[bsize] = next_use(trace, bsize)
+        cache.set_next_use(next_uses[bsize])
+    for start in range(0, len(trace), CHUNK_SIZE):
+        cache.process_chunk(trace[start:start + CHUNK_SIZE])
+    return cache.get_statistics()
+
+def parse_values(values: list[str]) -> list[int]:
+    """
+    Parse the values of a swept parameter.
+
+    Args:
+        values (list[str]): Numbers, comma separated numbers or "low..high" ranges of powers of two.
+    Returns:
+        list[int]: Sorted values, without repetitions.
+    """
+    parsed = set()
+    for value in values:
+        for item in value.split(","):
+            if ".." in item:
+                low, high = (int(bound) for bound in item.split(".."))
+                power = 1
+                while power <= high:
+                    if power >= low:
+                        parsed.add(power)
+                    power *= 2
+            elif item:
+                parsed.add(int(item))
+    return sorted(parsed)
+
+def config_key(row: dict) -> tuple[int, int, int, str]:
+    """
+    Get the configuration of a result row.
+
+    Args:
+        row (dict): Result row.
+    Returns:
+        tuple[int, int, int, str]: nsets, bsize, assoc and subs_method.
+    """
+    return int(row["nsets"]), int(row["bsize"]), int(row["assoc"]), str(row["subs_method"])
+
+def read_done(output: str, output_format: str) -> set[tuple[int, int, int, str]]:
+    """
+    Get the configurations already in an output file, to resume a sweep. Failed configurations are not done.
+
+    Args:
+        output (str): Path to the output file.
+        output_format (str): csv or json.
+    Returns:
+        set[tuple[int, int, int, str]]: Configurations already simulated.
+    """
+    if not os.path.exists(output):
+        return set()
+
+    with open(output, "r", newline="") as file:
+        if output_format == "csv":
+            rows = csv.DictReader(file)
+        else:
+            rows = (json.loads(line) for line in file if line.strip())
+        return {config_key(row) for row in rows if not row.get("error")}
+
+def write_row(file: TextIO, row: dict, output_format: str, header: bool) -> None:
+    """
+    Write one result row and flush it, so a killed sweep can be resumed.
+
+    Args:
+        file (TextIO): Output file.
+        row (dict): Result row.
+        output_format (str): csv or json.
+        header (bool): Write the CSV header first.
+    """
+    if output_format == "csv":
+        writer = csv.DictWriter(file, fieldnames=COLUMNS)
+        if header:
+            writer.writeheader()
+        writer.writerow(row)
+    else:
+        file.write(json.dumps(row) + "\n")
+    file.flush()
+
+def sweep(memory_address: np.ndarray, configs: list[tuple[int, int, int, str]], workers: int, file: TextIO, output_format: str, header: bool, seed: int = None) -> int:
+    """
+    Simulate the configurations in a process pool and write each result when it is ready.
+
+    Args:
+        memory_address (np.ndarray): Addresses of the trace, copied once into shared memory for the workers.
+        configs (list[tuple[int, int, int, str]]): Configurations (nsets, bsize, assoc, subs_method) to simulate.
+        workers (int): Number of worker processes.
+        file (TextIO): Output file.
+        output_format (str): csv or json.
+        header (bool): Write the CSV header before the first row.
+        seed (int): Seed for the random substitution of every configuration. OPTIONAL. Default is None (draw one).
+    Returns:
+        int: Number of configurations simulated, failed ones included.
+    """
+    # Native uint32 addresses, each worker maps them instead of decoding the trace again
+    block = SharedMemory(create=True, size=max(len(memory_address) * 4, 1))
+    try:
+        np.ndarray((len(memory_address),), dtype=np.uint32, buffer=block.buf)[:] = memory_address
+        with ProcessPoolExecutor(max_workers=workers, initializer=load_trace, initargs=(block.name, len(memory_address))) as pool:
+            futures = {pool.submit(run_config, *config, seed): config for config in configs}
+            for future in as_completed(futures):
+                try:
+                    row = future.result()
+                except Exception as error:
+                    # A failed configuration gets a row with its error, the others go on
+                    nsets, bsize, assoc, subs_method = futures[future]
+                    row = {"nsets": nsets, "bsize": bsize, "assoc": assoc, "subs_method": subs_method, "error": str(error) or type(error).__name__}
+                    print("Failed {} {} {} {}: {}".format(nsets, bsize, assoc, subs_method, row["error"]), file=sys.stderr)
+                write_row(file, row, output_format, header)
+                header = False
+    finally:
+        block.close()
+        block.unlink()
+    return len(futures)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parameter sweep for the cache simulator.")
+    parser.add_argument("input_file", type=str, help="Path to the file to read, needs to be a binary file")
+    parser.add_argument("--nsets", type=str, nargs="+", help="Numbers of sets, as numbers or low..high ranges of powers of two", required=True)
+    parser.add_argument("--bsize", type=str, nargs="+", help="Block sizes, as numbers or low..high ranges of powers of two", required=True)
+    parser.add_argument("--assoc", type=str, nargs="+", help="Associativities, as numbers or low..high ranges of powers of two", required=True)
+    parser.add_argument("--subs_method", type=str, nargs="+", help="Replacement policies", default=["R", "L", "F"])
+    parser.add_argument("--workers", type=int, help="Number of worker processes", default=os.cpu_count())
+    parser.add_argument("--output", type=str, help="Path to the output file, stdout if not set", default=None)
+    parser.add_argument("--format", type=str, help="Output format", choices=["csv", "json"], default="csv")
+    parser.add_argument("--resume", action="store_true", help="Skip the configurations already in the output file", default=False)
+    parser.add_argument("--seed", type=int, help="Seed for the random substitution of every configuration", default=None)
+    args = parser.parse_args()
+
+    nsets_values = parse_values(args.nsets)
+    bsize_values = parse_values(args.bsize)
+    assoc_values = parse_values(args.assoc)
+
+    # Check it arg
+    if not nsets_values or min(nsets_values) <= 0:
+        raise ValueError("nsets needs to be greater than 0")
+
+    if not bsize_values or min(bsize_values) <= 0:
+        raise ValueError("bsize needs to be greater than 0")
+
+    if not assoc_values or min(assoc_values) <= 0:
+        raise ValueError("assoc needs to be greater than 0")
+
+    for subs_method in args.subs_method:
+        if subs_method not in POLICIES:
+            raise ValueError("subs_method needs to be one of " + ", ".join(POLICIES))
+
+    if args.workers <= 0:
+        raise ValueError("workers needs to be greater than 0")
+
+    if args.resume and not args.output:
+        raise ValueError("resume needs an output file")
+
+    # Decode the trace once, before starting the workers
+    memory_address = read_file(args.input_file)
+
+    configs = list(itertools.product(nsets_values, bsize_values, assoc_values, args.subs_method))
+    done = read_done(args.output, args.format) if args.resume else set()
+    configs = [config for config in configs if config not in done]
+
+    start = time.time()
+    if args.output:
+        header = not (args.resume and os.path.exists(args.output) and os.path.getsize(args.output) > 0)
+        with open(args.output, "a" if args.resume else "w", newline="") as file:
+            count = sweep(memory_address, configs, args.workers, file, args.format, header, args.seed)
+    else:
+        count = sweep(memory_address, configs, args.workers, sys.stdout, args.format, True, args.seed)
+    end = time.time()
+    print("Simulated {} configurations in {:.6f} seconds".format(count, end - start), file=sys.stderr)